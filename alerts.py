@@ -0,0 +1,273 @@
+"""
+Signal Change Alerts
+Re-evaluates symbols only when a new bar closes and emits compact delta events
+"""
+import queue
+import threading
+import time
+import requests
+from market_analyzer import MarketAnalyzer
+
+
+# Bar length in seconds for supported timeframes
+TIMEFRAME_SECONDS = {
+    '5m': 300,
+    '15m': 900,
+    '1h': 3600,
+    '4h': 14400,
+    '1d': 86400,
+    '1wk': 604800
+}
+
+
+class WebhookSubscriber:
+    """Subscriber stub that POSTs each event as JSON to a webhook URL"""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def __call__(self, event):
+        try:
+            requests.post(self.url, json=event, timeout=self.timeout)
+        except Exception as e:
+            print(f"Error delivering alert to {self.url}: {e}")
+
+
+def score_in_band(score, threshold):
+    """
+    Whether a score is inside a threshold's signal band
+
+    Bands are bounded the way generate_signal bounds them: a positive
+    threshold holds scores >= it (BUY side), a negative one scores <= it
+    (SELL side), so a score is in a band exactly when it reaches that cut-off.
+    """
+    return score <= threshold if threshold < 0 else score >= threshold
+
+
+class SignalAlertManager:
+    def __init__(self, analyzer=None, score_thresholds=(-6, -2, 2, 6), retry_seconds=60):
+        """
+        Initialize the alert manager
+
+        Args:
+            analyzer: MarketAnalyzer used for evaluation (created if None)
+            score_thresholds: Signal scores whose crossing emits an event
+                              (defaults match the BUY/STRONG BUY and SELL/STRONG SELL
+                              cut-offs; see score_in_band)
+            retry_seconds: Delay before re-checking when the data feed has not
+                           published the expected new bar yet
+        """
+        self.analyzer = analyzer or MarketAnalyzer()
+        self.score_thresholds = sorted(score_thresholds)
+        self.retry_seconds = retry_seconds
+        self.states = {}  # (symbol, timeframe) -> last evaluated state
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """
+        Register a subscriber
+
+        Args:
+            callback: Callable receiving one event dict
+
+        Returns:
+            The registered callback
+        """
+        with self.lock:
+            self.subscribers.append(callback)
+        return callback
+
+    def subscribe_queue(self, maxsize=1000):
+        """
+        Register a local queue subscriber
+
+        Events are dropped (oldest first) when the queue is full so a slow
+        consumer never blocks evaluation.
+
+        Returns:
+            queue.Queue receiving event dicts
+        """
+        event_queue = queue.Queue(maxsize=maxsize)
+
+        def enqueue(event):
+            while True:
+                try:
+                    event_queue.put_nowait(event)
+                    return
+                except queue.Full:
+                    try:
+                        event_queue.get_nowait()
+                    except queue.Empty:
+                        pass
+
+        self.subscribe(enqueue)
+        return event_queue
+
+    def unsubscribe(self, callback):
+        """Remove a previously registered subscriber"""
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def needs_update(self, symbol, timeframe='1h', now=None):
+        """
+        Check whether a new bar has closed since the last evaluation
+
+        Args:
+            symbol: Trading symbol
+            timeframe: Analysis timeframe
+            now: Current unix time (defaults to time.time())
+
+        Returns:
+            bool: True if the symbol should be re-evaluated
+        """
+        state = self.states.get((symbol, timeframe))
+        if state is None:
+            return True
+        now = time.time() if now is None else now
+        return now >= state['next_bar_close']
+
+    def check(self, symbol, market_type='crypto', timeframe='1h', now=None, force=False):
+        """
+        Re-evaluate a symbol if a new bar has closed and publish any changes
+
+        Args:
+            symbol: Trading symbol
+            market_type: 'crypto' or 'forex'
+            timeframe: Analysis timeframe
+            now: Current unix time (defaults to time.time())
+            force: Evaluate even if no new bar has closed
+
+        Returns:
+            list: Delta events emitted for this symbol (empty if unchanged or skipped)
+        """
+        now = time.time() if now is None else now
+
+        if not force and not self.needs_update(symbol, timeframe, now):
+            return []
+
+        analysis = self.analyzer.analyze_symbol(symbol, market_type, timeframe=timeframe)
+        if not analysis:
+            return []
+
+        current = self._extract_state(analysis, timeframe, now)
+        key = (symbol, timeframe)
+
+        with self.lock:
+            previous = self.states.get(key)
+            # Data feed has not published the new bar yet - retry shortly
+            # instead of re-running the full analysis on every poll
+            if previous is not None and current['bar_time'] == previous['bar_time']:
+                current['next_bar_close'] = max(current['next_bar_close'], now + self.retry_seconds)
+            self.states[key] = current
+
+        events = self._diff(symbol, timeframe, previous, current)
+        self._publish(events)
+        return events
+
+    def check_many(self, symbols, timeframe='1h', now=None):
+        """
+        Check several symbols
+
+        Args:
+            symbols: dict {'crypto': [...], 'forex': [...]}
+            timeframe: Analysis timeframe
+            now: Current unix time
+
+        Returns:
+            list: All emitted events
+        """
+        events = []
+        for market_type in ('crypto', 'forex'):
+            for symbol in symbols.get(market_type, []):
+                events.extend(self.check(symbol, market_type, timeframe, now=now))
+        return events
+
+    def _extract_state(self, analysis, timeframe, now):
+        """Reduce an analysis result to the fields tracked for change detection"""
+        bar_seconds = TIMEFRAME_SECONDS.get(timeframe, 3600)
+        chart_data = analysis.get('chart_data') or []
+
+        if chart_data:
+            # The newest candle is still forming; it closes one bar after it opened
+            bar_time = chart_data[-1]['time']
+            next_bar_close = bar_time + bar_seconds
+        else:
+            bar_time = int(now)
+            next_bar_close = now + bar_seconds
+
+        patterns = set()
+        for chart, key in (('4h', 'candle_patterns_4h'), ('5m', 'candle_patterns_5m')):
+            for pattern in analysis.get(key) or []:
+                patterns.add((chart, pattern['name'], pattern['type']))
+
+        return {
+            'signal': analysis['signal'],
+            'score': analysis['score'],
+            'patterns': patterns,
+            'bar_time': bar_time,
+            'next_bar_close': next_bar_close
+        }
+
+    def _diff(self, symbol, timeframe, previous, current):
+        """Build delta events between two states"""
+        base = {
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'bar_time': current['bar_time']
+        }
+        events = []
+
+        if previous is None or previous['signal'] != current['signal']:
+            events.append(dict(
+                base,
+                type='signal_change',
+                previous=previous['signal'] if previous else None,
+                signal=current['signal'],
+                score=current['score']
+            ))
+
+        previous_patterns = previous['patterns'] if previous else set()
+        for chart, name, pattern_type in sorted(current['patterns'] - previous_patterns):
+            events.append(dict(
+                base,
+                type='new_pattern',
+                chart=chart,
+                pattern=name,
+                pattern_type=pattern_type
+            ))
+
+        if previous is not None:
+            old_score = previous['score']
+            new_score = current['score']
+            for threshold in self.score_thresholds:
+                # Crossing = entering or leaving the threshold's band
+                if score_in_band(old_score, threshold) == score_in_band(new_score, threshold):
+                    continue
+                direction = 'up' if new_score > old_score else 'down'
+                events.append(dict(
+                    base,
+                    type='score_threshold',
+                    threshold=threshold,
+                    direction=direction,
+                    score=new_score
+                ))
+
+        return events
+
+    def _publish(self, events):
+        """Deliver events to every subscriber"""
+        if not events:
+            return
+
+        with self.lock:
+            subscribers = list(self.subscribers)
+
+        for event in events:
+            for callback in subscribers:
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"Error delivering alert: {e}")
@@ -1,10 +1,15 @@
 """
 Flask web application for Crypto & Forex Market Analyzer
 """
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response
 from market_analyzer import MarketAnalyzer
-from data_fetcher import CRYPTO_PAIRS, FOREX_PAIRS, CRYPTO_NAMES, FOREX_NAMES
+from data_fetcher import CRYPTO_PAIRS, FOREX_PAIRS, CRYPTO_NAMES, FOREX_NAMES, load_universe
+from model_registry import ModelRegistry
 from lot_calculator import LotCalculator
+from screener import MarketScreener
+from alerts import SignalAlertManager, WebhookSubscriber
+import queue
+import threading
 from dotenv import load_dotenv
 import os
 
@@ -15,9 +20,31 @@ app = Flask(__name__)
 app.config['JSON_SORT_KEYS'] = False
 
 # Initialize analyzer and lot calculator
-analyzer = MarketAnalyzer()
+# Forex models are trained by train_models.py and only loaded here - never trained in a request
+# Models load in the background so the ML backends do not delay server start-up
+model_registry = ModelRegistry(base_dir=os.getenv('MODELS_DIR', 'models'))
+threading.Thread(
+    target=model_registry.warm_start,
+    args=(FOREX_PAIRS, ('1h', '4h', '1d')),
+    daemon=True
+).start()
+analyzer = MarketAnalyzer(model_registry=model_registry)
 lot_calculator = LotCalculator()
 
+# Screener universe can be overridden with a JSON or one-symbol-per-line file
+universe_file = os.getenv('SCREENER_UNIVERSE_FILE')
+screener = MarketScreener(
+    analyzer,
+    universe=load_universe(universe_file) if universe_file else None,
+    latency_budget=float(os.getenv('SCREENER_LATENCY_BUDGET', 30))
+)
+
+# Change-detection alerts (local queue plus optional webhook)
+alert_manager = SignalAlertManager(analyzer)
+alert_queue = alert_manager.subscribe_queue()
+if os.getenv('ALERT_WEBHOOK_URL'):
+    alert_manager.subscribe(WebhookSubscriber(os.getenv('ALERT_WEBHOOK_URL')))
+
 
 @app.route('/')
 def home():
@@ -87,7 +114,8 @@ def analyze_markets():
     Request body:
         {
             "crypto": ["BTC/USDT", "ETH/USDT", ...],
-            "forex": ["EURUSD=X", "GBPUSD=X", ...]
+            "forex": ["EURUSD=X", "GBPUSD=X", ...],
+            "include_timings": false
         }
 
     Returns:
@@ -105,6 +133,7 @@ def analyze_markets():
 
         crypto_symbols = data.get('crypto', [])
         forex_symbols = data.get('forex', [])
+        include_timings = bool(data.get('include_timings', False))
 
         results = {
             'crypto': [],
@@ -114,7 +143,7 @@ def analyze_markets():
         # Analyze selected crypto markets
         for symbol in crypto_symbols:
             print(f"Analyzing {symbol}...")
-            analysis = analyzer.analyze_symbol(symbol, 'crypto')
+            analysis = analyzer.analyze_symbol(symbol, 'crypto', include_timings=include_timings)
             if analysis:
                 analysis['name'] = CRYPTO_NAMES.get(symbol, symbol)
                 results['crypto'].append(analysis)
@@ -122,7 +151,7 @@ def analyze_markets():
         # Analyze selected forex markets
         for symbol in forex_symbols:
             print(f"Analyzing {symbol}...")
-            analysis = analyzer.analyze_symbol(symbol, 'forex')
+            analysis = analyzer.analyze_symbol(symbol, 'forex', include_timings=include_timings)
             if analysis:
                 analysis['name'] = FOREX_NAMES.get(symbol, symbol)
                 results['forex'].append(analysis)
@@ -147,6 +176,9 @@ def analyze_symbol(market_type, symbol):
         market_type: 'crypto' or 'forex'
         symbol: Trading symbol
 
+    Query params:
+        timings: Set to 1 to include the per-stage latency breakdown
+
     Returns:
         JSON with analysis results
     """
@@ -155,7 +187,8 @@ def analyze_symbol(market_type, symbol):
         if market_type == 'crypto' and '/' not in symbol:
             symbol = symbol.replace('-', '/')
 
-        analysis = analyzer.analyze_symbol(symbol, market_type)
+        include_timings = request.args.get('timings') in ('1', 'true')
+        analysis = analyzer.analyze_symbol(symbol, market_type, include_timings=include_timings)
 
         if analysis:
             return jsonify({
@@ -175,6 +208,130 @@ def analyze_symbol(market_type, symbol):
         }), 500
 
 
+@app.route('/api/screener', methods=['POST'])
+def screen_markets():
+    """
+    Screen the configured symbol universe
+
+    Request body:
+        {
+            "filter": "rsi < 30 and adx > 25",
+            "market_type": "crypto" | "forex" | "all",
+            "timeframe": "1h",
+            "sort_by": "score",
+            "top_k": 20,
+            "ascending": false
+        }
+
+    Returns:
+        JSON with the top-K matching symbols
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+
+        result = screener.screen(
+            filter_expr=data.get('filter'),
+            market_type=data.get('market_type', 'all'),
+            timeframe=data.get('timeframe', '1h'),
+            sort_by=data.get('sort_by', 'score'),
+            top_k=int(data.get('top_k', 20)),
+            ascending=bool(data.get('ascending', False))
+        )
+
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/alerts/check', methods=['POST'])
+def check_alerts():
+    """
+    Re-evaluate symbols whose current bar has closed and return delta events
+
+    Request body:
+        {
+            "crypto": ["BTC/USDT", ...],
+            "forex": ["EURUSD=X", ...],
+            "timeframe": "1h"
+        }
+
+    Returns:
+        JSON with the emitted events (empty when nothing changed)
+    """
+    try:
+        data = request.get_json()
+
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': 'No markets selected'
+            }), 400
+
+        events = alert_manager.check_many(data, timeframe=data.get('timeframe', '1h'))
+
+        return jsonify({
+            'success': True,
+            'data': events
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/alerts/events', methods=['GET'])
+def get_alert_events():
+    """
+    Drain pending alert events from the local queue
+
+    Query params:
+        limit: Maximum number of events to return (default 100)
+
+    Returns:
+        JSON with pending events
+    """
+    try:
+        limit = int(request.args.get('limit', 100))
+        events = []
+        while len(events) < limit:
+            try:
+                events.append(alert_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return jsonify({
+            'success': True,
+            'data': events
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Per-stage analysis latency histograms in Prometheus text format"""
+    return Response(
+        analyzer.latency.export_prometheus(),
+        mimetype='text/plain; version=0.0.4'
+    )
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -6,20 +6,101 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from market_analyzer import MarketAnalyzer
-from data_fetcher import CRYPTO_PAIRS, FOREX_PAIRS, CRYPTO_NAMES, FOREX_NAMES
+from model_registry import ModelRegistry
+from data_fetcher import CRYPTO_PAIRS, FOREX_PAIRS, CRYPTO_NAMES, FOREX_NAMES, download_history
+from technical_indicators import calculate_indicator_frame
+from performance_metrics import MetricsAccumulator, TradeLog
+from trade_store import TradeStore, save_columnar_results
 import json
 
 
+# Strategy settings shared by every interval
+STRATEGY_DEFAULTS = {
+    'min_score': 2,            # Entry conditions (of signal, patterns, ML) that must agree
+    'stop_loss_pct': 0.03,     # Default stop loss distance without better levels
+    'take_profit_pct': 0.06,   # Default take profit distance (1:2 risk/reward)
+    'max_position': 0.10       # Largest share of capital per trade
+}
+
+# Entry thresholds per interval ('intraday' covers everything below daily)
+INTERVAL_THRESHOLDS = {
+    # Even more relaxed for weekly (more trade opportunities)
+    '1wk': {'signal_threshold': 15, 'ml_threshold': 50, 'require_patterns': False},
+    # Relaxed conditions for daily
+    '1d': {'signal_threshold': 20, 'ml_threshold': 55, 'require_patterns': False},
+    # Stricter conditions for intraday (4h, 1h, etc.)
+    'intraday': {'signal_threshold': 50, 'ml_threshold': 75, 'require_patterns': True}
+}
+
+
+def strategy_params(interval, overrides=None):
+    """
+    Strategy settings for an interval
+
+    Args:
+        interval: Data interval
+        overrides: Optional dict replacing individual settings
+
+    Returns:
+        dict: min_score, stop/target percentages, max_position and entry thresholds
+    """
+    params = dict(STRATEGY_DEFAULTS)
+    params.update(INTERVAL_THRESHOLDS.get(interval, INTERVAL_THRESHOLDS['intraday']))
+    params.update(overrides or {})
+    return params
+
+
+def pattern_entry_exit(analysis, trade_direction):
+    """
+    Entry/exit levels of an analysis' candlestick patterns for a trade direction
+
+    Args:
+        analysis: MarketAnalyzer analysis ('entry_exit_4h' from analyze_symbol / analyze_at)
+        trade_direction: 'LONG' or 'SHORT'
+
+    Returns:
+        dict with 'stop_loss' and 'take_profit', or None if the patterns give no
+        levels or point the other way
+    """
+    entry_exit = analysis.get('entry_exit_4h')
+    if not entry_exit or entry_exit.get('trade_type') != trade_direction or entry_exit.get('stop_loss') is None:
+        return None
+    return entry_exit
+
+
 class Backtester:
-    def __init__(self, initial_capital=10000, risk_per_trade=0.01):
+    def __init__(self, initial_capital=10000, risk_per_trade=0.01, dynamic_stops=False,
+                 strategy=None, intrabar=None, streaming=False, trade_log=None, cache=None):
         """
         Initialize backtester
 
         Args:
             initial_capital: Starting capital
             risk_per_trade: Risk percentage per trade (0.01 = 1%)
+            dynamic_stops: Use bar-specific ATR/support/swing stops from the
+                           EntryExitCalculator ladder instead of fixed 3%/6% levels
+                           when no entry/exit recommendation is available
+            strategy: Optional overrides of the strategy settings (see strategy_params)
+            intrabar: Optional IntrabarResolver; candles touching both stop loss and
+                      take profit are resolved with finer bars from the bar store and
+                      fills pay its spread/slippage
+            streaming: Don't keep trades and the equity curve in memory; metrics are
+                       accumulated per trade (see analyze_results)
+            trade_log: Optional log every closed trade is appended to: a JSON Lines
+                       file ('*.jsonl') or a columnar TradeStore directory
+            cache: Optional PrecomputeCache for the history, indicators and per-bar
+                   analyses (shared with HistoricalTester runs over the same period)
         """
-        self.analyzer = MarketAnalyzer()
+        # Offline runs train per-pair models on first use, in memory (never into the app's models/)
+        self.analyzer = MarketAnalyzer(model_registry=ModelRegistry(base_dir=None, train_on_demand=True))
+        self.dynamic_stops = dynamic_stops
+        self.strategy = strategy or {}
+        self.intrabar = intrabar
+        self.streaming = streaming
+        self.trade_log = trade_log
+        self.cache = cache
+        self.accumulator = MetricsAccumulator(initial_capital)
+        self.params = strategy_params('1d', self.strategy)
         self.initial_capital = initial_capital
         self.risk_per_trade = risk_per_trade
         self.trades = []
@@ -37,7 +118,7 @@ class Backtester:
             interval: Data interval
 
         Returns:
-            List of trades executed
+            (trades, equity_history); both only hold the start when streaming
         """
         print(f"\n{'='*60}")
         print(f"Backtesting {symbol} ({market_type})")
@@ -49,287 +130,347 @@ class Backtester:
         trades = []
         capital = self.initial_capital
         equity_history = [(start_date, capital)]
+        self.params = strategy_params(interval, self.strategy)
+        self.accumulator = MetricsAccumulator(self.initial_capital, self._open_trade_log())
 
-        try:
-            # Fetch historical data
-            import yfinance as yf
+        # Fresh models per run: trained on the bars seen so far, so runs are repeatable
+        self.analyzer.model_registry = ModelRegistry(base_dir=None, train_on_demand=True)
 
-            # Convert symbol for yfinance
-            if market_type == 'crypto':
-                yf_symbol = symbol.replace('/', '-')
+        period = None
+        try:
+            if self.cache is not None:
+                period = self.cache.open(symbol, market_type, start_date, end_date, interval, self.analyzer)
+                if period is None:
+                    return [], []
+                history, indicator_frame = period.history, period.indicator_frame
             else:
-                yf_symbol = symbol
-
-            # Download data
-            data = yf.download(yf_symbol, start=start_date, end=end_date, interval=interval, progress=False)
-
-            if data.empty:
-                print(f"ERROR: No data available for {symbol}")
-                return [], []
-
-            print(f"SUCCESS: Downloaded {len(data)} data points")
+                history = self.download_history(symbol, market_type, start_date, end_date, interval)
+                if history is None:
+                    return [], []
 
-            # Variables to track active trade
-            active_trade = None
+                # Indicators for every bar, computed once; analysis at bar i only sees bars <= i
+                indicator_frame = calculate_indicator_frame(history)
 
-            # Determine starting point based on interval
-            # Need enough history for indicators
-            if interval == '1wk':
-                start_idx = 20  # 20 weeks (~5 months) for weekly
-            elif interval == '1d':
-                start_idx = 100  # 100 days for daily
-            else:
-                start_idx = 200  # 200 periods for intraday
-
-            # Iterate through data
-            for i in range(start_idx, len(data)):
-                current_date = data.index[i].strftime('%Y-%m-%d')
-                current_price = float(data.iloc[i]['Close'])
-                high_price = float(data.iloc[i]['High'])
-                low_price = float(data.iloc[i]['Low'])
-
-                # Check if we have an active trade
-                if active_trade:
-                    direction = active_trade.get('direction', 'LONG')
-
-                    # Check stop loss and take profit based on direction
-                    if direction == 'LONG':
-                        # Long position: stop loss below, take profit above
-                        if low_price <= active_trade['stop_loss']:
-                            # Stop loss hit
-                            exit_price = active_trade['stop_loss']
-                            # PnL = position_size * (price_change / entry_price)
-                            price_change_pct = (exit_price - active_trade['entry_price']) / active_trade['entry_price']
-                            pnl = active_trade['position_size'] * price_change_pct
-                            capital += pnl
-
-                            active_trade['exit_date'] = current_date
-                            active_trade['exit_price'] = exit_price
-                            active_trade['exit_reason'] = 'STOP_LOSS'
-                            active_trade['pnl'] = pnl
-                            active_trade['pnl_percent'] = (pnl / capital) * 100
-                            active_trade['final_capital'] = capital
-
-                            trades.append(active_trade)
-                            equity_history.append((current_date, capital))
-                            active_trade = None
-                            continue
-
-                        # Check take profit
-                        if high_price >= active_trade['take_profit']:
-                            # Take profit hit
-                            exit_price = active_trade['take_profit']
-                            price_change_pct = (exit_price - active_trade['entry_price']) / active_trade['entry_price']
-                            pnl = active_trade['position_size'] * price_change_pct
-                            capital += pnl
-
-                            active_trade['exit_date'] = current_date
-                            active_trade['exit_price'] = exit_price
-                            active_trade['exit_reason'] = 'TAKE_PROFIT'
-                            active_trade['pnl'] = pnl
-                            active_trade['pnl_percent'] = (pnl / capital) * 100
-                            active_trade['final_capital'] = capital
-
-                            trades.append(active_trade)
-                            equity_history.append((current_date, capital))
-                            active_trade = None
-                            continue
-
-                    else:  # SHORT position
-                        # Short position: stop loss above, take profit below
-                        if high_price >= active_trade['stop_loss']:
-                            # Stop loss hit (price went up)
-                            exit_price = active_trade['stop_loss']
-                            price_change_pct = (active_trade['entry_price'] - exit_price) / active_trade['entry_price']
-                            pnl = active_trade['position_size'] * price_change_pct
-                            capital += pnl
-
-                            active_trade['exit_date'] = current_date
-                            active_trade['exit_price'] = exit_price
-                            active_trade['exit_reason'] = 'STOP_LOSS'
-                            active_trade['pnl'] = pnl
-                            active_trade['pnl_percent'] = (pnl / capital) * 100
-                            active_trade['final_capital'] = capital
-
-                            trades.append(active_trade)
-                            equity_history.append((current_date, capital))
-                            active_trade = None
-                            continue
-
-                        # Check take profit (price went down)
-                        if low_price <= active_trade['take_profit']:
-                            # Take profit hit
-                            exit_price = active_trade['take_profit']
-                            price_change_pct = (active_trade['entry_price'] - exit_price) / active_trade['entry_price']
-                            pnl = active_trade['position_size'] * price_change_pct
-                            capital += pnl
-
-                            active_trade['exit_date'] = current_date
-                            active_trade['exit_price'] = exit_price
-                            active_trade['exit_reason'] = 'TAKE_PROFIT'
-                            active_trade['pnl'] = pnl
-                            active_trade['pnl_percent'] = (pnl / capital) * 100
-                            active_trade['final_capital'] = capital
-
-                            trades.append(active_trade)
-                            equity_history.append((current_date, capital))
-                            active_trade = None
-                            continue
-
-                # If no active trade, look for entry signals
-                if not active_trade:
-                    # Get analysis at this point
-                    analysis = self.analyzer.analyze_symbol(symbol, market_type, timeframe=interval, limit=100)
-
-                    if not analysis:
-                        continue
-
-                    signal = analysis.get('signal', 'HOLD')
-                    strength = analysis.get('strength', 0)
-
-                    # Determine thresholds based on interval
-                    if interval in ['1d', '1wk']:
-                        # Relaxed conditions for daily/weekly intervals
-                        if interval == '1wk':
-                            # Even more relaxed for weekly (more trade opportunities)
-                            signal_threshold = 15
-                            ml_threshold = 50
-                        else:  # 1d
-                            signal_threshold = 20
-                            ml_threshold = 55
-                        require_patterns = False  # Optional instead of required
-                    else:
-                        # Stricter conditions for intraday (4h, 1h, etc.)
-                        signal_threshold = 50
-                        ml_threshold = 75
-                        require_patterns = True
-
-                    # Scoring system: need 2 of 3 conditions
-                    score = 0
-                    trade_direction = None
-
-                    # Condition 1: Signal strength
-                    signal_valid = False
-                    if signal in ['STRONG BUY', 'BUY'] and strength >= signal_threshold:
-                        score += 1
-                        signal_valid = True
-                        trade_direction = 'LONG'
-                    elif signal in ['STRONG SELL', 'SELL'] and strength >= signal_threshold:
-                        score += 1
-                        signal_valid = True
-                        trade_direction = 'SHORT'
-
-                    # Condition 2: Candlestick patterns (if required or if found)
-                    has_patterns = bool(analysis.get('patterns_5m') or analysis.get('patterns_4h'))
-                    if has_patterns or not require_patterns:
-                        if has_patterns:
-                            score += 1
-
-                    # Condition 3: ML prediction (for forex)
-                    ml_valid = False
-                    if market_type == 'forex' and analysis.get('ml_prediction'):
-                        ml_pred = analysis['ml_prediction']
-                        if ml_pred['direction'] == 'BULLISH' and ml_pred['confidence'] >= ml_threshold:
-                            score += 1
-                            ml_valid = True
-                            if not trade_direction:
-                                trade_direction = 'LONG'
-                        elif ml_pred['direction'] == 'BEARISH' and ml_pred['confidence'] >= ml_threshold:
-                            score += 1
-                            ml_valid = True
-                            if not trade_direction:
-                                trade_direction = 'SHORT'
-
-                    # Enter trade if score >= 2 (at least 2 conditions met)
-                    entry_conditions = score >= 2 and trade_direction is not None
+            # Bar-specific stop loss / take profit for both directions, computed once
+            stop_ladders = self.stop_ladders(history) if self.dynamic_stops else {}
 
-                    # Enter trade if conditions met
-                    if entry_conditions:
-                        # Get entry/exit recommendations
-                        patterns_4h = analysis.get('patterns_4h', [])
-                        entry_exit = patterns_4h[0].get('entry_exit') if patterns_4h else None
-
-                        entry_price = current_price
-
-                        # Set stop loss and take profit based on direction and available data
-                        if entry_exit:
-                            stop_loss = entry_exit.get('stop_loss', entry_price * 0.97)
-                            take_profit = entry_exit.get('take_profit', entry_price * 1.06)
-                        else:
-                            # Default risk/reward for daily intervals without patterns
-                            if trade_direction == 'LONG':
-                                stop_loss = entry_price * 0.97   # 3% stop loss
-                                take_profit = entry_price * 1.06  # 6% take profit (1:2 risk/reward)
-                            else:  # SHORT
-                                stop_loss = entry_price * 1.03   # 3% stop loss (price goes up)
-                                take_profit = entry_price * 0.94  # 6% take profit (price goes down)
-
-                        # Calculate position size based on risk
-                        risk_amount = capital * self.risk_per_trade
-                        price_risk = abs(entry_price - stop_loss)
-                        position_size = risk_amount / price_risk if price_risk > 0 else capital * 0.10
-
-                        # Don't risk more than 10% of capital per trade
-                        position_size = min(position_size, capital * 0.10)
-
-                        active_trade = {
-                            'symbol': symbol,
-                            'market_type': market_type,
-                            'entry_date': current_date,
-                            'entry_price': entry_price,
-                            'stop_loss': stop_loss,
-                            'take_profit': take_profit,
-                            'direction': trade_direction,
-                            'signal': signal,
-                            'signal_strength': strength,
-                            'ml_prediction': analysis.get('ml_prediction', {}).get('direction'),
-                            'ml_confidence': analysis.get('ml_prediction', {}).get('confidence'),
-                            'position_size': position_size,
-                            'risk_amount': risk_amount,
-                            'capital_at_entry': capital,
-                            'score': score,  # Track entry score
-                        }
-
-                # Progress
-                if i % 50 == 0:
-                    progress = (i / len(data)) * 100
-                    print(f"Progress: {progress:.1f}% | Trades: {len(trades)} | Capital: ${capital:,.2f}")
-
-            # Close any remaining open trade
-            if active_trade:
-                exit_price = float(data.iloc[-1]['Close'])
-                direction = active_trade.get('direction', 'LONG')
+            start_idx = self.start_index(interval)
 
-                # Calculate PnL based on direction
-                if direction == 'LONG':
-                    price_change_pct = (exit_price - active_trade['entry_price']) / active_trade['entry_price']
-                    pnl = active_trade['position_size'] * price_change_pct
-                else:  # SHORT
-                    price_change_pct = (active_trade['entry_price'] - exit_price) / active_trade['entry_price']
-                    pnl = active_trade['position_size'] * price_change_pct
+            if self.intrabar is not None:
+                self.intrabar.attach(symbol, history)
 
-                capital += pnl
+            def analyze(i):
+                # Point-in-time analysis (no live fetches)
+                if period is not None:
+                    return period.analyze(i)
+                return self.analyzer.analyze_at(
+                    history, i, symbol, market_type, timeframe=interval, indicator_frame=indicator_frame
+                )
 
-                active_trade['exit_date'] = data.index[-1].strftime('%Y-%m-%d')
-                active_trade['exit_price'] = exit_price
-                active_trade['exit_reason'] = 'END_OF_PERIOD'
-                active_trade['pnl'] = pnl
-                active_trade['pnl_percent'] = (pnl / capital) * 100
-                active_trade['final_capital'] = capital
-
-                trades.append(active_trade)
-                equity_history.append((data.index[-1].strftime('%Y-%m-%d'), capital))
+            trades, capital, equity_history = self._run_loop(
+                history, analyze, symbol, market_type, interval, start_idx, stop_ladders, equity_history
+            )
 
             print(f"\nSUCCESS: Backtest complete!")
-            print(f"Total Trades: {len(trades)}")
+            print(f"Total Trades: {self.accumulator.total_trades}")
             print(f"Final Capital: ${capital:,.2f}")
             print(f"Total Return: {((capital - self.initial_capital) / self.initial_capital * 100):.2f}%\n")
 
         except Exception as e:
             print(f"ERROR: Error backtesting {symbol}: {e}\n")
 
+        finally:
+            if self.accumulator.trade_log is not None:
+                self.accumulator.trade_log.close()
+            if period is not None:
+                period.save()
+
         return trades, equity_history
 
+    @staticmethod
+    def download_history(symbol, market_type, start_date, end_date, interval='1d'):
+        """
+        Download OHLCV history (lowercase columns)
+
+        Returns:
+            DataFrame or None if no data is available
+        """
+        return download_history(symbol, market_type, start_date, end_date, interval)
+
+    @staticmethod
+    def start_index(interval):
+        """First bar that may open a trade (need enough history for indicators)"""
+        if interval == '1wk':
+            return 20  # 20 weeks (~5 months) for weekly
+        if interval == '1d':
+            return 100  # 100 days for daily
+        return 200  # 200 periods for intraday
+
+    def stop_ladders(self, history):
+        """Bar-specific stop loss / take profit arrays for both directions"""
+        calculator = self.analyzer.entry_exit_calculator
+        return {
+            direction: calculator.calculate_levels_vectorized(history, direction)
+            for direction in ('LONG', 'SHORT')
+        }
+
+    def _run_loop(self, history, analyze, symbol, market_type, interval, start_idx, stop_ladders, equity_history):
+        """
+        Bar-by-bar simulation: analyze each flat bar, check exits of the open trade
+
+        Returns:
+            (trades, final capital, equity_history)
+        """
+        trades = []
+        capital = self.initial_capital
+        dates = history.index.strftime('%Y-%m-%d')
+        close = history['close'].to_numpy(dtype=float)
+        high = history['high'].to_numpy(dtype=float)
+        low = history['low'].to_numpy(dtype=float)
+
+        # Variables to track active trade
+        active_trade = None
+
+        # Iterate through data
+        for i in range(start_idx, len(history)):
+            current_date = dates[i]
+
+            # Check if we have an active trade
+            if active_trade:
+                exit_price, exit_reason = self._check_exit(active_trade, high[i], low[i])
+                if exit_reason and self.intrabar is not None:
+                    exit_price, exit_reason = self._intrabar_exit(active_trade, i, high[i], low[i],
+                                                                  exit_price, exit_reason)
+                if exit_reason:
+                    capital = self._close_trade(active_trade, exit_price, exit_reason, current_date, capital)
+                    self._record_trade(active_trade, trades, equity_history)
+                    active_trade = None
+                    continue
+
+            # If no active trade, look for entry signals
+            if not active_trade:
+                analysis = analyze(i)
+
+                if analysis:
+                    trade_direction, score = self._entry_decision(analysis, market_type, interval)
+
+                    # Enter trade if conditions met
+                    if trade_direction:
+                        active_trade = self._open_trade(
+                            analysis, symbol, market_type, current_date, close[i], trade_direction,
+                            score, capital, stop_ladders, i
+                        )
+
+            # Progress
+            if i % 50 == 0:
+                progress = (i / len(history)) * 100
+                print(f"Progress: {progress:.1f}% | Trades: {self.accumulator.total_trades} | Capital: ${capital:,.2f}")
+
+        # Close any remaining open trade
+        if active_trade:
+            exit_price = float(close[-1])
+            if self.intrabar is not None:
+                exit_price = self.intrabar.exit_fill(exit_price, active_trade['direction'], 'END_OF_PERIOD')
+            capital = self._close_trade(active_trade, exit_price, 'END_OF_PERIOD', dates[-1], capital)
+            self._record_trade(active_trade, trades, equity_history)
+
+        return trades, capital, equity_history
+
+    def _entry_decision(self, analysis, market_type, interval):
+        """
+        Entry rules: at least 2 of signal strength, candlestick patterns and ML prediction
+
+        Returns:
+            (trade direction 'LONG'/'SHORT' or None, score)
+        """
+        signal = analysis.get('signal', 'HOLD')
+        strength = analysis.get('strength', 0)
+
+        # Thresholds for the interval (see INTERVAL_THRESHOLDS)
+        signal_threshold = self.params['signal_threshold']
+        ml_threshold = self.params['ml_threshold']
+        require_patterns = self.params['require_patterns']
+
+        # Scoring system: need 2 of 3 conditions
+        score = 0
+        trade_direction = None
+
+        # Condition 1: Signal strength
+        if signal in ['STRONG BUY', 'BUY'] and strength >= signal_threshold:
+            score += 1
+            trade_direction = 'LONG'
+        elif signal in ['STRONG SELL', 'SELL'] and strength >= signal_threshold:
+            score += 1
+            trade_direction = 'SHORT'
+
+        # Condition 2: Candlestick patterns (if required or if found)
+        has_patterns = bool(analysis.get('candle_patterns_5m') or analysis.get('candle_patterns_4h'))
+        if has_patterns or not require_patterns:
+            if has_patterns:
+                score += 1
+
+        # Condition 3: ML prediction (for forex)
+        if market_type == 'forex' and analysis.get('ml_prediction'):
+            ml_pred = analysis['ml_prediction']
+            if ml_pred['direction'] == 'BULLISH' and ml_pred['confidence'] >= ml_threshold:
+                score += 1
+                if not trade_direction:
+                    trade_direction = 'LONG'
+            elif ml_pred['direction'] == 'BEARISH' and ml_pred['confidence'] >= ml_threshold:
+                score += 1
+                if not trade_direction:
+                    trade_direction = 'SHORT'
+
+        # Enter trade if enough conditions are met (default: at least 2 of 3)
+        if score >= self.params['min_score'] and trade_direction is not None:
+            return trade_direction, score
+        return None, score
+
+    def _trade_levels(self, analysis, trade_direction, entry_price, stop_ladders, i):
+        """
+        Stop loss and take profit for a new trade
+
+        Returns:
+            (stop_loss, take_profit)
+        """
+        # Get entry/exit recommendations (from the candlestick patterns, when they point the same way)
+        entry_exit = pattern_entry_exit(analysis, trade_direction)
+
+        # Default risk/reward for daily intervals without patterns (3% stop, 6% target)
+        stop_pct = self.params['stop_loss_pct']
+        target_pct = self.params['take_profit_pct']
+
+        # Set stop loss and take profit based on direction and available data
+        if entry_exit:
+            return float(entry_exit['stop_loss']), float(entry_exit['take_profit'])
+        if stop_ladders:
+            return (float(stop_ladders[trade_direction]['stop_loss'][i]),
+                    float(stop_ladders[trade_direction]['take_profit'][i]))
+
+        if trade_direction == 'LONG':
+            return entry_price * (1 - stop_pct), entry_price * (1 + target_pct)
+        return entry_price * (1 + stop_pct), entry_price * (1 - target_pct)  # SHORT: stop above, target below
+
+    def _open_trade(self, analysis, symbol, market_type, entry_date, entry_price, trade_direction, score,
+                    capital, stop_ladders, i):
+        """Trade record for an entry at bar i"""
+        entry_price = float(entry_price)
+        stop_loss, take_profit = self._trade_levels(analysis, trade_direction, entry_price, stop_ladders, i)
+        if self.intrabar is not None:
+            # Levels stay where they were set from the bar close; the fill pays the spread
+            entry_price = self.intrabar.entry_fill(entry_price, trade_direction)
+
+        # Calculate position size based on risk
+        risk_amount = capital * self.risk_per_trade
+        price_risk = abs(entry_price - stop_loss)
+        max_position = capital * self.params['max_position']
+        position_size = risk_amount / price_risk if price_risk > 0 else max_position
+
+        # Don't put more than max_position (10%) of capital into one trade
+        position_size = min(position_size, max_position)
+
+        ml_prediction = analysis.get('ml_prediction') or {}
+        return {
+            'symbol': symbol,
+            'market_type': market_type,
+            'entry_date': entry_date,
+            'entry_price': entry_price,
+            'stop_loss': stop_loss,
+            'take_profit': take_profit,
+            'direction': trade_direction,
+            'signal': analysis.get('signal', 'HOLD'),
+            'signal_strength': analysis.get('strength', 0),
+            'ml_prediction': ml_prediction.get('direction'),
+            'ml_confidence': ml_prediction.get('confidence'),
+            'position_size': position_size,
+            'risk_amount': risk_amount,
+            'capital_at_entry': capital,
+            'score': score,  # Track entry score
+        }
+
+    @staticmethod
+    def _check_exit(trade, high_price, low_price):
+        """
+        Stop loss / take profit hit by a bar (stop loss checked first)
+
+        Returns:
+            (exit_price, exit_reason) or (None, None)
+        """
+        if trade.get('direction', 'LONG') == 'LONG':
+            # Long position: stop loss below, take profit above
+            if low_price <= trade['stop_loss']:
+                return trade['stop_loss'], 'STOP_LOSS'
+            if high_price >= trade['take_profit']:
+                return trade['take_profit'], 'TAKE_PROFIT'
+        else:
+            # Short position: stop loss above, take profit below
+            if high_price >= trade['stop_loss']:
+                return trade['stop_loss'], 'STOP_LOSS'
+            if low_price <= trade['take_profit']:
+                return trade['take_profit'], 'TAKE_PROFIT'
+        return None, None
+
+    def _intrabar_exit(self, trade, i, high_price, low_price, exit_price, exit_reason):
+        """
+        Exit of a trade at bar i with intrabar resolution and fill costs
+
+        Only a bar touching both levels is refined with finer bars; every
+        other exit keeps the level _check_exit returned.
+
+        Returns:
+            (exit_price, exit_reason)
+        """
+        if trade['direction'] == 'LONG':
+            ambiguous = low_price <= trade['stop_loss'] and high_price >= trade['take_profit']
+        else:
+            ambiguous = high_price >= trade['stop_loss'] and low_price <= trade['take_profit']
+        if ambiguous:
+            exit_price, exit_reason = self.intrabar.first_hit(
+                i, trade['direction'], trade['stop_loss'], trade['take_profit']
+            )
+        return float(self.intrabar.exit_fill(exit_price, trade['direction'], exit_reason)), exit_reason
+
+    @staticmethod
+    def _close_trade(trade, exit_price, exit_reason, exit_date, capital):
+        """
+        Record a trade exit
+
+        Returns:
+            Capital after the trade
+        """
+        # PnL = position_size * (price_change / entry_price)
+        if trade.get('direction', 'LONG') == 'LONG':
+            price_change_pct = (exit_price - trade['entry_price']) / trade['entry_price']
+        else:
+            price_change_pct = (trade['entry_price'] - exit_price) / trade['entry_price']
+        pnl = trade['position_size'] * price_change_pct
+        capital += pnl
+
+        trade['exit_date'] = exit_date
+        trade['exit_price'] = exit_price
+        trade['exit_reason'] = exit_reason
+        trade['pnl'] = pnl
+        trade['pnl_percent'] = (pnl / capital) * 100
+        trade['final_capital'] = capital
+        return capital
+
+    def _open_trade_log(self):
+        """Trade log for the next run (None if disabled)"""
+        if not self.trade_log:
+            return None
+        if self.trade_log.endswith('.jsonl'):
+            return TradeLog(self.trade_log)
+        store = TradeStore(self.trade_log)
+        store.set_info(kind='trade_log')
+        return store
+
+    def _record_trade(self, trade, trades, equity_history):
+        """Add a closed trade to the metrics (and to the in-memory lists unless streaming)"""
+        self.accumulator.add_trade(trade)
+        if not self.streaming:
+            trades.append(trade)
+            equity_history.append((trade['exit_date'], trade['final_capital']))
+
     def analyze_results(self, trades, equity_history):
         """
         Analyze backtest results and calculate metrics
@@ -339,8 +480,12 @@ class Backtester:
             equity_history: List of (date, capital) tuples
 
         Returns:
-            Dictionary with performance metrics
+            Dictionary with performance metrics (the accumulated metrics of the
+            last backtest_symbol run when streaming)
         """
+        if self.streaming:
+            return self.accumulator.metrics()
+
         if not trades:
             return {
                 'error': 'No trades executed',
@@ -484,13 +629,19 @@ class Backtester:
 
     def save_results(self, trades, metrics, filename='backtest_results.json'):
         """
-        Save backtest results to JSON
+        Save backtest results to JSON, or to a columnar TradeStore when the
+        filename ends with '.trades' (much faster to load for large runs)
 
         Args:
             trades: List of trades
             metrics: Metrics dictionary
             filename: Output filename
         """
+        if filename.endswith('.trades'):
+            save_columnar_results(filename, trades, kind='backtest', metrics=metrics)
+            print(f"SUCCESS: Results saved to {filename}")
+            return
+
         results = {
             'metrics': metrics,
             'trades': trades,
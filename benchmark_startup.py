@@ -0,0 +1,84 @@
+"""
+Start-up benchmark
+Measures cold import time and peak memory of the main entry points, with ML
+backends loaded lazily (default) and eagerly (the previous behaviour)
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+
+ENTRY_POINTS = ['app', 'run_analysis', 'backtester']
+
+# Runs in a fresh interpreter so every measurement is a cold start
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+if {eager}:
+    import forex_prediction
+    forex_prediction._load_tree_backends()
+    try:
+        forex_prediction._load_keras_backend()
+    except ImportError:
+        pass  # TensorFlow not installed: eager start-up without the LSTM backend
+import {module}
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    'seconds': elapsed,
+    'max_rss_mb': rss_kb / 1024,
+    'tensorflow_loaded': 'tensorflow' in sys.modules,
+    'sklearn_loaded': 'sklearn' in sys.modules,
+    'xgboost_loaded': 'xgboost' in sys.modules
+}}))
+"""
+
+
+def measure(module, eager, repeats=3):
+    """
+    Import a module in fresh interpreters
+
+    Returns:
+        dict: Best-of-N import time and peak RSS, or an 'error' entry
+    """
+    runs = []
+    for _ in range(repeats):
+        result = subprocess.run(
+            [sys.executable, '-c', PROBE.format(module=module, eager=eager)],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            return {'error': result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed'}
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    best = min(runs, key=lambda run: run['seconds'])
+    return {
+        'seconds': round(best['seconds'], 3),
+        'max_rss_mb': round(best['max_rss_mb'], 1),
+        'tensorflow_loaded': best['tensorflow_loaded'],
+        'sklearn_loaded': best['sklearn_loaded'],
+        'xgboost_loaded': best['xgboost_loaded']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark cold start-up of the entry points')
+    parser.add_argument('--modules', nargs='+', default=ENTRY_POINTS, help='Modules to import')
+    parser.add_argument('--repeats', type=int, default=3, help='Fresh interpreters per measurement')
+    args = parser.parse_args()
+
+    print(f"{'module':<18}{'mode':<8}{'import (s)':>12}{'max RSS (MB)':>14}  ML backends")
+    for module in args.modules:
+        for mode, eager in (('eager', True), ('lazy', False)):
+            stats = measure(module, eager, args.repeats)
+            if 'error' in stats:
+                print(f"{module:<18}{mode:<8}  error: {stats['error']}")
+                continue
+            backends = [name for name in ('tensorflow', 'sklearn', 'xgboost') if stats[f'{name}_loaded']]
+            loaded = '+'.join(backends) or 'none'
+            print(f"{module:<18}{mode:<8}{stats['seconds']:>12.3f}{stats['max_rss_mb']:>14.1f}  {loaded}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,8 +2,43 @@
 Candlestick Pattern Analysis and Entry/Exit Point Calculator
 Analyzes 4-hour charts for trading signals with stop loss and take profit levels
 """
+import threading
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from support_resistance import (SupportResistanceIndex, find_swing_lows, find_swing_highs,
+                                nearest_above, nearest_below)
+
+
+# Pattern metadata in the order analyze_patterns reports them:
+# (name, type, strength, description)
+PATTERN_DEFINITIONS = [
+    ('Bullish Engulfing', 'bullish', 8, 'Strong reversal signal - buyers overwhelm sellers'),
+    ('Bearish Engulfing', 'bearish', 8, 'Strong reversal signal - sellers overwhelm buyers'),
+    ('Doji', 'neutral', 6, 'Indecision in market - potential reversal'),
+    ('Hammer', 'bullish', 7, 'Bullish reversal - rejection of lower prices'),
+    ('Inverted Hammer', 'bullish', 6, 'Potential bullish reversal - needs confirmation'),
+    ('Shooting Star', 'bearish', 7, 'Bearish reversal - rejection of higher prices'),
+    ('Morning Star', 'bullish', 9, 'Very strong bullish reversal pattern'),
+    ('Evening Star', 'bearish', 9, 'Very strong bearish reversal pattern'),
+    ('Three White Soldiers', 'bullish', 9, 'Strong bullish continuation pattern'),
+    ('Three Black Crows', 'bearish', 9, 'Strong bearish continuation pattern'),
+    ('Bullish Harami', 'bullish', 7, 'Bullish reversal - momentum slowing'),
+    ('Bearish Harami', 'bearish', 7, 'Bearish reversal - momentum slowing'),
+    ('Piercing Line', 'bullish', 8, 'Strong bullish reversal signal'),
+    ('Dark Cloud Cover', 'bearish', 8, 'Strong bearish reversal signal'),
+]
+
+# Numeric outputs of the EntryExitCalculator batch APIs
+LEVEL_KEYS = ('entry_price', 'stop_loss', 'take_profit', 'risk_reward_ratio', 'risk_percent')
+
+
+def _shift(values, periods):
+    """Shift a float array forward, padding the start with NaN"""
+    shifted = np.empty_like(values)
+    shifted[:periods] = np.nan
+    shifted[periods:] = values[:-periods]
+    return shifted
 
 
 class CandlePatternAnalyzer:
@@ -44,6 +79,107 @@ class CandlePatternAnalyzer:
 
         return patterns_found
 
+    def scan_patterns(self, df):
+        """
+        Evaluate every candlestick pattern on every bar at once
+
+        Applies the same rules as the _check_* methods, but as array operations
+        over the full history instead of scalar lookups on the last candles.
+        A bar is only flagged when it has the lookback the pattern needs
+        (1 candle for Doji/Hammer/Shooting Star, 2 for engulfing/harami/piercing,
+        3 for stars and soldiers/crows).
+
+        Args:
+            df: DataFrame with OHLC data
+
+        Returns:
+            DataFrame indexed like df with one boolean column per pattern name
+            plus 'bullish_strength', 'bearish_strength' and 'neutral_strength'
+            (summed strength of the patterns found on each bar)
+        """
+        o = df['open'].to_numpy(dtype=float)
+        h = df['high'].to_numpy(dtype=float)
+        l = df['low'].to_numpy(dtype=float)
+        c = df['close'].to_numpy(dtype=float)
+
+        if len(df) == 0:
+            columns = [name for name, _, _, _ in PATTERN_DEFINITIONS]
+            return pd.DataFrame(columns=columns + ['bullish_strength', 'bearish_strength', 'neutral_strength'])
+
+        body = np.abs(c - o)
+        range_size = h - l
+        upper_shadow = h - np.maximum(o, c)
+        lower_shadow = np.minimum(o, c) - l
+        green = c > o
+        red = c < o
+
+        # Previous candle (t-1)
+        p_o, p_h, p_l, p_c = _shift(o, 1), _shift(h, 1), _shift(l, 1), _shift(c, 1)
+        p_body = np.abs(p_c - p_o)
+        p_green = p_c > p_o
+        p_red = p_c < p_o
+        p_mid = (p_o + p_c) / 2
+
+        # Candle before that (t-2)
+        f_o, f_c = _shift(o, 2), _shift(c, 2)
+        f_body = np.abs(f_c - f_o)
+        f_mid = f_o / 2 + f_c / 2
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            body_percentage = np.where(range_size != 0, body / range_size * 100, np.inf)
+
+        signals = {
+            'Bullish Engulfing': p_red & green & (o < p_c) & (c > p_o) & (body > p_body * 1.2),
+            'Bearish Engulfing': p_green & red & (o > p_c) & (c < p_o) & (body > p_body * 1.2),
+            'Doji': body_percentage < 5,
+            'Hammer': (lower_shadow > body * 2) & (upper_shadow < body * 0.3) & (body > 0),
+            'Inverted Hammer': (upper_shadow > body * 2) & (lower_shadow < body * 0.3) & (body > 0),
+            'Shooting Star': (upper_shadow > body * 2) & (lower_shadow < body * 0.3) & red,
+            'Morning Star': (f_c < f_o) & (p_body < f_body * 0.3) & green & (c > f_mid),
+            'Evening Star': (f_c > f_o) & (p_body < f_body * 0.3) & red & (c < f_mid),
+            'Three White Soldiers': (f_c > f_o) & p_green & green & (p_c > f_c) & (c > p_c),
+            'Three Black Crows': (f_c < f_o) & p_red & red & (p_c < f_c) & (c < p_c),
+            'Bullish Harami': p_red & green & (o > p_c) & (c < p_o),
+            'Bearish Harami': p_green & red & (o < p_c) & (c > p_o),
+            'Piercing Line': p_red & green & (o < p_l) & (c > p_mid) & (c < p_o),
+            'Dark Cloud Cover': p_green & red & (o > p_h) & (c < p_mid) & (c > p_o),
+        }
+
+        scan = pd.DataFrame(signals, index=df.index)
+
+        strengths = {'bullish': np.zeros(len(df)), 'bearish': np.zeros(len(df)), 'neutral': np.zeros(len(df))}
+        for name, pattern_type, strength, _ in PATTERN_DEFINITIONS:
+            strengths[pattern_type] += signals[name] * strength
+
+        scan['bullish_strength'] = strengths['bullish']
+        scan['bearish_strength'] = strengths['bearish']
+        scan['neutral_strength'] = strengths['neutral']
+
+        return scan
+
+    def patterns_at(self, scan, position):
+        """
+        Convert one row of scan_patterns output into analyze_patterns format
+
+        Args:
+            scan: DataFrame returned by scan_patterns
+            position: Integer bar position
+
+        Returns:
+            list: Pattern dicts (same order and fields as analyze_patterns)
+        """
+        row = scan.iloc[position]
+        return [
+            {
+                'name': name,
+                'type': pattern_type,
+                'strength': strength,
+                'description': description
+            }
+            for name, pattern_type, strength, description in PATTERN_DEFINITIONS
+            if row[name]
+        ]
+
     def _check_engulfing(self, df):
         """Check for bullish/bearish engulfing patterns"""
         patterns = []
@@ -331,7 +467,7 @@ class CandlePatternAnalyzer:
 
 
 class EntryExitCalculator:
-    def __init__(self):
+    def __init__(self, atr_period=14):
         """
         Initialize Entry/Exit Calculator with dynamic analysis-based recommendations
 
@@ -341,12 +477,27 @@ class EntryExitCalculator:
         - Support/Resistance levels
         - Swing highs/lows
         - Risk/Reward ratios
+
+        Args:
+            atr_period: ATR period used for volatility-based stops
         """
         # These are now maximum caps only, not targets
         self.max_stop_loss_percent = 30  # Maximum acceptable stop loss
         self.min_risk_reward_ratio = 2.0  # Minimum 1:2 risk/reward
-
-    def calculate_entry_points(self, df, patterns, indicators):
+        self.atr_period = atr_period
+        self.level_lookback = 50  # Candles scanned for swing support/resistance
+        self.swing_lookback = 20  # Candles used for swing extremes and pivots
+        self.level_indexes = {}  # level key -> SupportResistanceIndex
+        self.level_lock = threading.Lock()
+
+    def level_index(self, level_key):
+        """SupportResistanceIndex of a series (created on first use)"""
+        index = self.level_indexes.get(level_key)
+        if index is None:
+            index = self.level_indexes[level_key] = SupportResistanceIndex(lookback=self.level_lookback)
+        return index
+
+    def calculate_entry_points(self, df, patterns, indicators, level_key=None):
         """
         Calculate optimal entry, stop loss, and take profit levels
 
@@ -354,28 +505,21 @@ class EntryExitCalculator:
             df: OHLCV DataFrame
             patterns: Detected candlestick patterns
             indicators: Technical indicators
+            level_key: Optional key of df's series (e.g. (symbol, timeframe)); its
+                       SupportResistanceIndex then supplies the swing levels instead
+                       of a scan of the last 50 candles
 
         Returns:
             dict: Entry points with stop loss and take profit levels
         """
-        current_price = df['close'].iloc[-1]
-
         # Determine trade direction based on patterns
         bullish_strength = sum(p['strength'] for p in patterns if p['type'] == 'bullish')
         bearish_strength = sum(p['strength'] for p in patterns if p['type'] == 'bearish')
 
         if bullish_strength > bearish_strength and bullish_strength >= 7:
             trade_type = 'LONG'
-            entry_price = current_price
-            stop_loss = self._calculate_stop_loss_long(df, entry_price)
-            take_profit = self._calculate_take_profit_long(entry_price, stop_loss)
-
         elif bearish_strength > bullish_strength and bearish_strength >= 7:
             trade_type = 'SHORT'
-            entry_price = current_price
-            stop_loss = self._calculate_stop_loss_short(df, entry_price)
-            take_profit = self._calculate_take_profit_short(entry_price, stop_loss)
-
         else:
             return {
                 'trade_type': 'NO TRADE',
@@ -385,11 +529,19 @@ class EntryExitCalculator:
                 'take_profit': None
             }
 
-        # Calculate risk/reward ratio
+        # ATR, swing levels and 20-candle extremes are computed once and shared
+        # by the stop loss, its reasoning and the key levels
+        context = self._build_context(df, level_key)
+        entry_price = context['current_price']
+
         if trade_type == 'LONG':
+            stop_loss = self._calculate_stop_loss_long(df, entry_price, context)
+            take_profit = self._calculate_take_profit_long(entry_price, stop_loss)
             risk = entry_price - stop_loss
             reward = take_profit - entry_price
         else:  # SHORT
+            stop_loss = self._calculate_stop_loss_short(df, entry_price, context)
+            take_profit = self._calculate_take_profit_short(entry_price, stop_loss)
             risk = stop_loss - entry_price
             reward = entry_price - take_profit
 
@@ -399,7 +551,7 @@ class EntryExitCalculator:
         risk_percent = abs((stop_loss - entry_price) / entry_price) * 100
 
         # Generate stop loss and take profit reasoning
-        sl_reasoning = self._generate_sl_reasoning(df, entry_price, stop_loss, trade_type)
+        sl_reasoning = self._generate_sl_reasoning(df, entry_price, stop_loss, trade_type, context)
         tp_reasoning = self._generate_tp_reasoning(entry_price, stop_loss, take_profit, trade_type)
 
         return {
@@ -411,12 +563,302 @@ class EntryExitCalculator:
             'risk_percent': round(risk_percent, 2),
             'potential_profit_percent': round(abs((take_profit - entry_price) / entry_price) * 100, 2),
             'recommendation': self._generate_recommendation(trade_type, patterns, risk_reward_ratio),
-            'key_levels': self._identify_key_levels(df, entry_price),
+            'key_levels': self._identify_key_levels(df, entry_price, context),
             'stop_loss_reasoning': sl_reasoning,
             'take_profit_reasoning': tp_reasoning
         }
 
-    def _calculate_stop_loss_long(self, df, entry_price):
+    def calculate_levels_batch(self, frames, trade_types):
+        """
+        Entry/stop loss/take profit for many symbols at once
+
+        Args:
+            frames: List of OHLCV DataFrames (one per symbol)
+            trade_types: 'LONG'/'SHORT' per frame, or one value for all frames
+                         (anything else yields NaN levels)
+
+        Returns:
+            dict: numpy arrays 'entry_price', 'stop_loss', 'take_profit',
+                  'risk_reward_ratio' and 'risk_percent' aligned with frames
+        """
+        if isinstance(trade_types, str):
+            trade_types = [trade_types] * len(frames)
+        levels = {key: np.full(len(frames), np.nan) for key in LEVEL_KEYS}
+
+        # A frame's levels only read its last `tail` candles, so frames that long
+        # are stacked into one history and evaluated in a single vectorized pass
+        tail = max(self.level_lookback, self.swing_lookback, self.atr_period + 1)
+        stacked = [i for i, df in enumerate(frames) if len(df) >= tail]
+        groups = [(stacked, pd.DataFrame({
+            column: np.concatenate([frames[i][column].to_numpy(dtype=float)[-tail:] for i in stacked])
+            for column in ('high', 'low', 'close')
+        }), np.arange(1, len(stacked) + 1) * tail - 1)] if stacked else []
+        groups += [([i], df, [len(df) - 1]) for i, df in enumerate(frames) if 0 < len(df) < tail]
+
+        for rows, df, positions in groups:
+            group_levels = self._levels_at(df, positions, [trade_types[i] for i in rows])
+            for key in LEVEL_KEYS:
+                levels[key][rows] = group_levels[key]
+        return levels
+
+    def calculate_levels_history(self, df, positions, trade_types):
+        """
+        Entry/stop loss/take profit as of many historical bars of one frame
+
+        Each bar only sees the candles up to and including itself, so the
+        result at position i equals calculate_entry_points on df.iloc[:i + 1].
+
+        Args:
+            df: OHLCV DataFrame
+            positions: Integer bar positions to evaluate
+            trade_types: 'LONG'/'SHORT' per position, or one value for all
+
+        Returns:
+            dict: numpy arrays as in calculate_levels_batch, aligned with positions
+        """
+        positions = np.asarray(positions, dtype=int)
+        if isinstance(trade_types, str):
+            trade_types = [trade_types] * len(positions)
+        end = positions.max() + 1 if len(positions) else 0
+        return self._levels_at(df.iloc[:end], positions, trade_types)
+
+    def _levels_at(self, df, positions, trade_types):
+        """calculate_levels_vectorized at some bars of df, with one trade type per bar"""
+        positions = np.asarray(positions, dtype=int)
+        trade_types = np.asarray(trade_types, dtype=object)
+        levels = {key: np.full(len(positions), np.nan) for key in LEVEL_KEYS}
+
+        for trade_type in ('LONG', 'SHORT'):
+            mask = trade_types == trade_type
+            if mask.any():
+                ladder = self.calculate_levels_vectorized(df, trade_type)
+                for key in LEVEL_KEYS:
+                    levels[key][mask] = ladder[key][positions[mask]]
+        return levels
+
+    def calculate_levels_vectorized(self, df, trade_types='LONG'):
+        """
+        Stop loss / take profit ladder for every bar of a history at once
+
+        Builds the candidate matrix (ATR, support/resistance, swing extreme,
+        volatility) for all bars, picks the stop with masked reductions and
+        applies the take profit R-multiple tiers without a per-bar Python call.
+        Bar i only uses candles up to and including itself, matching
+        calculate_entry_points on df.iloc[:i + 1].
+
+        Args:
+            df: OHLCV DataFrame
+            trade_types: 'LONG'/'SHORT', or an array with one value per bar
+
+        Returns:
+            dict: numpy arrays (one value per bar) 'entry_price', 'stop_loss',
+                  'take_profit', 'risk_reward_ratio', 'risk_percent' and
+                  'stop_method' (NaN / None where the bar has no trade type)
+        """
+        high = df['high'].to_numpy(dtype=float)
+        low = df['low'].to_numpy(dtype=float)
+        close = df['close'].to_numpy(dtype=float)
+        n = len(close)
+
+        if isinstance(trade_types, str):
+            trade_types = np.full(n, trade_types, dtype=object)
+        else:
+            trade_types = np.asarray(trade_types, dtype=object)
+
+        atr = self._atr_series(high, low, close)
+        levels = {}
+
+        for trade_type in ('LONG', 'SHORT'):
+            mask = trade_types == trade_type
+            if mask.any():
+                levels[trade_type] = self._stop_ladder(high, low, close, atr, trade_type == 'LONG')
+
+        result = {key: np.full(n, np.nan) for key in LEVEL_KEYS}
+        result['stop_method'] = np.full(n, None, dtype=object)
+
+        for trade_type, ladder in levels.items():
+            mask = trade_types == trade_type
+            for key, values in ladder.items():
+                result[key][mask] = values[mask]
+
+        return result
+
+    def _atr_series(self, high, low, close):
+        """ATR as of every bar (falls back to the bar's range before `atr_period` bars)"""
+        prev_close = np.concatenate([[np.nan], close[:-1]])
+        tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+        atr = high - low
+        if len(tr) >= self.atr_period:
+            windows = sliding_window_view(tr, self.atr_period)
+            rolling = windows.mean(axis=1)
+            valid = ~np.isnan(windows).any(axis=1)
+            tail = atr[self.atr_period - 1:]
+            atr[self.atr_period - 1:] = np.where(valid, rolling, tail)
+        return atr
+
+    def _stop_ladder(self, high, low, close, atr, is_long):
+        """Candidate matrix, stop selection and take profit tiers for one direction"""
+        n = len(close)
+        entry = close
+        sign = -1 if is_long else 1  # Stops sit below entry for longs, above for shorts
+
+        # Structural levels: swing points inside each bar's 50-candle window
+        # (a swing needs two candles on each side, so bar t sees swings at
+        # positions t-47 .. t-2)
+        prices = low if is_long else high
+        swings = find_swing_lows(prices) if is_long else find_swing_highs(prices)
+        span = self.level_lookback - 4
+        empty = -np.inf if is_long else np.inf
+        swing_values = np.where(swings, prices, empty)
+        padded = np.concatenate([np.full(span + 1, empty), swing_values])
+        windows = sliding_window_view(padded, span)[:n]  # Row t covers positions t-47 .. t-2
+        if is_long:
+            candidates = np.where(windows < entry[:, None], windows, empty)
+            structure = candidates.max(axis=1)
+            has_structure = np.isfinite(structure) & (structure != 0) & (structure < entry)
+        else:
+            candidates = np.where(windows > entry[:, None], windows, empty)
+            structure = candidates.min(axis=1)
+            has_structure = np.isfinite(structure) & (structure != 0) & (structure > entry)
+
+        # Swing extreme of the last 20 candles
+        extreme_window = sliding_window_view(
+            np.concatenate([np.full(self.swing_lookback - 1, -empty), prices]), self.swing_lookback
+        )
+        extreme = extreme_window.min(axis=1) if is_long else extreme_window.max(axis=1)
+        has_extreme = extreme < entry if is_long else extreme > entry
+
+        volatility_percent = np.clip((atr / entry) * 100 * 1.5, 5, 10)
+        buffer = 0.98 if is_long else 1.02
+
+        # Candidate matrix in the scalar implementation's order
+        methods = ['atr', 'support' if is_long else 'resistance',
+                   'swing_low' if is_long else 'swing_high', 'volatility']
+        atr_stop = entry + sign * (2 * atr)
+        matrix = np.column_stack([
+            atr_stop,
+            structure * buffer,
+            extreme * buffer,
+            entry * (1 + sign * volatility_percent / 100)
+        ])
+        present = np.column_stack([np.ones(n, dtype=bool), has_structure, has_extreme, np.ones(n, dtype=bool)])
+
+        # First accepted candidate after sorting = tightest stop with a 3-30% loss
+        if is_long:
+            loss_percent = np.abs((entry[:, None] - matrix) / entry[:, None]) * 100
+        else:
+            loss_percent = np.abs((matrix - entry[:, None]) / entry[:, None]) * 100
+        acceptable = present & (loss_percent >= 3) & (loss_percent <= self.max_stop_loss_percent)
+
+        masked = np.where(acceptable, sign * matrix, np.inf)
+        choice = masked.argmin(axis=1)
+        any_acceptable = acceptable.any(axis=1)
+        chosen = matrix[np.arange(n), choice]
+        stop = np.where(any_acceptable, chosen, atr_stop)
+        method = np.array(methods, dtype=object)[np.where(any_acceptable, choice, 0)]
+
+        # Final safety check - ensure stop loss is reasonable (max 30% loss)
+        stop = np.maximum(stop, entry * 0.70) if is_long else np.minimum(stop, entry * 1.30)
+
+        # Take profit tiers by risk size (3R tight, 2.5R medium, 2R wide)
+        risk = (entry - stop) if is_long else (stop - entry)
+        risk_percent_tier = (risk / entry) * 100
+        multiple = np.where(risk_percent_tier <= 5, 3.0,
+                            np.where(risk_percent_tier <= 10, 2.5, self.min_risk_reward_ratio))
+        if is_long:
+            take_profit = np.minimum(entry + risk * multiple, entry * 2.0)
+            reward = take_profit - entry
+        else:
+            take_profit = np.maximum(entry - risk * multiple, entry * 0.50)
+            reward = entry - take_profit
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            risk_reward = np.where(risk > 0, reward / risk, 0.0)
+
+        return {
+            'entry_price': entry.copy(),
+            'stop_loss': stop,
+            'take_profit': take_profit,
+            'risk_reward_ratio': risk_reward,
+            'risk_percent': np.abs((stop - entry) / entry) * 100,
+            'stop_method': method
+        }
+
+    def _build_context(self, df, level_key=None):
+        """
+        Per-frame values shared by every stop loss, take profit and key level step
+
+        Args:
+            df: OHLCV DataFrame
+            level_key: Optional key of the SupportResistanceIndex holding df's levels
+
+        Returns:
+            dict: current price, ATR, swing support/resistance levels,
+                  recent 20-candle extremes and pivot inputs
+        """
+        high = df['high'].to_numpy(dtype=float)
+        low = df['low'].to_numpy(dtype=float)
+        close = df['close'].to_numpy(dtype=float)
+        if level_key is None:
+            return self._context_from_arrays(high, low, close)
+
+        context = self._context_from_arrays(high, low, close, scan_levels=False)
+        with self.level_lock:
+            index = self.level_index(level_key)
+            start, end = index.update(df)
+            supports, resistances = index.levels_at(end, start)
+            # Copies, so later updates of the index don't change this frame's levels
+            context['supports'], context['resistances'] = list(supports), list(resistances)
+        context['levels_sorted'] = True
+        return context
+
+    def _context_from_arrays(self, high, low, close, end=None, scan_levels=True):
+        """
+        Build the shared context from OHLC arrays, looking only at bars before `end`
+
+        Only the last few dozen candles are touched, so the cost per bar does
+        not grow with the length of the history. With scan_levels=False the
+        swing levels are left to a level index (see _build_context).
+        """
+        end = len(close) if end is None else end
+
+        # ATR from the last `atr_period` true ranges
+        start = max(0, end - self.atr_period - 1)
+        h = high[start:end]
+        l = low[start:end]
+        c = close[start:end]
+        prev_close = np.concatenate([[np.nan], c[:-1]])
+        tr = np.fmax(np.fmax(h - l, np.abs(h - prev_close)), np.abs(l - prev_close))
+        if len(tr) >= self.atr_period and not np.isnan(tr[-self.atr_period:]).any():
+            atr = tr[-self.atr_period:].mean()
+        else:
+            atr = high[end - 1] - low[end - 1]
+
+        # Swing levels over the last 50 candles
+        supports = resistances = None
+        if scan_levels:
+            level_start = max(0, end - self.level_lookback)
+            level_lows = low[level_start:end]
+            level_highs = high[level_start:end]
+            supports = level_lows[find_swing_lows(level_lows)]
+            resistances = level_highs[find_swing_highs(level_highs)]
+
+        # Extremes and average close of the last 20 candles
+        swing_start = max(0, end - self.swing_lookback)
+
+        return {
+            'current_price': close[end - 1],
+            'atr': atr,
+            'supports': supports,
+            'resistances': resistances,
+            'levels_sorted': False,
+            'recent_low': low[swing_start:end].min(),
+            'recent_high': high[swing_start:end].max(),
+            'recent_close_mean': close[swing_start:end].mean()
+        }
+
+    def _calculate_stop_loss_long(self, df, entry_price, context=None):
         """
         Calculate recommended stop loss for LONG position using multiple methods
 
@@ -428,7 +870,8 @@ class EntryExitCalculator:
 
         Returns the most appropriate stop loss based on market conditions
         """
-        atr = self._calculate_atr(df)
+        context = context or self._build_context(df)
+        atr = context['atr']
         stop_losses = []
 
         # Method 1: ATR-based stop loss (2 x ATR) - Adapts to volatility
@@ -436,13 +879,13 @@ class EntryExitCalculator:
         stop_losses.append(('atr', atr_stop))
 
         # Method 2: Support level based (using recent consolidation areas)
-        support_stop = self._find_nearest_support(df, entry_price)
+        support_stop = self._find_nearest_support(df, entry_price, context)
         if support_stop and support_stop < entry_price:
             support_stop_level = support_stop * 0.98  # 2% below support for buffer
             stop_losses.append(('support', support_stop_level))
 
         # Method 3: Swing low based (recent 20 candles)
-        recent_low = df['low'].tail(20).min()
+        recent_low = context['recent_low']
         if recent_low < entry_price:
             swing_low_stop = recent_low * 0.98  # 2% below swing low
             stop_losses.append(('swing_low', swing_low_stop))
@@ -473,7 +916,7 @@ class EntryExitCalculator:
 
         return final_stop
 
-    def _calculate_stop_loss_short(self, df, entry_price):
+    def _calculate_stop_loss_short(self, df, entry_price, context=None):
         """
         Calculate recommended stop loss for SHORT position using multiple methods
 
@@ -485,7 +928,8 @@ class EntryExitCalculator:
 
         Returns the most appropriate stop loss based on market conditions
         """
-        atr = self._calculate_atr(df)
+        context = context or self._build_context(df)
+        atr = context['atr']
         stop_losses = []
 
         # Method 1: ATR-based stop loss (2 x ATR) - Adapts to volatility
@@ -493,13 +937,13 @@ class EntryExitCalculator:
         stop_losses.append(('atr', atr_stop))
 
         # Method 2: Resistance level based
-        resistance_stop = self._find_nearest_resistance(df, entry_price)
+        resistance_stop = self._find_nearest_resistance(df, entry_price, context)
         if resistance_stop and resistance_stop > entry_price:
             resistance_stop_level = resistance_stop * 1.02  # 2% above resistance
             stop_losses.append(('resistance', resistance_stop_level))
 
         # Method 3: Swing high based (recent 20 candles)
-        recent_high = df['high'].tail(20).max()
+        recent_high = context['recent_high']
         if recent_high > entry_price:
             swing_high_stop = recent_high * 1.02  # 2% above swing high
             stop_losses.append(('swing_high', swing_high_stop))
@@ -611,12 +1055,14 @@ class EntryExitCalculator:
 
         return final_tp
 
-    def _identify_key_levels(self, df, current_price):
+    def _identify_key_levels(self, df, current_price, context=None):
         """Identify support and resistance levels"""
+        context = context or self._build_context(df)
+
         # Calculate pivot points
-        high = df['high'].tail(20).max()
-        low = df['low'].tail(20).min()
-        close = df['close'].tail(20).mean()
+        high = context['recent_high']
+        low = context['recent_low']
+        close = context['recent_close_mean']
 
         pivot = (high + low + close) / 3
         r1 = 2 * pivot - low
@@ -650,92 +1096,65 @@ class EntryExitCalculator:
 
         return recommendation
 
-    def _calculate_atr(self, df, period=14):
-        """
-        Calculate Average True Range (ATR) for volatility-based stops
-
-        Args:
-            df: OHLCV DataFrame
-            period: ATR period (default 14)
-
-        Returns:
-            float: Current ATR value
-        """
-        high = df['high']
-        low = df['low']
-        close = df['close']
-
-        # Calculate True Range
-        tr1 = high - low
-        tr2 = abs(high - close.shift())
-        tr3 = abs(low - close.shift())
-
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-
-        # Calculate ATR (simple moving average of TR)
-        atr = tr.rolling(window=period).mean()
-
-        return atr.iloc[-1] if not pd.isna(atr.iloc[-1]) else (df['high'].iloc[-1] - df['low'].iloc[-1])
-
-    def _find_nearest_support(self, df, current_price):
+    def _find_nearest_support(self, df, current_price, context=None):
         """
         Find nearest support level below current price
 
         Args:
             df: OHLCV DataFrame
             current_price: Current entry price
+            context: Optional shared context from _build_context
 
         Returns:
             float: Support level or None
         """
-        # Look at recent lows in the last 50 candles
-        lows = df['low'].tail(50)
+        context = context or self._build_context(df)
+
+        # Sorted levels from a level index: bisect
+        if context['levels_sorted']:
+            return nearest_below(context['supports'], current_price)
 
-        # Find local minima (support levels)
-        support_levels = []
-        for i in range(2, len(lows) - 2):
-            if lows.iloc[i] < lows.iloc[i-1] and lows.iloc[i] < lows.iloc[i-2] and \
-               lows.iloc[i] < lows.iloc[i+1] and lows.iloc[i] < lows.iloc[i+2]:
-                support_levels.append(lows.iloc[i])
+        # Swing lows of the last 50 candles
+        support_levels = context['supports']
 
         # Find the nearest support below current price
-        supports_below = [s for s in support_levels if s < current_price]
+        supports_below = support_levels[support_levels < current_price]
 
-        if supports_below:
-            return max(supports_below)  # Nearest support below
+        if len(supports_below):
+            return supports_below.max()  # Nearest support below
 
         return None
 
-    def _find_nearest_resistance(self, df, current_price):
+    def _find_nearest_resistance(self, df, current_price, context=None):
         """
         Find nearest resistance level above current price
 
         Args:
             df: OHLCV DataFrame
             current_price: Current entry price
+            context: Optional shared context from _build_context
 
         Returns:
             float: Resistance level or None
         """
-        # Look at recent highs in the last 50 candles
-        highs = df['high'].tail(50)
+        context = context or self._build_context(df)
+
+        # Sorted levels from a level index: bisect
+        if context['levels_sorted']:
+            return nearest_above(context['resistances'], current_price)
 
-        # Find local maxima (resistance levels)
-        resistance_levels = []
-        for i in range(2, len(highs) - 2):
-            if highs.iloc[i] > highs.iloc[i-1] and highs.iloc[i] > highs.iloc[i-2] and \
-               highs.iloc[i] > highs.iloc[i+1] and highs.iloc[i] > highs.iloc[i+2]:
-                resistance_levels.append(highs.iloc[i])
+        # Swing highs of the last 50 candles
+        resistance_levels = context['resistances']
 
         # Find the nearest resistance above current price
-        resistances_above = [r for r in resistance_levels if r > current_price]
+        resistances_above = resistance_levels[resistance_levels > current_price]
 
-        if resistances_above:
-            return min(resistances_above)  # Nearest resistance above
+        if len(resistances_above):
+            return resistances_above.min()  # Nearest resistance above
 
         return None
 
-    def _generate_sl_reasoning(self, df, entry_price, stop_loss, trade_type):
+    def _generate_sl_reasoning(self, df, entry_price, stop_loss, trade_type, context=None):
         """
         Generate reasoning for stop loss placement
 
@@ -744,18 +1163,20 @@ class EntryExitCalculator:
             entry_price: Entry price
             stop_loss: Calculated stop loss
             trade_type: LONG or SHORT
+            context: Optional shared context from _build_context
 
         Returns:
             str: Stop loss reasoning
         """
-        atr = self._calculate_atr(df)
+        context = context or self._build_context(df)
+        atr = context['atr']
         risk_percent = abs((stop_loss - entry_price) / entry_price) * 100
 
         reasons = []
 
         if trade_type == 'LONG':
-            recent_low = df['low'].tail(20).min()
-            support = self._find_nearest_support(df, entry_price)
+            recent_low = context['recent_low']
+            support = self._find_nearest_support(df, entry_price, context)
 
             # Check which method was primarily used
             atr_stop = entry_price - (2 * atr)
@@ -770,8 +1191,8 @@ class EntryExitCalculator:
                 reasons.append(f"Below recent swing low at ${recent_low:.2f}")
 
         else:  # SHORT
-            recent_high = df['high'].tail(20).max()
-            resistance = self._find_nearest_resistance(df, entry_price)
+            recent_high = context['recent_high']
+            resistance = self._find_nearest_resistance(df, entry_price, context)
 
             atr_stop = entry_price + (2 * atr)
 
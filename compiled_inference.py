@@ -0,0 +1,409 @@
+"""
+Compiled Ensemble Inference
+Exports the trained RF/GB/XGB trees and the LSTM of a ForexPredictor to flat
+NumPy arrays and evaluates them without scikit-learn, XGBoost or TensorFlow
+"""
+import json
+import os
+import numpy as np
+
+
+COMPILED_FILE = 'compiled.npz'
+
+
+class _ForestBuilder:
+    """Accumulates trees from several models into one flat node table"""
+
+    def __init__(self, n_classes):
+        self.n_classes = n_classes
+        self.left = []
+        self.right = []
+        self.feature = []
+        self.threshold = []
+        self.missing_left = []
+        self.leaf_values = []
+        self.roots = []
+        self.size = 0
+
+    def add_tree(self, left, right, feature, threshold, missing_left, leaf_values):
+        """
+        Append one tree (child indices local to the tree, -1 for leaves)
+
+        Splits follow the scikit-learn convention: go left when x <= threshold.
+        """
+        offset = self.size
+        left = np.asarray(left, dtype=np.int64)
+        right = np.asarray(right, dtype=np.int64)
+        self.left.append(np.where(left >= 0, left + offset, -1))
+        self.right.append(np.where(right >= 0, right + offset, -1))
+        self.feature.append(np.asarray(feature, dtype=np.int64))
+        self.threshold.append(np.asarray(threshold, dtype=np.float64))
+        self.missing_left.append(np.asarray(missing_left, dtype=bool))
+        self.leaf_values.append(np.asarray(leaf_values, dtype=np.float64).reshape(len(left), self.n_classes))
+        self.roots.append(offset)
+        self.size += len(left)
+
+    def arrays(self):
+        """Concatenated node arrays"""
+        return {
+            'left': np.concatenate(self.left),
+            'right': np.concatenate(self.right),
+            'feature': np.maximum(np.concatenate(self.feature), 0),
+            'threshold': np.concatenate(self.threshold),
+            'missing_left': np.concatenate(self.missing_left),
+            'leaf_values': np.concatenate(self.leaf_values),
+            'roots': np.array(self.roots, dtype=np.int64)
+        }
+
+
+def _add_sklearn_tree(builder, tree, leaf_values):
+    """Add a fitted sklearn Tree object with precomputed per-node leaf values"""
+    builder.add_tree(
+        tree.children_left,
+        tree.children_right,
+        tree.feature,
+        tree.threshold,
+        np.zeros(tree.node_count, dtype=bool),
+        leaf_values
+    )
+
+
+def _add_xgboost_tree(builder, nodes, class_index, n_margins):
+    """Add one tree from Booster.trees_to_dataframe() (nodes of a single tree)"""
+    node_ids = nodes['Node'].to_numpy()
+    position = {node_id: i for i, node_id in enumerate(node_ids)}
+    n = len(node_ids)
+
+    is_leaf = (nodes['Feature'] == 'Leaf').to_numpy()
+    left = np.full(n, -1)
+    right = np.full(n, -1)
+    feature = np.zeros(n, dtype=np.int64)
+    threshold = np.zeros(n)
+    missing_left = np.zeros(n, dtype=bool)
+    leaf_values = np.zeros((n, builder.n_classes))
+
+    for i, row in enumerate(nodes.itertuples(index=False)):
+        if is_leaf[i]:
+            leaf_values[i, class_index if n_margins > 1 else 0] = row.Gain
+            continue
+        yes = position[int(row.Yes.split('-')[1])]
+        no = position[int(row.No.split('-')[1])]
+        left[i] = yes
+        right[i] = no
+        feature[i] = int(str(row.Feature).lstrip('f'))
+        # XGBoost goes left when x < split (float32); the largest float32
+        # below the split turns that into the x <= threshold convention
+        split = np.float32(row.Split)
+        threshold[i] = float(np.nextafter(split, np.float32(-np.inf)))
+        missing_left[i] = row.Missing == row.Yes
+
+    builder.add_tree(left, right, feature, threshold, missing_left, leaf_values)
+
+
+def _leaf_nodes(arrays, roots, X):
+    """Leaf reached in every tree (columns) for every row of X"""
+    # Trees were fitted on float32 inputs
+    X = np.asarray(X, dtype=np.float32).astype(np.float64)
+    rows = np.arange(len(X))[:, None]
+    node = np.broadcast_to(roots, (len(X), len(roots))).copy()
+
+    left = arrays['left']
+    right = arrays['right']
+    feature = arrays['feature']
+    threshold = arrays['threshold']
+    missing_left = arrays['missing_left']
+
+    # One step down every tree per iteration (bounded by the deepest tree)
+    while True:
+        active = left[node] >= 0
+        if not active.any():
+            break
+        value = X[rows, feature[node]]
+        go_left = (value <= threshold[node]) | (np.isnan(value) & missing_left[node])
+        node = np.where(active, np.where(go_left, left[node], right[node]), node)
+
+    return node
+
+
+def _tree_sums(arrays, roots, X):
+    """Sum of leaf values over the given trees for every row of X"""
+    return arrays['leaf_values'][_leaf_nodes(arrays, roots, X)].sum(axis=1)
+
+
+def _softmax(z):
+    z = z - z.max(axis=-1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def _margin_to_proba(margin, n_margins):
+    """Class probabilities from raw scores (softmax, or sigmoid for binary models)"""
+    if n_margins == 1:
+        p = _sigmoid(margin[:, 0])
+        return np.column_stack([1 - p, p])
+    return _softmax(margin)
+
+
+def _export_lstm(model):
+    """LSTM/Dense layer specs and weights of a Keras Sequential model"""
+    layers = []
+    weights = {}
+    for layer in model.layers:
+        kind = layer.__class__.__name__
+        if kind == 'Dropout':
+            continue  # Inactive at inference
+        params = layer.get_weights()
+        if kind == 'LSTM':
+            config = layer.get_config()
+            if config.get('activation', 'tanh') != 'tanh' or config.get('recurrent_activation', 'sigmoid') != 'sigmoid':
+                raise ValueError(f"Unsupported LSTM activations in layer {layer.name}")
+            layers.append({'type': 'lstm', 'return_sequences': bool(config.get('return_sequences', False))})
+        elif kind == 'Dense':
+            layers.append({'type': 'dense', 'activation': layer.get_config().get('activation', 'linear')})
+        else:
+            raise ValueError(f"Unsupported layer type for compiled inference: {kind}")
+        for j, param in enumerate(params):
+            weights[f'lstm_{len(layers) - 1}_{j}'] = np.asarray(param, dtype=np.float32)
+    return layers, weights
+
+
+def compile_predictor(predictor):
+    """
+    Export a trained ForexPredictor to flat NumPy arrays
+
+    Args:
+        predictor: Trained ForexPredictor (models loaded)
+
+    Returns:
+        dict: Arrays ready for np.savez / CompiledEnsemble
+    """
+    if not predictor.is_trained:
+        raise ValueError("Predictor is not trained")
+
+    rf = predictor.rf_model
+    gb = predictor.gb_model
+    xgb_model = predictor.xgb_model
+    classes = np.asarray(rf.classes_)
+    n_classes = len(classes)
+    n_features = len(predictor.scaler.mean_)
+    probe = np.zeros((4, n_features))
+
+    builder = _ForestBuilder(n_classes)
+    model_ranges = {}
+
+    # Random forest: average of normalized leaf class distributions
+    start = len(builder.roots)
+    for estimator in rf.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, :]
+        totals = value.sum(axis=1, keepdims=True)
+        proba = np.divide(value, totals, out=np.zeros_like(value), where=totals > 0)
+        _add_sklearn_tree(builder, tree, proba / len(rf.estimators_))
+    model_ranges['rf'] = (start, len(builder.roots))
+
+    # Gradient boosting: learning_rate * leaf value per class, plus a constant init score
+    start = len(builder.roots)
+    gb_margins = gb.estimators_.shape[1]
+    for stage in gb.estimators_:
+        for k, estimator in enumerate(stage):
+            tree = estimator.tree_
+            values = np.zeros((tree.node_count, n_classes))
+            values[:, k] = tree.value[:, 0, 0] * gb.learning_rate
+            _add_sklearn_tree(builder, tree, values)
+    model_ranges['gb'] = (start, len(builder.roots))
+
+    # XGBoost: one tree per class per round (softprob) or per round (binary)
+    start = len(builder.roots)
+    trees = xgb_model.get_booster().trees_to_dataframe()
+    xgb_margins = 1 if n_classes == 2 else n_classes
+    for tree_id, nodes in trees.groupby('Tree', sort=True):
+        _add_xgboost_tree(builder, nodes.reset_index(drop=True), tree_id % xgb_margins, xgb_margins)
+    model_ranges['xgb'] = (start, len(builder.roots))
+
+    arrays = builder.arrays()
+
+    # Constant offsets (GB init score, XGB base score) recovered from the
+    # libraries' own raw outputs so no private attributes are needed
+    def offset(name, raw, n_margins):
+        first, last = model_ranges[name]
+        sums = _tree_sums(arrays, arrays['roots'][first:last], probe)[:, :n_margins]
+        return (np.asarray(raw, dtype=np.float64).reshape(len(probe), n_margins) - sums).mean(axis=0)
+
+    gb_bias = offset('gb', gb.decision_function(probe), gb_margins)
+    xgb_bias = offset('xgb', xgb_model.predict(probe, output_margin=True), xgb_margins)
+
+    compiled = dict(arrays)
+    compiled.update({
+        'classes': classes,
+        'model_ranges': np.array([model_ranges[name] for name in ('rf', 'gb', 'xgb')], dtype=np.int64),
+        'margins': np.array([gb_margins, xgb_margins], dtype=np.int64),
+        'gb_bias': gb_bias,
+        'xgb_bias': xgb_bias,
+        'scaler_mean': np.asarray(predictor.scaler.mean_, dtype=np.float64),
+        'scaler_scale': np.asarray(predictor.scaler.scale_, dtype=np.float64),
+        'sequence_length': np.array([predictor.sequence_length]),
+    })
+
+    if predictor.feature_mean is not None:
+        compiled['feature_mean'] = np.asarray(predictor.feature_mean, dtype=np.float64)
+        compiled['feature_std'] = np.asarray(predictor.feature_std, dtype=np.float64)
+
+    if predictor.lstm_trained and predictor.lstm_model is not None:
+        layers, weights = _export_lstm(predictor.lstm_model)
+        compiled.update(weights)
+        compiled['lstm_layers'] = np.array([json.dumps(layers)])
+        compiled['lstm_scaler_mean'] = np.asarray(predictor.lstm_scaler.mean_, dtype=np.float64)
+        compiled['lstm_scaler_scale'] = np.asarray(predictor.lstm_scaler.scale_, dtype=np.float64)
+
+    return compiled
+
+
+def export_compiled(predictor, directory):
+    """
+    Write the compiled form of a trained predictor next to its models
+
+    Returns:
+        str: Path of the written file
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, COMPILED_FILE)
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, **compile_predictor(predictor))
+    os.replace(tmp_path, path)
+    return path
+
+
+class CompiledEnsemble:
+    """
+    NumPy-only evaluation of a compiled RF/GB/XGB (+ LSTM) ensemble
+    """
+
+    def __init__(self, arrays):
+        """
+        Args:
+            arrays: Mapping produced by compile_predictor (or a loaded npz)
+        """
+        self.arrays = {key: np.asarray(arrays[key]) for key in arrays}
+        self.classes_ = self.arrays['classes']
+        self.n_classes = len(self.classes_)
+        self.model_ranges = [tuple(r) for r in self.arrays['model_ranges']]
+        self.gb_margins, self.xgb_margins = (int(m) for m in self.arrays['margins'])
+        self.sequence_length = int(self.arrays['sequence_length'][0])
+        self.feature_mean = self.arrays.get('feature_mean')
+        self.feature_std = self.arrays.get('feature_std')
+
+        self.lstm_layers = []
+        if 'lstm_layers' in self.arrays:
+            for i, spec in enumerate(json.loads(str(self.arrays['lstm_layers'][0]))):
+                params = []
+                j = 0
+                while f'lstm_{i}_{j}' in self.arrays:
+                    params.append(self.arrays[f'lstm_{i}_{j}'].astype(np.float64))
+                    j += 1
+                self.lstm_layers.append((spec, params))
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Load a compiled ensemble from a model directory
+
+        Returns:
+            CompiledEnsemble or None if the directory has no compiled export
+        """
+        path = os.path.join(directory, COMPILED_FILE)
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            return cls({key: data[key] for key in data.files})
+
+    @property
+    def has_lstm(self):
+        return bool(self.lstm_layers)
+
+    def _scale(self, X, prefix='scaler'):
+        return (X - self.arrays[f'{prefix}_mean']) / self.arrays[f'{prefix}_scale']
+
+    def tree_probabilities(self, features):
+        """
+        Per-model class probabilities for scaled-on-the-fly feature rows
+
+        Returns:
+            tuple: (rf_proba, gb_proba, xgb_proba), each of shape (rows, n_classes)
+        """
+        X = self._scale(np.atleast_2d(np.asarray(features, dtype=np.float64)))
+        (rf_start, rf_end), (gb_start, gb_end), (xgb_start, xgb_end) = self.model_ranges
+
+        # Walk every tree of the three models in one pass, then sum per model
+        leaves = self.arrays['leaf_values'][_leaf_nodes(self.arrays, self.arrays['roots'], X)]
+        rf_proba = leaves[:, rf_start:rf_end].sum(axis=1)
+        gb_margin = leaves[:, gb_start:gb_end].sum(axis=1)[:, :self.gb_margins] + self.arrays['gb_bias']
+        xgb_margin = leaves[:, xgb_start:xgb_end].sum(axis=1)[:, :self.xgb_margins] + self.arrays['xgb_bias']
+
+        return (
+            rf_proba,
+            _margin_to_proba(gb_margin, self.gb_margins),
+            _margin_to_proba(xgb_margin, self.xgb_margins)
+        )
+
+    def lstm_probabilities(self, sequences):
+        """
+        LSTM forward pass
+
+        Args:
+            sequences: Array of shape (rows, sequence_length, n_features), unscaled
+
+        Returns:
+            numpy array of shape (rows, n_classes)
+        """
+        x = self._scale(np.asarray(sequences, dtype=np.float64), 'lstm_scaler')
+
+        for spec, params in self.lstm_layers:
+            if spec['type'] == 'lstm':
+                kernel, recurrent, bias = params
+                units = recurrent.shape[0]
+                h = np.zeros((x.shape[0], units))
+                c = np.zeros((x.shape[0], units))
+                outputs = []
+                projected = x @ kernel + bias  # Input projection for every step at once
+                for t in range(x.shape[1]):
+                    z = projected[:, t] + h @ recurrent
+                    i = _sigmoid(z[:, :units])
+                    f = _sigmoid(z[:, units:2 * units])
+                    g = np.tanh(z[:, 2 * units:3 * units])
+                    o = _sigmoid(z[:, 3 * units:])
+                    c = f * c + i * g
+                    h = o * np.tanh(c)
+                    outputs.append(h)
+                x = np.stack(outputs, axis=1) if spec['return_sequences'] else h
+            else:
+                kernel, bias = params
+                x = x @ kernel + bias
+                if spec['activation'] == 'relu':
+                    x = np.maximum(x, 0)
+                elif spec['activation'] == 'softmax':
+                    x = _softmax(x)
+                elif spec['activation'] == 'sigmoid':
+                    x = _sigmoid(x)
+                elif spec['activation'] == 'tanh':
+                    x = np.tanh(x)
+
+        return x
+
+    def predict_proba(self, features, lstm_sequences=None):
+        """
+        Ensemble probabilities, averaged the same way as ForexPredictor
+
+        Returns:
+            tuple: (ensemble probabilities of shape (rows, n_classes), number of models used)
+        """
+        rf_proba, gb_proba, xgb_proba = self.tree_probabilities(features)
+
+        if lstm_sequences is not None and self.has_lstm:
+            lstm_proba = self.lstm_probabilities(lstm_sequences)
+            return (rf_proba + gb_proba + xgb_proba + lstm_proba) / 4, 4
+
+        return (rf_proba + gb_proba + xgb_proba) / 3, 3
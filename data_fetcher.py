@@ -5,8 +5,58 @@ Updated to use Yahoo Finance for crypto (no geo-restrictions)
 import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
+import json
 import time
 
+
+def to_yahoo_symbol(symbol, market_type='crypto'):
+    """Convert an internal symbol (e.g. 'BTC/USDT') to Yahoo Finance format"""
+    if market_type == 'crypto' and '/' in symbol:
+        return symbol.replace('/USDT', '-USD').replace('/', '-')
+    return symbol
+
+
+def ohlcv_frame(data):
+    """
+    Lowercase open/high/low/close/volume frame from a single-symbol yf.download result
+
+    Newer yfinance versions return (field, ticker) column pairs even for one
+    symbol; both layouts are flattened to one float column per field.
+    """
+    columns = {}
+    for field in ('Open', 'High', 'Low', 'Close', 'Volume'):
+        if field in data:
+            columns[field.lower()] = pd.to_numeric(pd.Series(
+                data[field].to_numpy().reshape(len(data), -1)[:, 0], index=data.index
+            ), errors='coerce').astype(float)
+    frame = pd.DataFrame(columns, index=data.index)
+    if 'volume' not in frame:
+        frame['volume'] = 0.0
+    return frame
+
+
+def download_history(symbol, market_type, start_date, end_date, interval='1d'):
+    """
+    Download OHLCV history for a test period (lowercase columns)
+
+    Returns:
+        DataFrame or None if no data is available
+    """
+    # Convert symbol for yfinance
+    if market_type == 'crypto':
+        yf_symbol = symbol.replace('/', '-')
+    else:
+        yf_symbol = symbol
+
+    data = yf.download(yf_symbol, start=start_date, end=end_date, interval=interval, progress=False)
+
+    if data.empty:
+        print(f"ERROR: No data available for {symbol}")
+        return None
+
+    print(f"SUCCESS: Downloaded {len(data)} data points")
+    return ohlcv_frame(data)
+
 class DataFetcher:
     def __init__(self):
         pass
@@ -95,6 +145,75 @@ class DataFetcher:
             print(f"Error fetching forex data for {symbol}: {e}")
             return None
 
+    def fetch_batch(self, symbols, market_type='crypto', timeframe='1h', period=None,
+                    batch_size=100, deadline=None, timeout=10):
+        """
+        Fetch OHLCV data for many symbols with batched Yahoo Finance downloads
+
+        Args:
+            symbols: List of trading symbols (internal format)
+            market_type: 'crypto' or 'forex'
+            timeframe: Candle interval (e.g., '1h', '1d')
+            period: Download period (defaults based on timeframe)
+            batch_size: Number of tickers per download request
+            deadline: Optional time.monotonic() value after which no new batch is started
+            timeout: Per-request timeout in seconds
+
+        Returns:
+            tuple: (panel, fetched) where panel maps 'open'/'high'/'low'/'close'/'volume'
+                   to DataFrames (rows = candles, columns = symbols) and fetched is the
+                   list of symbols whose batch was downloaded before the deadline
+        """
+        if period is None:
+            period_map = {'5m': '5d', '15m': '5d', '1h': '1mo', '4h': '3mo', '1d': '1y'}
+            period = period_map.get(timeframe, '1mo')
+
+        fields = ['open', 'high', 'low', 'close', 'volume']
+        frames = {field: [] for field in fields}
+        fetched = []
+
+        for start in range(0, len(symbols), batch_size):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+
+            batch = symbols[start:start + batch_size]
+            yahoo_map = {to_yahoo_symbol(s, market_type): s for s in batch}
+
+            try:
+                data = yf.download(
+                    list(yahoo_map.keys()), period=period, interval=timeframe,
+                    group_by='column', threads=True, progress=False, timeout=timeout
+                )
+            except Exception as e:
+                print(f"Error fetching batch starting at {batch[0]}: {e}")
+                continue
+
+            fetched.extend(batch)
+
+            if data is None or data.empty:
+                continue
+
+            # Single-ticker downloads come back with flat columns
+            if not isinstance(data.columns, pd.MultiIndex):
+                data.columns = pd.MultiIndex.from_product([data.columns, list(yahoo_map.keys())])
+
+            data.columns = pd.MultiIndex.from_tuples(
+                [(field.lower(), yahoo_map.get(ticker, ticker)) for field, ticker in data.columns]
+            )
+
+            for field in fields:
+                if field in data.columns.get_level_values(0):
+                    frames[field].append(data[field])
+
+        panel = {}
+        for field in fields:
+            if frames[field]:
+                panel[field] = pd.concat(frames[field], axis=1).sort_index()
+            else:
+                panel[field] = pd.DataFrame()
+
+        return panel, fetched
+
     def get_current_price(self, symbol, market_type='crypto'):
         """
         Get current price for a symbol
@@ -189,3 +308,71 @@ FOREX_NAMES = {
     'USDCAD=X': 'USD/CAD',
     'USDCHF=X': 'USD/CHF'
 }
+
+# Extended universes for the market screener
+CRYPTO_UNIVERSE = CRYPTO_PAIRS + [
+    'AVAX/USDT', 'LINK/USDT', 'MATIC/USDT', 'TRX/USDT', 'LTC/USDT', 'BCH/USDT',
+    'XLM/USDT', 'ATOM/USDT', 'UNI/USDT', 'ETC/USDT', 'FIL/USDT', 'NEAR/USDT',
+    'ALGO/USDT', 'ICP/USDT', 'VET/USDT', 'HBAR/USDT', 'APT/USDT', 'ARB/USDT',
+    'OP/USDT', 'AAVE/USDT', 'MKR/USDT', 'XTZ/USDT', 'EOS/USDT', 'SAND/USDT',
+    'MANA/USDT', 'AXS/USDT', 'THETA/USDT', 'FTM/USDT', 'GRT/USDT', 'CRV/USDT',
+    'SNX/USDT', 'COMP/USDT', 'ZEC/USDT', 'DASH/USDT', 'XMR/USDT', 'SHIB/USDT'
+]
+
+# Currencies in market quoting priority (base currency comes first)
+FOREX_CURRENCIES = ['EUR', 'GBP', 'AUD', 'NZD', 'USD', 'CAD', 'CHF', 'JPY']
+
+
+def build_forex_universe(currencies=FOREX_CURRENCIES):
+    """
+    Build every major/minor cross from a list of currencies
+
+    Args:
+        currencies: Currency codes ordered by quoting priority
+
+    Returns:
+        list: Yahoo Finance pair symbols (e.g., 'EURGBP=X')
+    """
+    pairs = []
+    for i, base in enumerate(currencies):
+        for quote in currencies[i + 1:]:
+            pairs.append(f"{base}{quote}=X")
+    return pairs
+
+
+FOREX_UNIVERSE = build_forex_universe()
+
+
+def load_universe(path):
+    """
+    Load a symbol universe from disk
+
+    The file is either JSON ({"crypto": [...], "forex": [...]}) or plain text
+    with one symbol per line (symbols ending in '=X' are treated as forex).
+
+    Args:
+        path: Path to the universe file
+
+    Returns:
+        dict: {'crypto': [...], 'forex': [...]}
+    """
+    with open(path, 'r') as f:
+        content = f.read()
+
+    if path.endswith('.json'):
+        data = json.loads(content)
+        return {
+            'crypto': list(data.get('crypto', [])),
+            'forex': list(data.get('forex', []))
+        }
+
+    universe = {'crypto': [], 'forex': []}
+    for line in content.splitlines():
+        symbol = line.split('#')[0].strip()
+        if not symbol:
+            continue
+        if symbol.endswith('=X'):
+            universe['forex'].append(symbol)
+        else:
+            universe['crypto'].append(symbol)
+    return universe
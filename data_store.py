@@ -0,0 +1,174 @@
+"""
+Local Bar Store
+Persists OHLCV bars per (symbol, interval) so backtests can read history without downloading it
+"""
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+
+BAR_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def utc_nanoseconds(index):
+    """Convert a DatetimeIndex to int64 UTC nanoseconds (naive values treated as UTC)"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is None:
+        index = index.tz_localize('UTC')
+    return index.tz_convert('UTC').as_unit('ns').asi8
+
+
+class BarStore:
+    """
+    One npz file of sorted bars per (symbol, interval) under base_dir
+
+    Files are loaded once and kept in memory; slices are found with binary
+    search, so reading the bars inside one candle costs O(log n).
+    """
+
+    def __init__(self, base_dir='data/bars'):
+        """
+        Args:
+            base_dir: Directory holding the bar files
+        """
+        self.base_dir = base_dir
+        self.cache = {}  # (symbol, interval) -> dict of arrays
+
+    def path(self, symbol, interval):
+        """File path of a symbol's bars"""
+        safe_symbol = symbol.replace('/', '_').replace('=', '_')
+        return os.path.join(self.base_dir, f"{safe_symbol}_{interval}.npz")
+
+    def load(self, symbol, interval):
+        """
+        Bars of a symbol/interval
+
+        Returns:
+            dict with 'timestamps' (int64 UTC ns) and one float array per OHLCV column,
+            or None if nothing is stored
+        """
+        key = (symbol, interval)
+        if key in self.cache:
+            return self.cache[key]
+
+        path = self.path(symbol, interval)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                bars = {name: data[name] for name in ['timestamps'] + BAR_COLUMNS}
+        except Exception as e:
+            print(f"Error loading bars for {symbol} ({interval}): {e}")
+            return None
+
+        self.cache[key] = bars
+        return bars
+
+    def update(self, symbol, interval, df):
+        """
+        Store bars, replacing stored bars with the same timestamps
+
+        Args:
+            symbol: Trading symbol
+            interval: Candle interval
+            df: DataFrame with OHLC(V) data (lowercase columns, DatetimeIndex)
+
+        Returns:
+            int: Number of bars stored in total
+        """
+        if df is None or len(df) == 0:
+            bars = self.load(symbol, interval)
+            return len(bars['timestamps']) if bars else 0
+
+        new = {
+            'timestamps': utc_nanoseconds(df.index),
+            **{name: (df[name].to_numpy(dtype=float) if name in df else np.zeros(len(df)))
+               for name in BAR_COLUMNS}
+        }
+
+        stored = self.load(symbol, interval)
+        if stored is not None:
+            keep = ~np.isin(stored['timestamps'], new['timestamps'])
+            new = {name: np.concatenate([stored[name][keep], new[name]]) for name in new}
+
+        order = np.argsort(new['timestamps'], kind='stable')
+        bars = {name: values[order] for name, values in new.items()}
+
+        # Write then rename so readers never see a partial file
+        os.makedirs(self.base_dir, exist_ok=True)
+        path = self.path(symbol, interval)
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, **bars)
+        os.replace(tmp_path, path)
+
+        self.cache[(symbol, interval)] = bars
+        return len(bars['timestamps'])
+
+    def slice(self, symbol, interval, start, end):
+        """
+        Bars with start <= timestamp < end
+
+        Args:
+            start, end: int64 UTC nanoseconds
+
+        Returns:
+            dict of arrays (empty arrays if nothing is stored)
+        """
+        bars = self.load(symbol, interval)
+        if bars is None:
+            return {name: np.array([]) for name in ['timestamps'] + BAR_COLUMNS}
+
+        first, last = np.searchsorted(bars['timestamps'], [start, end], side='left')
+        return {name: values[first:last] for name, values in bars.items()}
+
+    def frame(self, symbol, interval, start=None, end=None):
+        """
+        Stored bars as a DataFrame (UTC DatetimeIndex)
+
+        Returns:
+            DataFrame or None if nothing is stored
+        """
+        bars = self.load(symbol, interval)
+        if bars is None:
+            return None
+        if start is not None or end is not None:
+            start = pd.Timestamp(start).value if start is not None else np.iinfo(np.int64).min
+            end = pd.Timestamp(end).value if end is not None else np.iinfo(np.int64).max
+            bars = self.slice(symbol, interval, start, end)
+
+        index = pd.to_datetime(bars['timestamps'], utc=True)
+        return pd.DataFrame({name: bars[name] for name in BAR_COLUMNS}, index=index)
+
+
+def main():
+    from data_fetcher import DataFetcher
+
+    parser = argparse.ArgumentParser(
+        description='Download bars into the local bar store'
+    )
+    parser.add_argument('symbols', nargs='+', help='Symbols to store (e.g. EURUSD=X BTC/USDT)')
+    parser.add_argument('--market', choices=['crypto', 'forex'], default='forex', help='Market type')
+    parser.add_argument('--interval', default='1h', help='Candle interval (default: 1h)')
+    parser.add_argument('--period', default='730d', help='Yahoo Finance period for forex (default: 730d)')
+    parser.add_argument('--limit', type=int, default=1000, help='Candles for crypto (default: 1000)')
+    parser.add_argument('--base-dir', default='data/bars', help='Bar store directory (default: data/bars)')
+    args = parser.parse_args()
+
+    store = BarStore(args.base_dir)
+    fetcher = DataFetcher()
+    for symbol in args.symbols:
+        if args.market == 'crypto':
+            df = fetcher.fetch_crypto_data(symbol, args.interval, args.limit)
+        else:
+            df = fetcher.fetch_forex_data(symbol, period=args.period, interval=args.interval)
+        if df is None or len(df) == 0:
+            print(f"  {symbol} ({args.interval}): no data")
+            continue
+        total = store.update(symbol, args.interval, df)
+        print(f"  {symbol} ({args.interval}): {len(df)} bars fetched, {total} stored")
+
+
+if __name__ == '__main__':
+    main()
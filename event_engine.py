@@ -0,0 +1,501 @@
+"""
+Event-Driven Backtest Engine
+Streams bars (or ticks) through a pluggable strategy and a broker simulator whose
+pending stop loss / take profit orders sit in heaps keyed by trigger price
+"""
+import heapq
+import itertools
+import math
+import numpy as np
+import pandas as pd
+from data_store import BAR_COLUMNS, utc_nanoseconds
+from performance_metrics import MetricsAccumulator
+
+
+def frame_stream(df, chunk_size=65536):
+    """
+    Stream an OHLCV DataFrame (lowercase columns, DatetimeIndex) in chunks
+
+    Every stream yields chunks in this layout: a dict of equally long arrays,
+    'timestamps' (int64 UTC ns) plus open/high/low/close/volume.
+
+    Yields:
+        dict of arrays per chunk
+    """
+    timestamps = utc_nanoseconds(df.index)
+    columns = {name: (df[name].to_numpy(dtype=float) if name in df else np.zeros(len(df)))
+               for name in BAR_COLUMNS}
+    for start in range(0, len(df), chunk_size):
+        chunk = {name: values[start:start + chunk_size] for name, values in columns.items()}
+        chunk['timestamps'] = timestamps[start:start + chunk_size]
+        yield chunk
+
+
+def store_stream(store, symbol, interval, start=None, end=None, chunk_size=65536):
+    """
+    Stream bars from a BarStore without building a DataFrame
+
+    Args:
+        store: data_store.BarStore
+        start, end: Optional bounds (anything pd.Timestamp accepts; naive = UTC)
+
+    Yields:
+        dict of arrays per chunk
+    """
+    bars = store.load(symbol, interval)
+    if bars is None:
+        return
+    start = pd.Timestamp(start).value if start is not None else np.iinfo(np.int64).min
+    end = pd.Timestamp(end).value if end is not None else np.iinfo(np.int64).max
+    bars = store.slice(symbol, interval, start, end)
+    for first in range(0, len(bars['timestamps']), chunk_size):
+        yield {name: values[first:first + chunk_size] for name, values in bars.items()}
+
+
+def tick_stream(timestamps, prices, volumes=None, chunk_size=65536):
+    """
+    Stream trade ticks as one-price bars (open = high = low = close)
+
+    Args:
+        timestamps: int64 UTC ns (or anything utc_nanoseconds accepts)
+        prices: Tick prices
+        volumes: Optional tick sizes
+    """
+    if not np.issubdtype(np.asarray(timestamps).dtype, np.integer):
+        timestamps = utc_nanoseconds(timestamps)
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    prices = np.asarray(prices, dtype=float)
+    volumes = np.zeros(len(prices)) if volumes is None else np.asarray(volumes, dtype=float)
+    for start in range(0, len(prices), chunk_size):
+        price = prices[start:start + chunk_size]
+        yield {'timestamps': timestamps[start:start + chunk_size], 'open': price, 'high': price,
+               'low': price, 'close': price, 'volume': volumes[start:start + chunk_size]}
+
+
+class Order:
+    """Pending exit order of a position (stop loss or take profit)"""
+    __slots__ = ('position', 'kind', 'trigger', 'active')
+
+    def __init__(self, position, kind, trigger):
+        self.position = position
+        self.kind = kind  # 'STOP_LOSS' or 'TAKE_PROFIT'
+        self.trigger = trigger
+        self.active = True
+
+
+class Position:
+    """Open position with its bracket (stop loss + take profit) orders"""
+    __slots__ = ('direction', 'entry_price', 'stop_loss', 'take_profit', 'size', 'risk_amount',
+                 'capital_at_entry', 'entry_time', 'info', 'orders')
+
+    def __init__(self, direction, entry_price, stop_loss, take_profit, size, risk_amount,
+                 capital_at_entry, entry_time, info):
+        self.direction = direction
+        self.entry_price = entry_price
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.size = size
+        self.risk_amount = risk_amount
+        self.capital_at_entry = capital_at_entry
+        self.entry_time = entry_time
+        self.info = info
+        self.orders = []
+
+
+class OrderBook:
+    """
+    Pending orders in two heaps keyed by trigger price
+
+    'up' orders fire when a bar's high reaches them (short stops, long
+    targets) and sit in a min-heap; 'down' orders fire when the low reaches
+    them (long stops, short targets) and sit in a max-heap. The nearest
+    trigger on each side is always at the top, so a bar that stays inside
+    (down_trigger, up_trigger) is skipped with two comparisons. Cancelled
+    orders are dropped lazily when they reach the top.
+    """
+
+    def __init__(self):
+        self.up = []    # (trigger, seq, order)
+        self.down = []  # (-trigger, seq, order)
+        self.sequence = itertools.count()
+        self.up_trigger = math.inf
+        self.down_trigger = -math.inf
+
+    def add(self, order, side):
+        """Queue an order on the 'up' or 'down' side"""
+        if side == 'up':
+            heapq.heappush(self.up, (order.trigger, next(self.sequence), order))
+        else:
+            heapq.heappush(self.down, (-order.trigger, next(self.sequence), order))
+        self.refresh()
+
+    def refresh(self):
+        """Drop cancelled orders at the tops and cache the nearest triggers"""
+        while self.up and not self.up[0][2].active:
+            heapq.heappop(self.up)
+        while self.down and not self.down[0][2].active:
+            heapq.heappop(self.down)
+        self.up_trigger = self.up[0][0] if self.up else math.inf
+        self.down_trigger = -self.down[0][0] if self.down else -math.inf
+
+    def pop_triggered(self, high, low):
+        """
+        Remove and return the orders a bar's range reaches
+
+        Returns:
+            list of Orders (still active; the caller resolves brackets)
+        """
+        triggered = []
+        while self.up and self.up[0][0] <= high:
+            order = heapq.heappop(self.up)[2]
+            if order.active:
+                triggered.append(order)
+        while self.down and -self.down[0][0] >= low:
+            order = heapq.heappop(self.down)[2]
+            if order.active:
+                triggered.append(order)
+        self.refresh()
+        return triggered
+
+    def __len__(self):
+        return len(self.up) + len(self.down)
+
+
+class BrokerSimulator:
+    """
+    Fills market entries at the given price and bracket exits at their trigger
+
+    Position sizing and PnL follow Backtester (risk-based size capped at
+    max_position of capital, PnL = size * price change %). When one bar
+    reaches both the stop loss and the take profit of a position, the stop
+    loss fills (same rule as Backtester._check_exit).
+    """
+
+    def __init__(self, initial_capital=10000, risk_per_trade=0.01, max_position=0.10,
+                 symbol=None, keep_trades=True, trade_log=None, date_format='%Y-%m-%d'):
+        """
+        Args:
+            initial_capital: Starting capital
+            risk_per_trade: Risk fraction per trade (0.01 = 1%)
+            max_position: Largest share of capital per trade
+            symbol: Symbol written to the trade records
+            keep_trades: Keep closed trades in self.trades (metrics are always accumulated)
+            trade_log: Optional TradeLog / TradeStore receiving closed trades
+            date_format: strftime format of entry/exit dates in the trade records
+        """
+        self.initial_capital = initial_capital
+        self.capital = initial_capital
+        self.risk_per_trade = risk_per_trade
+        self.max_position = max_position
+        self.symbol = symbol
+        self.keep_trades = keep_trades
+        self.date_format = date_format
+
+        self.book = OrderBook()
+        self.positions = []
+        self.trades = []
+        self.accumulator = MetricsAccumulator(initial_capital, trade_log)
+
+    def open_position(self, direction, price, stop_loss, take_profit, time, size=None, **info):
+        """
+        Enter at price and queue the bracket orders
+
+        Args:
+            direction: 'LONG' or 'SHORT'
+            price: Entry fill price
+            stop_loss, take_profit: Bracket levels
+            time: Entry timestamp (int64 UTC ns)
+            size: Position size in capital units (default: risk-based)
+            **info: Extra fields copied into the trade record (e.g. signal, score)
+
+        Returns:
+            Position
+        """
+        risk_amount = self.capital * self.risk_per_trade
+        if size is None:
+            price_risk = abs(price - stop_loss)
+            max_size = self.capital * self.max_position
+            size = min(risk_amount / price_risk if price_risk > 0 else max_size, max_size)
+
+        position = Position(direction, price, stop_loss, take_profit, size, risk_amount,
+                            self.capital, time, info)
+        stop = Order(position, 'STOP_LOSS', stop_loss)
+        target = Order(position, 'TAKE_PROFIT', take_profit)
+        position.orders = [stop, target]
+        if direction == 'LONG':
+            self.book.add(stop, 'down')
+            self.book.add(target, 'up')
+        else:
+            self.book.add(stop, 'up')
+            self.book.add(target, 'down')
+        self.positions.append(position)
+        return position
+
+    def close_position(self, position, price, reason, time):
+        """
+        Exit a position, cancel its remaining orders and record the trade
+
+        Returns:
+            dict: Trade record (Backtester format)
+        """
+        for order in position.orders:
+            order.active = False
+        self.positions.remove(position)
+
+        if position.direction == 'LONG':
+            price_change_pct = (price - position.entry_price) / position.entry_price
+        else:
+            price_change_pct = (position.entry_price - price) / position.entry_price
+        pnl = position.size * price_change_pct
+        self.capital += pnl
+
+        trade = {
+            'symbol': self.symbol,
+            'entry_date': self._format_time(position.entry_time),
+            'entry_price': position.entry_price,
+            'stop_loss': position.stop_loss,
+            'take_profit': position.take_profit,
+            'direction': position.direction,
+            **position.info,
+            'position_size': position.size,
+            'risk_amount': position.risk_amount,
+            'capital_at_entry': position.capital_at_entry,
+            'exit_date': self._format_time(time),
+            'exit_price': price,
+            'exit_reason': reason,
+            'pnl': pnl,
+            'pnl_percent': (pnl / self.capital) * 100,
+            'final_capital': self.capital,
+        }
+        self.accumulator.add_trade(trade)
+        if self.keep_trades:
+            self.trades.append(trade)
+        return trade
+
+    def process_bar(self, high, low, time):
+        """
+        Fill the bracket orders a bar reaches
+
+        Returns:
+            list of trade records closed on this bar
+        """
+        triggered = self.book.pop_triggered(high, low)
+        fills = []
+        for order in triggered:
+            if not order.active:
+                continue  # sibling of a bracket already filled on this bar
+            position = order.position
+            stop, target = position.orders
+            if stop.active and target.active and order is target and self._reaches(stop, high, low):
+                order = stop  # both levels in one bar: stop loss first
+            fills.append(self.close_position(position, order.trigger, order.kind, time))
+        if triggered:
+            self.book.refresh()
+        return fills
+
+    @staticmethod
+    def _reaches(order, high, low):
+        """Whether a bar's range reaches a position's stop loss"""
+        if order.position.direction == 'LONG':
+            return low <= order.trigger
+        return high >= order.trigger
+
+    def close_all(self, price, time, reason='END_OF_PERIOD'):
+        """Close every open position at price"""
+        return [self.close_position(position, price, reason, time) for position in list(self.positions)]
+
+    def _format_time(self, time):
+        return pd.Timestamp(int(time)).strftime(self.date_format)
+
+
+class Strategy:
+    """
+    Base class for event-driven strategies
+
+    Override on_bar to see every bar, or signals + on_signal to let the
+    engine jump straight to the bars that matter (signal bars and bars that
+    fill an order), which is how simple strategies reach millions of bars
+    per second. Bar indices passed to callbacks are positions in the current
+    chunk (engine.bars); engine.offset is the chunk's position in the stream.
+    """
+
+    def on_start(self, engine):
+        pass
+
+    def signals(self, engine, bars):
+        """
+        Optional vectorized entry signals for a chunk
+
+        Returns:
+            Array with a non-zero value at bars that need on_signal, or None
+        """
+        return None
+
+    def on_signal(self, engine, i, signal):
+        pass
+
+    def on_bar(self, engine, i):
+        pass
+
+    def on_fill(self, engine, trade):
+        pass
+
+    def on_finish(self, engine):
+        pass
+
+
+class SignalStrategy(Strategy):
+    """
+    Precomputed entries with bracket levels, one position at a time
+
+    With arrays from parameter_sweep.entry_signals / trade_levels this
+    trades exactly like Backtester: entry at the signal bar's close, no new
+    entry on a bar that closed a trade.
+    """
+
+    def __init__(self, signals, stop_loss, take_profit, start_index=0):
+        """
+        Args:
+            signals: 1 (LONG), -1 (SHORT) or 0 per bar of the whole stream
+            stop_loss, take_profit: Levels of an entry at each bar
+            start_index: First bar that may open a trade
+        """
+        self.entry_signals = np.asarray(signals)
+        self.stop_loss = np.asarray(stop_loss, dtype=float)
+        self.take_profit = np.asarray(take_profit, dtype=float)
+        self.start_index = start_index
+
+    def signals(self, engine, bars):
+        offset = engine.offset
+        chunk = self.entry_signals[offset:offset + len(bars['close'])].copy()
+        chunk[:max(0, self.start_index - offset)] = 0
+        return chunk
+
+    def on_signal(self, engine, i, signal):
+        if engine.broker.positions or engine.last_fill_index == engine.offset + i:
+            return
+        bar = engine.offset + i
+        engine.broker.open_position(
+            'LONG' if signal > 0 else 'SHORT', float(engine.bars['close'][i]),
+            float(self.stop_loss[bar]), float(self.take_profit[bar]), engine.bars['timestamps'][i]
+        )
+
+
+class EventEngine:
+    """
+    Runs a strategy over a bar stream against a BrokerSimulator
+
+    Per bar the broker fills pending orders first (with the bar's high/low),
+    then the strategy sees the bar. Between events the fast path searches
+    for the next bar that reaches the nearest trigger with array operations.
+    """
+
+    def __init__(self, strategy, broker=None):
+        """
+        Args:
+            strategy: Strategy instance
+            broker: BrokerSimulator (default: BrokerSimulator())
+        """
+        self.strategy = strategy
+        self.broker = broker or BrokerSimulator()
+        self.bars = None
+        self.offset = 0
+        self.last_fill_index = -1
+        self.bars_processed = 0
+
+    def run(self, stream, close_at_end=True):
+        """
+        Consume a stream of bar chunks
+
+        Args:
+            stream: Iterable of chunks (see frame_stream / store_stream / tick_stream)
+            close_at_end: Close open positions at the last close ('END_OF_PERIOD')
+
+        Returns:
+            BrokerSimulator (trades, capital, accumulator)
+        """
+        self.strategy.on_start(self)
+        per_bar = type(self.strategy).on_bar is not Strategy.on_bar
+
+        last_close, last_time = None, None
+        for chunk in stream:
+            n_bars = len(chunk['close'])
+            if n_bars == 0:
+                continue
+            self.bars = chunk
+
+            if per_bar:
+                self._run_bars(chunk)
+            else:
+                self._run_events(chunk)
+
+            last_close, last_time = float(chunk['close'][-1]), chunk['timestamps'][-1]
+            self.offset += n_bars
+            self.bars_processed += n_bars
+
+        if close_at_end and last_close is not None:
+            for trade in self.broker.close_all(last_close, last_time):
+                self.strategy.on_fill(self, trade)
+        self.strategy.on_finish(self)
+        return self.broker
+
+    def _fill(self, i, high, low, timestamps):
+        """Fill orders reached by bar i of the chunk"""
+        for trade in self.broker.process_bar(high[i], low[i], timestamps[i]):
+            self.last_fill_index = self.offset + i
+            self.strategy.on_fill(self, trade)
+
+    def _run_bars(self, chunk):
+        """Slow path: strategy.on_bar for every bar"""
+        high, low, timestamps = chunk['high'], chunk['low'], chunk['timestamps']
+        book = self.broker.book
+        for i in range(len(high)):
+            if high[i] >= book.up_trigger or low[i] <= book.down_trigger:
+                self._fill(i, high, low, timestamps)
+            self.strategy.on_bar(self, i)
+
+    def _run_events(self, chunk):
+        """Fast path: visit only signal bars and bars that fill an order"""
+        high, low, timestamps = chunk['high'], chunk['low'], chunk['timestamps']
+        n_bars = len(high)
+        signals = self.strategy.signals(self, chunk)
+        if signals is None:
+            signal_bars = np.array([], dtype=np.int64)
+        else:
+            signal_bars = np.flatnonzero(signals)
+
+        position = 0
+        k = 0
+        while position < n_bars:
+            while k < len(signal_bars) and signal_bars[k] < position:
+                k += 1
+            next_signal = signal_bars[k] if k < len(signal_bars) else n_bars
+
+            fill_bar = self._next_trigger(high, low, position, min(next_signal + 1, n_bars))
+            if fill_bar is not None:
+                self._fill(fill_bar, high, low, timestamps)
+                if fill_bar < next_signal:
+                    position = fill_bar + 1
+                    continue
+
+            if next_signal >= n_bars:
+                break
+            self.strategy.on_signal(self, int(next_signal), signals[next_signal])
+            position = next_signal + 1
+
+    def _next_trigger(self, high, low, start, end):
+        """First bar in [start, end) that reaches a pending order, or None"""
+        book = self.broker.book
+        up, down = book.up_trigger, book.down_trigger
+        if up == math.inf and down == -math.inf:
+            return None
+
+        width = 16
+        while start < end:
+            stop = min(start + width, end)
+            hit = (high[start:stop] >= up) | (low[start:stop] <= down)
+            if hit.any():
+                return start + int(hit.argmax())
+            start = stop
+            width *= 4
+        return None
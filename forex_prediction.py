@@ -4,18 +4,54 @@ Uses technical indicators and machine learning for price direction prediction
 """
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
+from numpy.lib.stride_tricks import sliding_window_view
 import warnings
 warnings.filterwarnings('ignore')
+import json
 import os
-os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Suppress TensorFlow warnings
-import xgboost as xgb
-from tensorflow import keras
-from keras.models import Sequential
-from keras.layers import LSTM, Dense, Dropout
-from keras.callbacks import EarlyStopping
+import threading
+import time
+from collections import deque
+from compiled_inference import CompiledEnsemble, export_compiled
+
+
+# scikit-learn, XGBoost and TensorFlow/Keras take seconds and hundreds of MB to
+# import, so they are loaded on first training/loading of a model rather than
+# when this module is imported (crypto-only runs never load them)
+RandomForestClassifier = GradientBoostingClassifier = StandardScaler = train_test_split = None
+joblib = xgb = None
+keras = Sequential = LSTM = Dense = Dropout = EarlyStopping = None
+
+
+def _load_tree_backends():
+    """Import scikit-learn, XGBoost and joblib on first use"""
+    global RandomForestClassifier, GradientBoostingClassifier, StandardScaler, train_test_split, joblib, xgb
+    if joblib is not None:
+        return
+
+    from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.model_selection import train_test_split
+    import xgboost as xgb
+    import joblib
+
+
+def _load_keras_backend():
+    """Import TensorFlow/Keras on first use"""
+    global keras, Sequential, LSTM, Dense, Dropout, EarlyStopping
+    if keras is not None:
+        return
+
+    os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Suppress TensorFlow warnings
+    from tensorflow import keras
+    from keras.models import Sequential
+    from keras.layers import LSTM, Dense, Dropout
+    from keras.callbacks import EarlyStopping
+
+
+# Bump whenever prepare_features/_calculate_historical_features change so
+# persisted models trained on the old layout are not reused
+FEATURE_VERSION = 1
 
 
 class ForexPredictor:
@@ -24,12 +60,46 @@ class ForexPredictor:
     Predicts whether price will go UP, DOWN, or SIDEWAYS
     """
 
-    def __init__(self):
+    def __init__(self, n_jobs=-1):
+        """
+        Args:
+            n_jobs: CPU threads per model (-1 = all cores; use 1 inside worker processes)
+        """
+        self.n_jobs = n_jobs
+
+        # Models are created by train() or restored by load()
+        self.rf_model = None
+        self.gb_model = None
+        self.xgb_model = None
+        self.lstm_model = None  # Will be built during training
+        self.lstm_scaler = None  # Separate scaler for LSTM
+        self.scaler = None
+        self.compiled = None  # NumPy-only CompiledEnsemble replacing the models above when loaded
+        self.is_trained = False
+        self.lstm_trained = False
+        self.sequence_length = 10
+
+        # Training metadata (persisted with the models)
+        self.trained_at = None
+        self.trained_through = None  # Timestamp (ISO) of the last bar train() saw
+        self.training_samples = 0
+        self.accuracies = {}
+        self.feature_mean = None  # Per-feature training distribution for drift checks
+        self.feature_std = None
+
+        # Most recent feature rows used as LSTM input: (bar timestamp, features)
+        self.feature_buffer = deque(maxlen=self.sequence_length)
+        self.buffer_lock = threading.Lock()
+
+    def _create_models(self):
+        """Create untrained models and scalers (imports the ML backends)"""
+        _load_tree_backends()
+
         self.rf_model = RandomForestClassifier(
             n_estimators=100,
             max_depth=10,
             random_state=42,
-            n_jobs=-1
+            n_jobs=self.n_jobs
         )
         self.gb_model = GradientBoostingClassifier(
             n_estimators=100,
@@ -45,12 +115,12 @@ class ForexPredictor:
             eval_metric='mlogloss',
             use_label_encoder=False
         )
-        self.lstm_model = None  # Will be built during training
-        self.lstm_scaler = StandardScaler()  # Separate scaler for LSTM
+        if self.n_jobs > 0:
+            self.xgb_model.set_params(n_jobs=self.n_jobs)
+        self.lstm_model = None
+        self.lstm_scaler = StandardScaler()
         self.scaler = StandardScaler()
-        self.is_trained = False
-        self.lstm_trained = False
-        self.sequence_length = 10
+        self.compiled = None
 
     def prepare_features(self, df, indicators):
         """
@@ -137,43 +207,117 @@ class ForexPredictor:
         Returns:
             X (features), y (labels)
         """
-        X = []
-        y = []
-
         # Need at least 30 periods for meaningful training
         if len(df) < 30:
             return None, None
 
-        # Create features for each historical point
-        for i in range(20, len(df) - 5):  # Leave room for forward-looking labels
-            hist_df = df.iloc[:i+1]
+        # Features for every bar in one pass (row i matches
+        # _calculate_historical_features(df.iloc[:i+1]))
+        features = self._build_feature_matrix(df)
 
-            # Calculate indicators for this historical point
-            try:
-                features = self._calculate_historical_features(hist_df)
-
-                # Label: price direction 5 periods ahead
-                future_price = df['close'].iloc[i + 5]
-                current_price = df['close'].iloc[i]
-                price_change = (future_price - current_price) / current_price
-
-                # Classify into UP (1), DOWN (0), SIDEWAYS (2)
-                if price_change > 0.002:  # > 0.2% move up
-                    label = 1  # UP
-                elif price_change < -0.002:  # > 0.2% move down
-                    label = 0  # DOWN
-                else:
-                    label = 2  # SIDEWAYS
+        # Label: price direction 5 periods ahead (leave room for forward-looking labels)
+        close = df['close'].to_numpy(dtype=float)
+        rows = np.arange(20, len(df) - 5)
+        price_change = (close[rows + 5] - close[rows]) / close[rows]
 
-                X.append(features)
-                y.append(label)
-            except:
-                continue
+        # Classify into UP (1), DOWN (0), SIDEWAYS (2)
+        labels = np.full(len(rows), 2)  # SIDEWAYS
+        labels[price_change > 0.002] = 1  # > 0.2% move up
+        labels[price_change < -0.002] = 0  # > 0.2% move down
 
-        if len(X) == 0:
-            return None, None
+        return features[rows], labels
+
+    def _build_feature_matrix(self, df):
+        """
+        Historical features for every bar at once
+
+        Computes each feature column over the whole history with rolling/ewm
+        operations. Pandas evaluates these left to right, so row i equals
+        _calculate_historical_features(df.iloc[:i+1]).
+
+        Args:
+            df: DataFrame with OHLCV data
+
+        Returns:
+            numpy array of shape (len(df), 17)
+        """
+        n = len(df)
+        close = df['close']
+        close_values = close.to_numpy(dtype=float)
+        length = np.arange(1, n + 1)  # Prefix length at each row
+
+        def filled(series, fallback):
+            values = series.to_numpy(dtype=float)
+            return np.where(np.isnan(values), fallback, values)
+
+        # Price momentum (needs 10 bars)
+        returns = close.pct_change()
+        momentum = np.column_stack([
+            returns.to_numpy(dtype=float),
+            close.pct_change(5).to_numpy(dtype=float),
+            close.pct_change(10).to_numpy(dtype=float),
+            returns.rolling(20).std().to_numpy(dtype=float)
+        ])
+        momentum[length < 10] = 0
+
+        # Volume ratio (needs 20 bars)
+        if 'volume' in df.columns:
+            avg_volume = df['volume'].rolling(20).mean().to_numpy(dtype=float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                volume_ratio = np.where(avg_volume > 0, df['volume'].to_numpy(dtype=float) / avg_volume, 1.0)
+            volume_ratio[length < 20] = 1
+        else:
+            volume_ratio = np.ones(n)
+
+        # RSI approximation
+        delta = close.diff()
+        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+        rs = gain / loss
+        rsi = 100 - (100 / (1 + rs))
+        rsi_feature = filled(rsi / 100, 0.5)
+
+        # Moving averages
+        sma_20 = filled(close.rolling(20).mean(), close_values)
+        sma_50 = np.where(length >= 50, filled(close.rolling(50).mean(), close_values), sma_20)
+        ema_12 = filled(close.ewm(span=12).mean(), close_values)
+        ema_26 = filled(close.ewm(span=26).mean(), close_values)
+
+        # Bollinger Bands
+        bb_middle = close.rolling(20).mean().to_numpy(dtype=float)
+        bb_std = close.rolling(20).std().to_numpy(dtype=float)
+        bb_upper = np.where(np.isnan(bb_std), close_values, bb_middle + 2 * bb_std)
+        bb_lower = np.where(np.isnan(bb_std), close_values, bb_middle - 2 * bb_std)
+        bb_middle = np.where(np.isnan(bb_middle), close_values, bb_middle)
+
+        # Stochastic (simplified)
+        low_14 = df['low'].rolling(14).min().to_numpy(dtype=float)
+        high_14 = df['high'].rolling(14).max().to_numpy(dtype=float)
+        stoch_range = high_14 - low_14
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stoch_k = np.where(stoch_range > 0, (close_values - low_14) / stoch_range, 0.5)
+
+        # ATR
+        atr = filled((df['high'] - df['low']).rolling(14).mean(), 0)
+
+        technical = np.column_stack([
+            rsi_feature, sma_20, sma_50, ema_12, ema_26,
+            bb_upper, bb_middle, bb_lower,
+            stoch_k, stoch_k,
+            np.full(n, 0.5),  # ADX approximation (simplified)
+            atr
+        ])
+
+        # Not enough data, use defaults
+        short = length < 20
+        defaults = np.column_stack([
+            np.full(n, 0.5),
+            *([close_values] * 7),
+            np.full(n, 0.5), np.full(n, 0.5), np.full(n, 0.5), np.zeros(n)
+        ])
+        technical[short] = defaults[short]
 
-        return np.array(X), np.array(y)
+        return np.column_stack([momentum, volume_ratio, technical])
 
     def _calculate_historical_features(self, df):
         """Calculate features for historical data point"""
@@ -289,10 +433,36 @@ class ForexPredictor:
             return False
 
         try:
+            _load_tree_backends()
+
             # Split data
             X_train, X_test, y_train, y_test = train_test_split(
                 X, y, test_size=0.2, random_state=42, stratify=y
             )
+        except Exception as e:
+            print(f"Error training models: {e}")
+            return False
+
+        if not self.fit(X_train, y_train, X_test, y_test):
+            return False
+        last_bar = df.index[-1]
+        self.trained_through = last_bar.isoformat() if isinstance(last_bar, pd.Timestamp) else None
+        return True
+
+    def fit(self, X_train, y_train, X_test, y_test, train_lstm=True):
+        """
+        Fit all models on prepared feature rows
+
+        Args:
+            X_train, y_train: Training features and labels
+            X_test, y_test: Held-out features and labels used for accuracies
+            train_lstm: Also train the LSTM (needs TensorFlow)
+
+        Returns:
+            bool: True if training successful
+        """
+        try:
+            self._create_models()
 
             # Scale features
             X_train_scaled = self.scaler.fit_transform(X_train)
@@ -308,10 +478,25 @@ class ForexPredictor:
             gb_accuracy = self.gb_model.score(X_test_scaled, y_test)
             xgb_accuracy = self.xgb_model.score(X_test_scaled, y_test)
 
+            X = np.concatenate([X_train, X_test])
             self.is_trained = True
+            self.trained_at = time.time()
+            self.training_samples = len(X)
+            self.accuracies = {
+                'random_forest': float(rf_accuracy),
+                'gradient_boosting': float(gb_accuracy),
+                'xgboost': float(xgb_accuracy)
+            }
+            self.feature_mean = X.mean(axis=0)
+            self.feature_std = X.std(axis=0)
+
+            if not train_lstm:
+                return True
 
             # Train LSTM model
             try:
+                _load_keras_backend()
+
                 # Prepare sequences for LSTM
                 X_train_lstm_scaled = self.lstm_scaler.fit_transform(X_train)
                 X_test_lstm_scaled = self.lstm_scaler.transform(X_test)
@@ -326,7 +511,7 @@ class ForexPredictor:
                     y_test_seq = y_test[self.sequence_length - 1:]
 
                     # Get number of classes
-                    num_classes = len(np.unique(y))
+                    num_classes = len(np.unique(np.concatenate([y_train, y_test])))
 
                     # Build LSTM model
                     input_shape = (self.sequence_length, X_train.shape[1])
@@ -364,128 +549,393 @@ class ForexPredictor:
             print(f"Error training models: {e}")
             return False
 
-    def predict(self, df, indicators):
+    def save(self, directory):
+        """
+        Persist trained models, scalers and metadata
+
+        Args:
+            directory: Target directory (created if missing)
+        """
+        os.makedirs(directory, exist_ok=True)
+        _load_tree_backends()
+
+        joblib.dump({
+            'rf_model': self.rf_model,
+            'gb_model': self.gb_model,
+            'xgb_model': self.xgb_model,
+            'scaler': self.scaler,
+            'lstm_scaler': self.lstm_scaler,
+            'feature_mean': self.feature_mean,
+            'feature_std': self.feature_std
+        }, os.path.join(directory, 'models.joblib'))
+
+        if self.lstm_trained and self.lstm_model is not None:
+            self.lstm_model.save(os.path.join(directory, 'lstm.keras'))
+
+        # Lean NumPy-only export used for serving
+        try:
+            export_compiled(self, directory)
+        except Exception as e:
+            print(f"Compiled export failed, serving will use the full models: {e}")
+
+        with open(os.path.join(directory, 'metadata.json'), 'w') as f:
+            json.dump({
+                'feature_version': FEATURE_VERSION,
+                'is_trained': self.is_trained,
+                'lstm_trained': self.lstm_trained,
+                'sequence_length': self.sequence_length,
+                'trained_at': self.trained_at,
+                'trained_through': self.trained_through,
+                'training_samples': self.training_samples,
+                'accuracies': self.accuracies
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, directory, backend='auto'):
+        """
+        Load a predictor saved with save()
+
+        Args:
+            directory: Directory written by save()
+            backend: 'compiled' (NumPy-only export), 'native' (scikit-learn,
+                     XGBoost and Keras objects) or 'auto' (compiled if present)
+
+        Returns:
+            ForexPredictor, or None if the directory is missing, incomplete or
+            was written for a different FEATURE_VERSION
+        """
+        metadata_path = os.path.join(directory, 'metadata.json')
+        models_path = os.path.join(directory, 'models.joblib')
+        if not os.path.exists(metadata_path):
+            return None
+
+        try:
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+
+            if metadata.get('feature_version') != FEATURE_VERSION:
+                return None
+
+            compiled = CompiledEnsemble.load(directory) if backend in ('auto', 'compiled') else None
+            if compiled is not None:
+                predictor = cls()
+                predictor.compiled = compiled
+                predictor.feature_mean = compiled.feature_mean
+                predictor.feature_std = compiled.feature_std
+                predictor.lstm_trained = compiled.has_lstm
+                predictor._apply_metadata(metadata)
+                return predictor
+
+            if backend == 'compiled' or not os.path.exists(models_path):
+                return None
+
+            _load_tree_backends()
+            predictor = cls()
+            models = joblib.load(models_path)
+            predictor.rf_model = models['rf_model']
+            predictor.gb_model = models['gb_model']
+            predictor.xgb_model = models['xgb_model']
+            predictor.scaler = models['scaler']
+            predictor.lstm_scaler = models['lstm_scaler']
+            predictor.feature_mean = models.get('feature_mean')
+            predictor.feature_std = models.get('feature_std')
+
+            predictor._apply_metadata(metadata)
+
+            lstm_path = os.path.join(directory, 'lstm.keras')
+            if metadata['lstm_trained'] and os.path.exists(lstm_path):
+                _load_keras_backend()
+                predictor.lstm_model = keras.models.load_model(lstm_path)
+                predictor.lstm_trained = True
+
+            return predictor
+        except Exception as e:
+            print(f"Error loading models from {directory}: {e}")
+            return None
+
+    def _apply_metadata(self, metadata):
+        """Restore training metadata written by save()"""
+        self.is_trained = metadata['is_trained']
+        self.sequence_length = metadata['sequence_length']
+        self.feature_buffer = deque(maxlen=self.sequence_length)
+        self.trained_at = metadata['trained_at']
+        self.trained_through = metadata.get('trained_through')
+        self.training_samples = metadata['training_samples']
+        self.accuracies = metadata.get('accuracies', {})
+
+    def drift_score(self, df, window=100):
+        """
+        Distance between recent features and the training distribution
+
+        Args:
+            df: DataFrame with recent OHLCV data
+            window: Number of recent bars compared
+
+        Returns:
+            float: Mean absolute z-score of the recent feature means
+                   (None if untrained or there is too little data)
+        """
+        if self.feature_mean is None:
+            return None
+
+        X, _ = self.create_training_data(df.tail(window + 25), None)
+        if X is None or len(X) == 0:
+            return None
+
+        std = np.where(self.feature_std > 0, self.feature_std, 1.0)
+        z = np.abs(X.mean(axis=0) - self.feature_mean) / std
+        return float(np.nanmean(z))
+
+    def _update_feature_buffer(self, df):
+        """
+        Bring the rolling LSTM feature buffer up to date with df
+
+        Rows of closed bars are kept between calls; only bars after the last
+        buffered one are computed, and the last buffered bar is recomputed in
+        case it was still forming. A full (vectorized) rebuild happens only
+        when df does not continue the buffered history.
+
+        Args:
+            df: DataFrame with OHLCV data
+
+        Returns:
+            numpy array of shape (sequence_length, n_features), or None if
+            there are not enough bars with complete features
+        """
+        # Rows before bar 20 use placeholder features
+        if len(df) < 20 + self.sequence_length:
+            return None
+
+        with self.buffer_lock:
+            start = None
+            if self.feature_buffer:
+                last_time = self.feature_buffer[-1][0]
+                if last_time in df.index:
+                    start = df.index.get_loc(last_time)
+                    if not isinstance(start, int) or len(df) - start > self.sequence_length:
+                        start = None
+
+            if start is None:
+                # Rebuild from the full history
+                features = self._build_feature_matrix(df)
+                self.feature_buffer.clear()
+                for position in range(len(df) - self.sequence_length, len(df)):
+                    self.feature_buffer.append((df.index[position], features[position]))
+            else:
+                for position in range(start, len(df)):
+                    row = np.array(self._calculate_historical_features(df.iloc[:position + 1]), dtype=float)
+                    if self.feature_buffer and self.feature_buffer[-1][0] == df.index[position]:
+                        self.feature_buffer[-1] = (df.index[position], row)
+                    else:
+                        self.feature_buffer.append((df.index[position], row))
+
+            return np.array([row for _, row in self.feature_buffer])
+
+    def predict(self, df, indicators, allow_training=True):
         """
         Predict price direction
 
         Args:
             df: Current DataFrame with OHLCV data
             indicators: Dictionary of current technical indicators
+            allow_training: Train on df if no model is loaded yet (disable in
+                            request paths; use ModelRegistry/train_models.py)
 
         Returns:
             Dictionary with prediction results
         """
         # Train model if not already trained
-        if not self.is_trained and len(df) >= 30:
+        if not self.is_trained and allow_training and len(df) >= 30:
             self.train(df)
 
         # If still not trained, return neutral prediction
         if not self.is_trained:
-            return {
-                'direction': 'NEUTRAL',
-                'confidence': 0.0,
-                'probability_up': 0.33,
-                'probability_down': 0.33,
-                'probability_sideways': 0.34,
-                'model_status': 'Insufficient data for ML prediction',
-                'recommendation': 'Need more historical data for accurate predictions'
-            }
+            if not allow_training:
+                return self._neutral_prediction('No trained model available yet')
+            return self._neutral_prediction('Insufficient data for ML prediction')
 
         try:
             # Prepare features
             features = self.prepare_features(df, indicators)
-            features_scaled = self.scaler.transform(features)
-
-            # Get predictions from traditional models
-            rf_proba = self.rf_model.predict_proba(features_scaled)[0]
-            gb_proba = self.gb_model.predict_proba(features_scaled)[0]
-            xgb_proba = self.xgb_model.predict_proba(features_scaled)[0]
-
-            # Get LSTM prediction if available
-            num_models = 3
-            if self.lstm_trained and self.lstm_model is not None:
-                try:
-                    # Get historical data for LSTM sequence
-                    X_full, _ = self.create_training_data(df, None)
-                    if X_full is not None and len(X_full) >= self.sequence_length:
-                        # Use last sequence_length samples
-                        X_recent = X_full[-self.sequence_length:]
-                        X_recent_scaled = self.lstm_scaler.transform(X_recent)
-                        X_lstm_input = X_recent_scaled.reshape(1, self.sequence_length, -1)
-
-                        # Get LSTM prediction
-                        lstm_proba = self.lstm_model.predict(X_lstm_input, verbose=0)[0]
-
-                        # Ensemble: average all 4 model probabilities
-                        ensemble_proba = (rf_proba + gb_proba + xgb_proba + lstm_proba) / 4
-                        num_models = 4
-                    else:
-                        # Not enough data for LSTM, use 3 models
-                        ensemble_proba = (rf_proba + gb_proba + xgb_proba) / 3
-                except Exception as e:
-                    print(f"LSTM prediction failed, using 3-model ensemble: {e}")
-                    ensemble_proba = (rf_proba + gb_proba + xgb_proba) / 3
-            else:
-                # LSTM not trained, use 3 models
-                ensemble_proba = (rf_proba + gb_proba + xgb_proba) / 3
-
-            # Get class labels (may not always be [0, 1, 2] depending on training data)
-            classes = self.rf_model.classes_
-
-            # Map to probabilities
-            prob_dict = {cls: prob for cls, prob in zip(classes, ensemble_proba)}
-            prob_down = prob_dict.get(0, 0)
-            prob_up = prob_dict.get(1, 0)
-            prob_sideways = prob_dict.get(2, 0)
-
-            # Determine prediction
-            max_prob = max(prob_up, prob_down, prob_sideways)
-
-            if max_prob == prob_up:
-                direction = 'BULLISH'
-                confidence = prob_up
-            elif max_prob == prob_down:
-                direction = 'BEARISH'
-                confidence = prob_down
-            else:
-                direction = 'NEUTRAL'
-                confidence = prob_sideways
-
-            # Generate recommendation
-            if confidence > 0.65:
-                strength = 'STRONG'
-            elif confidence > 0.55:
-                strength = 'MODERATE'
-            else:
-                strength = 'WEAK'
+            return self.predict_batch(features, self._lstm_input(df))[0]
 
-            recommendation = f"{strength} {direction} signal"
+        except Exception as e:
+            print(f"Error making prediction: {e}")
+            return self._error_prediction(e)
 
-            # Set model status based on number of models used
-            if num_models == 4:
-                model_status = '4-Model Ensemble (RF, GB, XGB, LSTM)'
-            else:
-                model_status = '3-Model Ensemble (RF, GB, XGB)'
-
-            return {
-                'direction': direction,
-                'confidence': float(confidence * 100),
-                'probability_up': float(prob_up * 100),
-                'probability_down': float(prob_down * 100),
-                'probability_sideways': float(prob_sideways * 100),
-                'model_status': model_status,
-                'recommendation': recommendation,
-                'timeframe': '5-period ahead prediction'
-            }
+    def predict_batch(self, features, lstm_sequences=None):
+        """
+        Predict many rows at once (e.g., every forex pair, or every bar of a backtest)
 
+        Each model runs once on the stacked matrix instead of once per row.
+
+        Args:
+            features: Array of shape (rows, n_features) from prepare_features
+                      (stacked) or _build_feature_matrix
+            lstm_sequences: Optional array of shape (rows, sequence_length, n_features)
+                            of historical feature rows for the LSTM
+
+        Returns:
+            list: One prediction dict per row, in the same format as predict()
+        """
+        features = np.atleast_2d(np.asarray(features, dtype=float))
+
+        if not self.is_trained:
+            return [self._neutral_prediction('No trained model available yet') for _ in range(len(features))]
+
+        if self.compiled is not None:
+            ensemble_proba, num_models = self.compiled.predict_proba(
+                features, lstm_sequences if self.lstm_trained else None
+            )
+            return [self._format_prediction(row, num_models) for row in ensemble_proba]
+
+        # Scale features
+        features_scaled = self.scaler.transform(features)
+
+        # Get predictions from traditional models
+        rf_proba = self.rf_model.predict_proba(features_scaled)
+        gb_proba = self.gb_model.predict_proba(features_scaled)
+        xgb_proba = self.xgb_model.predict_proba(features_scaled)
+
+        # LSTM not available, use 3 models
+        ensemble_proba = (rf_proba + gb_proba + xgb_proba) / 3
+        num_models = 3
+
+        if lstm_sequences is not None and self.lstm_trained and self.lstm_model is not None:
+            try:
+                rows, sequence_length, n_features = lstm_sequences.shape
+                sequences_scaled = self.lstm_scaler.transform(
+                    lstm_sequences.reshape(-1, n_features)
+                ).reshape(rows, sequence_length, n_features)
+
+                # Get LSTM prediction
+                lstm_proba = self.lstm_model.predict(sequences_scaled, batch_size=256, verbose=0)
+
+                # Ensemble: average all 4 model probabilities
+                ensemble_proba = (rf_proba + gb_proba + xgb_proba + lstm_proba) / 4
+                num_models = 4
+            except Exception as e:
+                print(f"LSTM prediction failed, using 3-model ensemble: {e}")
+
+        return [self._format_prediction(row, num_models) for row in ensemble_proba]
+
+    def predict_history(self, df, positions=None):
+        """
+        Predictions as of many bars of one history (for backtests)
+
+        Uses the training feature layout (_build_feature_matrix) for every
+        bar, so no per-bar indicator dictionary is needed. The LSTM joins the
+        ensemble only when every position has a full sequence of complete
+        feature rows (position >= 20 + sequence_length - 1).
+
+        Args:
+            df: DataFrame with OHLCV data
+            positions: Bar positions to predict (default: every bar from 20 on)
+
+        Returns:
+            list: One prediction dict per position
+        """
+        features = self._build_feature_matrix(df)
+        if positions is None:
+            positions = np.arange(min(20, len(df)), len(df))
+        positions = np.asarray(positions, dtype=int)
+
+        lstm_sequences = None
+        first_complete = 20 + self.sequence_length - 1  # Bars before 20 use placeholder features
+        if self.lstm_trained and len(positions) and positions.min() >= first_complete:
+            # windows[t] holds the feature rows of bars t .. t + sequence_length - 1
+            windows = sliding_window_view(features, self.sequence_length, axis=0).transpose(0, 2, 1)
+            lstm_sequences = windows[positions - self.sequence_length + 1]
+
+        return self.predict_batch(features[positions], lstm_sequences)
+
+    def _lstm_input(self, df):
+        """Latest LSTM sequence for df, shaped (1, sequence_length, n_features), or None"""
+        if not self.lstm_trained or (self.lstm_model is None and self.compiled is None):
+            return None
+
+        try:
+            X_recent = self._update_feature_buffer(df)
         except Exception as e:
-            print(f"Error making prediction: {e}")
-            return {
-                'direction': 'ERROR',
-                'confidence': 0.0,
-                'probability_up': 0.0,
-                'probability_down': 0.0,
-                'probability_sideways': 0.0,
-                'model_status': f'Prediction error: {str(e)}',
-                'recommendation': 'Unable to generate prediction'
-            }
+            print(f"LSTM prediction failed, using 3-model ensemble: {e}")
+            return None
+
+        if X_recent is None:
+            # Not enough data for LSTM, use 3 models
+            return None
+        return X_recent.reshape(1, self.sequence_length, -1)
+
+    def _format_prediction(self, ensemble_proba, num_models):
+        """Turn one row of ensemble probabilities into the prediction dict"""
+        # Get class labels (may not always be [0, 1, 2] depending on training data)
+        classes = self.compiled.classes_ if self.compiled is not None else self.rf_model.classes_
+
+        # Map to probabilities
+        prob_dict = {cls: prob for cls, prob in zip(classes, ensemble_proba)}
+        prob_down = prob_dict.get(0, 0)
+        prob_up = prob_dict.get(1, 0)
+        prob_sideways = prob_dict.get(2, 0)
+
+        # Determine prediction
+        max_prob = max(prob_up, prob_down, prob_sideways)
+
+        if max_prob == prob_up:
+            direction = 'BULLISH'
+            confidence = prob_up
+        elif max_prob == prob_down:
+            direction = 'BEARISH'
+            confidence = prob_down
+        else:
+            direction = 'NEUTRAL'
+            confidence = prob_sideways
+
+        # Generate recommendation
+        if confidence > 0.65:
+            strength = 'STRONG'
+        elif confidence > 0.55:
+            strength = 'MODERATE'
+        else:
+            strength = 'WEAK'
+
+        recommendation = f"{strength} {direction} signal"
+
+        # Set model status based on number of models used
+        if num_models == 4:
+            model_status = '4-Model Ensemble (RF, GB, XGB, LSTM)'
+        else:
+            model_status = '3-Model Ensemble (RF, GB, XGB)'
+
+        return {
+            'direction': direction,
+            'confidence': float(confidence * 100),
+            'probability_up': float(prob_up * 100),
+            'probability_down': float(prob_down * 100),
+            'probability_sideways': float(prob_sideways * 100),
+            'model_status': model_status,
+            'recommendation': recommendation,
+            'timeframe': '5-period ahead prediction'
+        }
+
+    def _neutral_prediction(self, model_status):
+        """Prediction returned when no trained model is available"""
+        return {
+            'direction': 'NEUTRAL',
+            'confidence': 0.0,
+            'probability_up': 0.33,
+            'probability_down': 0.33,
+            'probability_sideways': 0.34,
+            'model_status': model_status,
+            'recommendation': 'Need more historical data for accurate predictions'
+        }
+
+    def _error_prediction(self, error):
+        """Prediction returned when inference fails"""
+        return {
+            'direction': 'ERROR',
+            'confidence': 0.0,
+            'probability_up': 0.0,
+            'probability_down': 0.0,
+            'probability_sideways': 0.0,
+            'model_status': f'Prediction error: {str(error)}',
+            'recommendation': 'Unable to generate prediction'
+        }
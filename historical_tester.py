@@ -6,13 +6,23 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from market_analyzer import MarketAnalyzer
-from data_fetcher import CRYPTO_PAIRS, FOREX_PAIRS, CRYPTO_NAMES, FOREX_NAMES
+from model_registry import ModelRegistry
+from data_fetcher import CRYPTO_PAIRS, FOREX_PAIRS, CRYPTO_NAMES, FOREX_NAMES, download_history
+from technical_indicators import calculate_indicator_frame
+from trade_store import save_columnar_results
 import json
 
 
 class HistoricalTester:
-    def __init__(self):
-        self.analyzer = MarketAnalyzer()
+    def __init__(self, cache=None):
+        """
+        Args:
+            cache: Optional PrecomputeCache for the history, indicators and per-bar
+                   analyses (shared with Backtester runs over the same period)
+        """
+        # Offline runs train per-pair models on first use, in memory (never into the app's models/)
+        self.analyzer = MarketAnalyzer(model_registry=ModelRegistry(base_dir=None, train_on_demand=True))
+        self.cache = cache
         self.results = []
 
     def test_symbol_over_period(self, symbol, market_type, start_date, end_date, interval='1d'):
@@ -36,44 +46,46 @@ class HistoricalTester:
         print(f"{'='*60}\n")
 
         test_results = []
+        period = None
 
-        try:
-            # Fetch historical data
-            import yfinance as yf
+        # Fresh models per run: trained on the bars seen so far, so runs are repeatable
+        self.analyzer.model_registry = ModelRegistry(base_dir=None, train_on_demand=True)
 
-            # Convert symbol for yfinance
-            if market_type == 'crypto':
-                yf_symbol = symbol.replace('/', '-')
+        try:
+            if self.cache is not None:
+                period = self.cache.open(symbol, market_type, start_date, end_date, interval, self.analyzer)
+                if period is None:
+                    return []
+                history, indicator_frame = period.history, period.indicator_frame
             else:
-                yf_symbol = symbol
-
-            # Download data
-            data = yf.download(yf_symbol, start=start_date, end=end_date, interval=interval, progress=False)
+                history = download_history(symbol, market_type, start_date, end_date, interval)
+                if history is None:
+                    return []
 
-            if data.empty:
-                print(f"ERROR: No data available for {symbol}")
-                return []
-
-            print(f"SUCCESS: Downloaded {len(data)} data points")
+                # Indicators for every bar, computed once; analysis at a bar only sees bars up to it
+                indicator_frame = calculate_indicator_frame(history)
 
             # Test at multiple points in time
             # Skip first 100 periods to have enough history for indicators
-            test_points = range(100, len(data) - 10, 10)  # Test every 10th period
+            test_points = range(100, len(history) - 10, 10)  # Test every 10th period
 
             for i, test_idx in enumerate(test_points):
-                # Get data up to this point
-                historical_data = data.iloc[:test_idx]
-
-                # Get the analysis at this point
-                analysis = self.analyzer.analyze_symbol(symbol, market_type, timeframe=interval, limit=100)
+                # Get the analysis at this point (point-in-time, no live fetches)
+                if period is not None:
+                    analysis = period.analyze(test_idx)
+                else:
+                    analysis = self.analyzer.analyze_at(
+                        history, test_idx, symbol, market_type, timeframe=interval,
+                        indicator_frame=indicator_frame
+                    )
 
                 if not analysis:
                     continue
 
                 # Get actual future price movement (next 5 periods for ML comparison)
-                future_idx = min(test_idx + 5, len(data) - 1)
-                current_price = float(data.iloc[test_idx]['Close'])
-                future_price = float(data.iloc[future_idx]['Close'])
+                future_idx = min(test_idx + 5, len(history) - 1)
+                current_price = float(history['close'].iloc[test_idx])
+                future_price = float(history['close'].iloc[future_idx])
                 actual_return = ((future_price - current_price) / current_price) * 100
 
                 # Determine actual direction
@@ -91,7 +103,7 @@ class HistoricalTester:
 
                 # Record result
                 result = {
-                    'date': str(data.index[test_idx])[:10],  # Get YYYY-MM-DD part
+                    'date': str(history.index[test_idx])[:10],  # Get YYYY-MM-DD part
                     'symbol': symbol,
                     'market_type': market_type,
                     'current_price': current_price,
@@ -127,6 +139,10 @@ class HistoricalTester:
         except Exception as e:
             print(f"ERROR: Error testing {symbol}: {e}\n")
 
+        finally:
+            if period is not None:
+                period.save()
+
         return test_results
 
     def test_all_markets(self, start_date, end_date, interval='1d'):
@@ -342,7 +358,8 @@ class HistoricalTester:
 
     def save_results(self, filename='historical_test_results.json'):
         """
-        Save test results to JSON file
+        Save test results to JSON file, or to a columnar TradeStore when the
+        filename ends with '.trades'
 
         Args:
             filename: Output filename
@@ -351,6 +368,11 @@ class HistoricalTester:
             print("ERROR: No results to save")
             return
 
+        if filename.endswith('.trades'):
+            save_columnar_results(filename, self.results, kind='historical')
+            print(f"SUCCESS: Results saved to {filename}")
+            return
+
         with open(filename, 'w') as f:
             json.dump(self.results, f, indent=2)
 
@@ -0,0 +1,151 @@
+"""
+Latency Instrumentation
+Structured timing spans and Prometheus-compatible latency histograms
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+import numpy as np
+
+
+class LatencyRecorder:
+    """
+    Aggregates stage timings into histograms and recent-sample quantiles
+    """
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, max_samples=2048):
+        """
+        Args:
+            buckets: Histogram upper bounds in seconds
+            max_samples: Recent samples kept per stage for p50/p95/p99
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.max_samples = max_samples
+        self.bucket_counts = defaultdict(lambda: [0] * len(self.buckets))
+        self.counts = defaultdict(int)
+        self.sums = defaultdict(float)
+        self.samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self.lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        """Record one duration for a stage"""
+        with self.lock:
+            self.counts[stage] += 1
+            self.sums[stage] += seconds
+            self.samples[stage].append(seconds)
+            counts = self.bucket_counts[stage]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+
+    def quantiles(self, stage, qs=(0.5, 0.95, 0.99)):
+        """
+        Quantiles over the recent samples of a stage
+
+        Returns:
+            dict: {quantile: seconds} (empty if the stage has no samples)
+        """
+        with self.lock:
+            samples = list(self.samples.get(stage, ()))
+        if not samples:
+            return {}
+        values = np.quantile(samples, qs)
+        return {q: float(v) for q, v in zip(qs, values)}
+
+    def summary(self):
+        """
+        Per-stage summary
+
+        Returns:
+            dict: {stage: {'count', 'total', 'p50', 'p95', 'p99'}}
+        """
+        with self.lock:
+            stages = list(self.counts.keys())
+        result = {}
+        for stage in stages:
+            q = self.quantiles(stage)
+            result[stage] = {
+                'count': self.counts[stage],
+                'total': round(self.sums[stage], 6),
+                'p50': round(q.get(0.5, 0.0), 6),
+                'p95': round(q.get(0.95, 0.0), 6),
+                'p99': round(q.get(0.99, 0.0), 6),
+            }
+        return result
+
+    def export_prometheus(self, prefix='market_analyzer'):
+        """
+        Render all stages in the Prometheus text exposition format
+
+        Exposes a cumulative histogram ({prefix}_stage_duration_seconds) and a
+        summary with p50/p95/p99 over recent samples
+        ({prefix}_stage_latency_seconds).
+
+        Returns:
+            str: Exposition text
+        """
+        histogram = f"{prefix}_stage_duration_seconds"
+        summary = f"{prefix}_stage_latency_seconds"
+
+        with self.lock:
+            stages = sorted(self.counts.keys())
+            snapshot = {
+                stage: (list(self.bucket_counts[stage]), self.counts[stage], self.sums[stage])
+                for stage in stages
+            }
+
+        lines = [
+            f"# HELP {histogram} Duration of MarketAnalyzer stages in seconds.",
+            f"# TYPE {histogram} histogram",
+        ]
+        for stage in stages:
+            bucket_counts, count, total = snapshot[stage]
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                lines.append(f'{histogram}_bucket{{stage="{stage}",le="{bound}"}} {bucket_count}')
+            lines.append(f'{histogram}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{histogram}_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{histogram}_count{{stage="{stage}"}} {count}')
+
+        lines.append(f"# HELP {summary} Recent MarketAnalyzer stage latency quantiles in seconds.")
+        lines.append(f"# TYPE {summary} summary")
+        for stage in stages:
+            _, count, total = snapshot[stage]
+            for q, value in self.quantiles(stage).items():
+                lines.append(f'{summary}{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'{summary}_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{summary}_count{{stage="{stage}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """
+    Collects timing spans for a single analysis run
+    """
+
+    def __init__(self, recorder=None):
+        """
+        Args:
+            recorder: Optional LatencyRecorder receiving every span
+        """
+        self.recorder = recorder
+        self.timings = {}
+
+    @contextmanager
+    def span(self, stage):
+        """Time the enclosed block under the given stage name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[stage] = self.timings.get(stage, 0.0) + elapsed
+            if self.recorder is not None:
+                self.recorder.observe(stage, elapsed)
+
+    def as_dict(self):
+        """Timings in milliseconds, rounded for JSON output"""
+        return {stage: round(seconds * 1000, 3) for stage, seconds in self.timings.items()}
@@ -0,0 +1,160 @@
+"""
+Intrabar Fill Simulation
+Decides which of stop loss / take profit was hit first inside an ambiguous candle
+using finer bars from the local bar store, and models spread and slippage on fills
+"""
+import numpy as np
+from data_store import BarStore, utc_nanoseconds
+
+
+class SpreadModel:
+    """
+    Bid/ask spread around the bar prices (which are treated as mid prices)
+    """
+
+    def __init__(self, fixed=0.0, pct=0.0):
+        """
+        Args:
+            fixed: Spread in price units (e.g. 0.0002 for 2 pips on EUR/USD)
+            pct: Spread as a fraction of price (e.g. 0.0005 = 5 bps)
+        """
+        self.fixed = fixed
+        self.pct = pct
+
+    def half_spread(self, price):
+        """Distance from mid to bid or ask"""
+        return (self.fixed + self.pct * price) / 2
+
+
+class SlippageModel:
+    """
+    Adverse slippage on market fills (stops), optionally on limit fills too
+    """
+
+    def __init__(self, pct=0.0, fixed=0.0, on_limits=False):
+        """
+        Args:
+            pct: Slippage as a fraction of price
+            fixed: Slippage in price units
+            on_limits: Also slip take profit (limit) fills
+        """
+        self.pct = pct
+        self.fixed = fixed
+        self.on_limits = on_limits
+
+    def slippage(self, price, exit_reason):
+        """Adverse price move for a fill"""
+        if exit_reason == 'TAKE_PROFIT' and not self.on_limits:
+            return 0.0
+        return self.fixed + self.pct * price
+
+
+class IntrabarResolver:
+    """
+    Resolves candles in which both the stop loss and take profit were touched
+
+    Only those ambiguous candles are refined: their finer bars are sliced
+    from the bar store by binary search, so the cost is bounded by the
+    number of ambiguous candles, not the length of the backtest.
+    """
+
+    def __init__(self, store=None, fine_interval='1h', spread=None, slippage=None):
+        """
+        Args:
+            store: BarStore (defaults to data/bars)
+            fine_interval: Interval of the finer bars (e.g. '5m' or '1h')
+            spread: Optional SpreadModel applied to entries and exits
+            slippage: Optional SlippageModel applied to exits
+        """
+        self.store = store or BarStore()
+        self.fine_interval = fine_interval
+        self.spread = spread
+        self.slippage = slippage
+
+        self.symbol = None
+        self.bar_starts = None
+        self.bar_ends = None
+        self.stats = {'ambiguous': 0, 'refined': 0, 'take_profit_first': 0, 'no_fine_data': 0}
+
+    def attach(self, symbol, history):
+        """
+        Use the candle times of the history being backtested
+
+        Args:
+            symbol: Symbol whose finer bars are read from the store
+            history: DataFrame with the coarse bars (DatetimeIndex)
+        """
+        self.symbol = symbol
+        starts = utc_nanoseconds(history.index)
+        if len(starts) > 1:
+            last_length = int(np.median(np.diff(starts)))
+        else:
+            last_length = 24 * 3600 * 10**9
+        self.bar_starts = starts
+        self.bar_ends = np.append(starts[1:], starts[-1] + last_length) if len(starts) else starts
+
+    def first_hit(self, bar_index, direction, stop_loss, take_profit):
+        """
+        Which level a trade reached first inside a candle touching both
+
+        Finer bars are scanned in time order; a finer bar that gaps past a
+        level fills at its open. If a finer bar still touches both levels,
+        its open decides when it is already beyond one of them, otherwise the
+        stop is assumed first (the conservative default).
+
+        Args:
+            bar_index: Row of the ambiguous candle in the attached history
+            direction: 'LONG' or 'SHORT'
+            stop_loss, take_profit: Trade levels
+
+        Returns:
+            (exit_price, exit_reason) before spread/slippage
+        """
+        self.stats['ambiguous'] += 1
+        bars = self.store.slice(self.symbol, self.fine_interval,
+                                self.bar_starts[bar_index], self.bar_ends[bar_index])
+        if len(bars['timestamps']) == 0:
+            self.stats['no_fine_data'] += 1
+            return stop_loss, 'STOP_LOSS'
+
+        self.stats['refined'] += 1
+        is_long = direction == 'LONG'
+        opens, highs, lows = bars['open'], bars['high'], bars['low']
+
+        if is_long:
+            stop_hit = lows <= stop_loss
+            target_hit = highs >= take_profit
+        else:
+            stop_hit = highs >= stop_loss
+            target_hit = lows <= take_profit
+
+        hits = np.flatnonzero(stop_hit | target_hit)
+        if len(hits) == 0:
+            # Finer bars disagree with the candle (different data source): keep the default
+            return stop_loss, 'STOP_LOSS'
+
+        k = hits[0]
+        opened = opens[k]
+        if target_hit[k] and (not stop_hit[k] or (opened >= take_profit if is_long else opened <= take_profit)):
+            self.stats['take_profit_first'] += 1
+            gapped = opened > take_profit if is_long else opened < take_profit
+            return (opened if gapped else take_profit), 'TAKE_PROFIT'
+
+        gapped = opened < stop_loss if is_long else opened > stop_loss
+        return (opened if gapped else stop_loss), 'STOP_LOSS'
+
+    def entry_fill(self, price, direction):
+        """Entry price after the spread (longs buy the ask, shorts sell the bid)"""
+        if self.spread is None:
+            return price
+        half = self.spread.half_spread(price)
+        return price + half if direction == 'LONG' else price - half
+
+    def exit_fill(self, price, direction, exit_reason):
+        """Exit price after spread and slippage (both always against the trade)"""
+        cost = 0.0
+        if self.spread is not None:
+            cost += self.spread.half_spread(price)
+        if self.slippage is not None:
+            cost += self.slippage.slippage(price, exit_reason)
+        return price - cost if direction == 'LONG' else price + cost
@@ -1,20 +1,23 @@
 """
 Market analyzer with advanced signal generation
 """
+import pandas as pd
 from data_fetcher import DataFetcher
-from technical_indicators import calculate_all_indicators
+from technical_indicators import calculate_all_indicators, calculate_indicator_frame, indicators_at
 from sentiment_analyzer import SentimentAnalyzer
 from candle_analysis import CandlePatternAnalyzer, EntryExitCalculator
-from forex_prediction import ForexPredictor
+from model_registry import ModelRegistry
+from instrumentation import LatencyRecorder, StageTimer
 
 
 class MarketAnalyzer:
-    def __init__(self):
+    def __init__(self, latency_recorder=None, model_registry=None):
         self.fetcher = DataFetcher()
         self.sentiment_analyzer = SentimentAnalyzer()
         self.candle_analyzer = CandlePatternAnalyzer()
         self.entry_exit_calculator = EntryExitCalculator()  # Now uses dynamic analysis
-        self.forex_predictor = ForexPredictor()  # ML prediction model for forex
+        self.model_registry = model_registry or ModelRegistry()  # Per-pair ML models for forex
+        self.latency = latency_recorder or LatencyRecorder()  # Per-stage timing histograms
 
     def generate_signal(self, indicators, sentiment_score=0):
         """
@@ -326,7 +329,8 @@ class MarketAnalyzer:
             'reasons': reasons[:10]  # Limit to top 10 reasons
         }
 
-    def analyze_symbol(self, symbol, market_type='crypto', timeframe='1h', limit=100):
+    def analyze_symbol(self, symbol, market_type='crypto', timeframe='1h', limit=100,
+                       include_timings=False):
         """
         Analyze a single symbol
 
@@ -335,12 +339,28 @@ class MarketAnalyzer:
             market_type: 'crypto' or 'forex'
             timeframe: Timeframe for analysis
             limit: Number of candles to analyze
+            include_timings: Attach per-stage latency breakdown (ms) as 'timings'
 
         Returns:
             dict: Complete analysis with indicators and signals
         """
+        timer = StageTimer(self.latency)
         try:
-            # Fetch data
+            with timer.span('total'):
+                result = self._analyze_symbol(symbol, market_type, timeframe, limit, timer)
+        except Exception as e:
+            print(f"Error analyzing {symbol}: {e}")
+            return None
+
+        if result is not None and include_timings:
+            result['timings'] = timer.as_dict()
+
+        return result
+
+    def _analyze_symbol(self, symbol, market_type, timeframe, limit, timer):
+        """Run every analysis stage inside a timing span"""
+        # Fetch data
+        with timer.span('fetch_main'):
             if market_type == 'crypto':
                 df = self.fetcher.fetch_crypto_data(symbol, timeframe, limit)
             else:
@@ -348,71 +368,82 @@ class MarketAnalyzer:
                 period = period_map.get(timeframe, '60d')
                 df = self.fetcher.fetch_forex_data(symbol, period=period, interval=timeframe)
 
-            if df is None or len(df) < 52:
-                return None
+        if df is None or len(df) < 52:
+            return None
 
-            # Calculate indicators
+        # Calculate indicators
+        with timer.span('indicators'):
             indicators = calculate_all_indicators(df)
 
-            if not indicators:
-                return None
+        if not indicators:
+            return None
 
-            # Get sentiment analysis
+        # Get sentiment analysis
+        with timer.span('sentiment'):
             if market_type == 'crypto':
                 sentiment = self.sentiment_analyzer.get_crypto_sentiment(symbol)
             else:
                 sentiment = self.sentiment_analyzer.get_forex_sentiment(symbol)
 
-            # Add sentiment to signal generation
-            sentiment_score = sentiment['score'] * 2  # Scale sentiment (-2 to +2)
+        # Add sentiment to signal generation
+        sentiment_score = sentiment['score'] * 2  # Scale sentiment (-2 to +2)
 
-            # Generate signal
+        # Generate signal
+        with timer.span('signal'):
             signal_data = self.generate_signal(indicators, sentiment_score)
 
-            # Fetch 4-hour chart data for candlestick pattern analysis (medium-term)
+        # Fetch 4-hour chart data for candlestick pattern analysis (medium-term)
+        with timer.span('fetch_4h'):
             if market_type == 'crypto':
                 df_4h = self.fetcher.fetch_crypto_data(symbol, '4h', 100)
             else:
                 df_4h = self.fetcher.fetch_forex_data(symbol, period='120d', interval='4h')
 
-            # Analyze candlestick patterns on 4-hour chart
-            candle_patterns_4h = []
-            entry_exit_data_4h = None
+        # Analyze candlestick patterns on 4-hour chart
+        candle_patterns_4h = []
+        entry_exit_data_4h = None
 
-            if df_4h is not None and len(df_4h) >= 10:
+        if df_4h is not None and len(df_4h) >= 10:
+            with timer.span('patterns_4h'):
                 candle_patterns_4h = self.candle_analyzer.analyze_patterns(df_4h)
 
-                # Calculate entry/exit points if patterns found
-                if candle_patterns_4h:
+            # Calculate entry/exit points if patterns found
+            if candle_patterns_4h:
+                with timer.span('entry_exit_4h'):
                     entry_exit_data_4h = self.entry_exit_calculator.calculate_entry_points(
-                        df_4h, candle_patterns_4h, indicators
+                        df_4h, candle_patterns_4h, indicators, level_key=(symbol, '4h')
                     )
 
-            # Fetch 5-minute chart data for candlestick pattern analysis (short-term/scalping)
+        # Fetch 5-minute chart data for candlestick pattern analysis (short-term/scalping)
+        with timer.span('fetch_5m'):
             if market_type == 'crypto':
                 df_5m = self.fetcher.fetch_crypto_data(symbol, '5m', 100)
             else:
                 df_5m = self.fetcher.fetch_forex_data(symbol, period='5d', interval='5m')
 
-            # Analyze candlestick patterns on 5-minute chart
-            candle_patterns_5m = []
-            entry_exit_data_5m = None
+        # Analyze candlestick patterns on 5-minute chart
+        candle_patterns_5m = []
+        entry_exit_data_5m = None
 
-            if df_5m is not None and len(df_5m) >= 10:
+        if df_5m is not None and len(df_5m) >= 10:
+            with timer.span('patterns_5m'):
                 candle_patterns_5m = self.candle_analyzer.analyze_patterns(df_5m)
 
-                # Calculate entry/exit points if patterns found
-                if candle_patterns_5m:
+            # Calculate entry/exit points if patterns found
+            if candle_patterns_5m:
+                with timer.span('entry_exit_5m'):
                     entry_exit_data_5m = self.entry_exit_calculator.calculate_entry_points(
-                        df_5m, candle_patterns_5m, indicators
+                        df_5m, candle_patterns_5m, indicators, level_key=(symbol, '5m')
                     )
 
-            # Get current price and change
+        # Get current price and change
+        with timer.span('fetch_price'):
             current_price = self.fetcher.get_current_price(symbol, market_type)
             change_24h = self.fetcher.get_24h_change(symbol, market_type)
 
-            # Prepare chart data (last 100 candles for 1-hour chart)
-            chart_data = []
+        # Prepare chart data (last 100 candles for 1-hour chart)
+        chart_data = []
+        with timer.span('chart_data'):
             if df is not None and len(df) > 0:
                 for index, row in df.tail(100).iterrows():
                     chart_data.append({
@@ -424,41 +455,123 @@ class MarketAnalyzer:
                         'volume': float(row['volume']) if 'volume' in row else 0
                     })
 
-            # Generate ML prediction for forex pairs
+        # Generate ML prediction for forex pairs
+        ml_prediction = None
+        if market_type == 'forex':
+            with timer.span('ml_prediction'):
+                try:
+                    ml_prediction = self.model_registry.predict(symbol, timeframe, df, indicators)
+                except Exception as e:
+                    print(f"Error generating forex prediction for {symbol}: {e}")
+                    ml_prediction = None
+
+        return {
+            'symbol': symbol,
+            'market_type': market_type,
+            'current_price': current_price,
+            'change_24h': change_24h,
+            'signal': signal_data['signal'],
+            'score': signal_data['score'],
+            'strength': signal_data['strength'],
+            'reasons': signal_data['reasons'],
+            'indicators': indicators,
+            'sentiment': sentiment,
+            'candle_patterns_4h': candle_patterns_4h,
+            'entry_exit_4h': entry_exit_data_4h,
+            'candle_patterns_5m': candle_patterns_5m,
+            'entry_exit_5m': entry_exit_data_5m,
+            'chart_data': chart_data,  # Add chart data for visualization
+            'ml_prediction': ml_prediction,  # Add ML prediction for forex
+            # Keep old keys for backward compatibility
+            'candle_patterns': candle_patterns_4h,
+            'entry_exit': entry_exit_data_4h
+        }
+
+    def analyze_at(self, frame, bar_index, symbol, market_type='crypto', timeframe='1h',
+                   indicator_frame=None, pattern_window=100):
+        """
+        Analyze a symbol as of one bar of already-downloaded history
+
+        Everything is computed from frame truncated at bar_index, so no data
+        is fetched and nothing after the bar is visible. Sentiment has no
+        history and is reported as neutral; candlestick patterns and
+        entry/exit points use the frame's own timeframe (reported under the
+        4h keys, the 5m keys stay empty).
+
+        Args:
+            frame: DataFrame with OHLCV data (lowercase columns, oldest first)
+            bar_index: Row number of the bar being simulated
+            symbol: Trading symbol
+            market_type: 'crypto' or 'forex'
+            timeframe: Timeframe of frame (selects the ML model)
+            indicator_frame: calculate_indicator_frame(frame), computed once by the caller
+                             when analyzing many bars
+            pattern_window: Bars of history used for patterns and entry/exit levels
+
+        Returns:
+            dict: Analysis with the same keys as analyze_symbol, or None
+        """
+        try:
+            if indicator_frame is None:
+                indicator_frame = calculate_indicator_frame(frame.iloc[:bar_index + 1])
+            indicators = indicators_at(indicator_frame, bar_index)
+            if not indicators:
+                return None
+
+            sentiment = {'score': 0, 'label': 'neutral', 'sources': 0, 'keywords': []}
+            signal_data = self.generate_signal(indicators, 0)
+
+            history = frame.iloc[:bar_index + 1]
+            recent = history.tail(pattern_window)
+            candle_patterns = self.candle_analyzer.analyze_patterns(recent)
+            entry_exit_data = None
+            if candle_patterns:
+                entry_exit_data = self.entry_exit_calculator.calculate_entry_points(
+                    recent, candle_patterns, indicators, level_key=(symbol, timeframe)
+                )
+
+            # Change over the last 24 hours of bars (at least one bar)
+            current_price = float(history['close'].iloc[-1])
+            if isinstance(history.index, pd.DatetimeIndex):
+                previous = history.index.searchsorted(history.index[-1] - pd.Timedelta(hours=24))
+            else:
+                previous = len(history) - 2
+            previous_close = float(history['close'].iloc[max(0, min(previous, len(history) - 2))])
+            change_24h = (current_price - previous_close) / previous_close * 100 if previous_close else 0
+
             ml_prediction = None
             if market_type == 'forex':
                 try:
-                    ml_prediction = self.forex_predictor.predict(df, indicators)
+                    ml_prediction = self.model_registry.predict(symbol, timeframe, history, indicators)
                 except Exception as e:
                     print(f"Error generating forex prediction for {symbol}: {e}")
                     ml_prediction = None
 
-            return {
-                'symbol': symbol,
-                'market_type': market_type,
-                'current_price': current_price,
-                'change_24h': change_24h,
-                'signal': signal_data['signal'],
-                'score': signal_data['score'],
-                'strength': signal_data['strength'],
-                'reasons': signal_data['reasons'],
-                'indicators': indicators,
-                'sentiment': sentiment,
-                'candle_patterns_4h': candle_patterns_4h,
-                'entry_exit_4h': entry_exit_data_4h,
-                'candle_patterns_5m': candle_patterns_5m,
-                'entry_exit_5m': entry_exit_data_5m,
-                'chart_data': chart_data,  # Add chart data for visualization
-                'ml_prediction': ml_prediction,  # Add ML prediction for forex
-                # Keep old keys for backward compatibility
-                'candle_patterns': candle_patterns_4h,
-                'entry_exit': entry_exit_data_4h
-            }
-
         except Exception as e:
-            print(f"Error analyzing {symbol}: {e}")
+            print(f"Error analyzing {symbol} at bar {bar_index}: {e}")
             return None
 
+        return {
+            'symbol': symbol,
+            'market_type': market_type,
+            'current_price': current_price,
+            'change_24h': change_24h,
+            'signal': signal_data['signal'],
+            'score': signal_data['score'],
+            'strength': signal_data['strength'],
+            'reasons': signal_data['reasons'],
+            'indicators': indicators,
+            'sentiment': sentiment,
+            'candle_patterns_4h': candle_patterns,
+            'entry_exit_4h': entry_exit_data,
+            'candle_patterns_5m': [],
+            'entry_exit_5m': None,
+            'chart_data': [],
+            'ml_prediction': ml_prediction,
+            'candle_patterns': candle_patterns,
+            'entry_exit': entry_exit_data
+        }
+
     def analyze_all_markets(self):
         """
         Analyze all configured crypto and forex markets
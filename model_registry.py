@@ -0,0 +1,336 @@
+"""
+Model Registry
+Persists trained ForexPredictor models per (pair, interval, feature version) and serves them warm
+"""
+import os
+import shutil
+import threading
+import time
+import numpy as np
+import pandas as pd
+from forex_prediction import ForexPredictor, FEATURE_VERSION
+
+
+class ModelRegistry:
+    """
+    One trained predictor per (pair, interval), loaded from disk on demand
+
+    Training never happens on the prediction path unless train_on_demand is
+    enabled (offline scripts such as backtests); the web app relies on
+    train_models.py to create and refresh models.
+
+    predict() never uses a model trained on bars after the last bar of the
+    data it is asked about, so a simulation cannot see its own future.
+    """
+
+    def __init__(self, base_dir='models', max_age_hours=24 * 7, drift_threshold=1.0,
+                 train_on_demand=False, backend='auto', retry_after_bars=50):
+        """
+        Args:
+            base_dir: Directory holding one sub-directory per model, or None to
+                      keep models in memory only (run-scoped registries of backtests)
+            max_age_hours: Models older than this are due for retraining
+            drift_threshold: Mean feature z-score above which a model is due for retraining
+            train_on_demand: Train (and persist) a missing model inside predict()
+            backend: Inference backend passed to ForexPredictor.load
+                     ('auto', 'compiled' or 'native')
+            retry_after_bars: After a failed on-demand training, bars the history
+                              has to grow by before training is tried again
+        """
+        self.base_dir = base_dir
+        self.backend = backend
+        self.max_age_hours = max_age_hours
+        self.drift_threshold = drift_threshold
+        self.train_on_demand = train_on_demand
+        self.retry_after_bars = retry_after_bars
+        self.predictors = {}  # (pair, interval) -> ForexPredictor
+        self.failed_training = {}  # (pair, interval) -> history length of the last failed attempt
+        self.deferred = {}  # (pair, interval) -> history a model is trained on when first used
+        self.lock = threading.Lock()
+
+    def path(self, pair, interval):
+        """Directory of the model for a pair/interval at the current feature version"""
+        safe_pair = pair.replace('/', '_').replace('=', '_')
+        return os.path.join(self.base_dir, f"{safe_pair}_{interval}_v{FEATURE_VERSION}")
+
+    def get(self, pair, interval):
+        """
+        Trained predictor for a pair/interval (loaded from disk on first use)
+
+        Returns:
+            ForexPredictor or None if no model has been trained yet
+        """
+        key = (pair, interval)
+        with self.lock:
+            deferred = self.deferred.pop(key, None)
+        if deferred is not None:
+            return self.train(pair, interval, deferred)
+
+        with self.lock:
+            predictor = self.predictors.get(key)
+        if predictor is not None or self.base_dir is None:
+            return predictor
+
+        predictor = ForexPredictor.load(self.path(pair, interval), self.backend)
+        if predictor is not None:
+            with self.lock:
+                predictor = self.predictors.setdefault(key, predictor)
+        return predictor
+
+    def warm_start(self, pairs, intervals=('1h',)):
+        """
+        Load every persisted model for the given pairs/intervals
+
+        Returns:
+            int: Number of models loaded
+        """
+        loaded = 0
+        for pair in pairs:
+            for interval in intervals:
+                if self.get(pair, interval) is not None:
+                    loaded += 1
+        return loaded
+
+    def train(self, pair, interval, df):
+        """
+        Train, persist and publish a new model
+
+        The new model replaces the served one only after it has been written
+        to disk, so concurrent predictions keep using the previous model.
+
+        Returns:
+            ForexPredictor or None if training failed
+        """
+        predictor = ForexPredictor()
+        if not predictor.train(df):
+            print(f"Training failed for {pair} ({interval})")
+            with self.lock:
+                self.failed_training[(pair, interval)] = len(df)
+            return None
+
+        if self.base_dir is None:
+            with self.lock:
+                self.predictors[(pair, interval)] = predictor
+            return predictor
+
+        target = self.path(pair, interval)
+        staging = target + '.tmp'
+        previous = target + '.old'
+        shutil.rmtree(staging, ignore_errors=True)
+        predictor.save(staging)
+
+        # Swap directories so a crash never leaves a half-written model in place
+        shutil.rmtree(previous, ignore_errors=True)
+        if os.path.exists(target):
+            os.replace(target, previous)
+        os.replace(staging, target)
+        shutil.rmtree(previous, ignore_errors=True)
+
+        with self.lock:
+            self.predictors[(pair, interval)] = predictor
+        return predictor
+
+    def retrain_reason(self, pair, interval, df=None, now=None):
+        """
+        Why a model should be retrained
+
+        Args:
+            pair: Forex pair
+            interval: Candle interval
+            df: Optional recent OHLCV data used for the drift check
+            now: Current unix time (defaults to time.time())
+
+        Returns:
+            str: 'missing', 'stale' or 'drift', or None if the model is current
+        """
+        predictor = self.get(pair, interval)
+        if predictor is None or not predictor.is_trained:
+            return 'missing'
+
+        now = time.time() if now is None else now
+        if predictor.trained_at is None or now - predictor.trained_at > self.max_age_hours * 3600:
+            return 'stale'
+
+        if df is not None:
+            drift = predictor.drift_score(df)
+            if drift is not None and drift > self.drift_threshold:
+                return 'drift'
+
+        return None
+
+    @staticmethod
+    def usable(predictor, df):
+        """
+        Whether a predictor may be used on df (trained on no bar after df's last bar)
+
+        Models without a recorded training end (trained before it was stored)
+        are always usable.
+        """
+        return ModelRegistry.trained_before(predictor.trained_through, df)
+
+    @staticmethod
+    def trained_before(trained_through, df):
+        """Whether a training end (ISO timestamp or None) is not after df's last bar"""
+        if trained_through is None or not isinstance(df.index, pd.DatetimeIndex) or not len(df):
+            return True
+        trained_through = pd.Timestamp(trained_through)
+        last_bar = df.index[-1]
+        if (trained_through.tzinfo is None) != (last_bar.tzinfo is None):
+            # Compare naive timestamps as UTC
+            trained_through = trained_through.tz_localize('UTC') if trained_through.tzinfo is None else trained_through
+            last_bar = last_bar.tz_localize('UTC') if last_bar.tzinfo is None else last_bar
+        return trained_through <= last_bar
+
+    def should_train(self, pair, interval, df):
+        """Whether predict() trains a model on df (train_on_demand, enough bars, no recent failure)"""
+        if not self.train_on_demand or len(df) < 30:
+            return False
+        failed_at = self.failed_training.get((pair, interval))
+        return failed_at is None or len(df) >= failed_at + self.retry_after_bars
+
+    def predictor_for(self, pair, interval, df):
+        """
+        Predictor predict() uses on df, training one on demand
+
+        Returns:
+            ForexPredictor or None if no usable model is available
+        """
+        predictor = self.get(pair, interval)
+        if predictor is not None and not self.usable(predictor, df):
+            predictor = None  # trained on bars after df ends
+
+        if predictor is None and self.should_train(pair, interval, df):
+            predictor = self.train(pair, interval, df)
+        return predictor
+
+    def model_version(self, pair, interval, df, training_outcomes=None):
+        """
+        Identifier of the model predict() uses on df, training it on demand first
+
+        Args:
+            pair: Forex pair
+            interval: Candle interval
+            df: OHLCV data the prediction would be made on
+            training_outcomes: Optional dict of history length -> whether training
+                               on that many bars succeeded, filled in as models are
+                               trained. A training whose outcome is already in it is
+                               deferred until the model is first used by predict(),
+                               so the version is known without training.
+
+        Returns:
+            str: Last training bar (or training time for models saved without
+                 one), or 'none' if predictions on df are neutral
+        """
+        key = (pair, interval)
+        with self.lock:
+            deferred = self.deferred.get(key)
+        if deferred is not None and self.trained_before(deferred.index[-1].isoformat(), df):
+            return deferred.index[-1].isoformat()
+
+        predictor = self.get(pair, interval)
+        if predictor is not None and not self.usable(predictor, df):
+            predictor = None  # trained on bars after df ends
+
+        if predictor is None and self.should_train(pair, interval, df):
+            outcome = None if training_outcomes is None else training_outcomes.get(len(df))
+            if outcome is not None and isinstance(df.index, pd.DatetimeIndex):
+                # Same state a training on df leaves behind, without training yet
+                with self.lock:
+                    if outcome:
+                        self.deferred[key] = df
+                    else:
+                        self.failed_training[key] = len(df)
+                return df.index[-1].isoformat() if outcome else 'none'
+
+            predictor = self.train(pair, interval, df)
+            if training_outcomes is not None:
+                training_outcomes[len(df)] = predictor is not None
+
+        if predictor is None or not predictor.is_trained:
+            return 'none'
+        return predictor.trained_through or str(predictor.trained_at)
+
+    def predict(self, pair, interval, df, indicators):
+        """
+        Predict with the pair's own model
+
+        Returns:
+            Dictionary with prediction results (neutral if no model is available)
+        """
+        predictor = self.predictor_for(pair, interval, df)
+
+        if predictor is None:
+            # Untrained predictor returns the standard neutral response
+            return ForexPredictor().predict(df, indicators, allow_training=False)
+
+        return predictor.predict(df, indicators, allow_training=False)
+
+    def predict_batch(self, requests):
+        """
+        Predict many pairs, running each model once per group of rows
+
+        Args:
+            requests: List of (pair, interval, df, indicators) tuples
+
+        Returns:
+            list: Prediction dicts aligned with requests
+        """
+        results = [None] * len(requests)
+        groups = {}  # (pair, interval) -> request positions sharing one predictor
+
+        for position, (pair, interval, df, indicators) in enumerate(requests):
+            groups.setdefault((pair, interval), []).append(position)
+
+        for (pair, interval), positions in groups.items():
+            predictor = self.predictor_for(pair, interval, requests[positions[0]][2])
+
+            if predictor is not None and predictor.is_trained:
+                # Rows ending before the model's training data get the neutral response
+                unusable = [position for position in positions if not self.usable(predictor, requests[position][2])]
+                positions = [position for position in positions if position not in unusable]
+            else:
+                unusable, positions = positions, []
+
+            neutral = ForexPredictor()
+            for position in unusable:
+                results[position] = neutral._neutral_prediction('No trained model available yet')
+            if not positions:
+                continue
+
+            try:
+                features = np.vstack([
+                    predictor.prepare_features(requests[position][2], requests[position][3])
+                    for position in positions
+                ])
+                sequences = [predictor._lstm_input(requests[position][2]) for position in positions]
+                lstm_sequences = np.vstack(sequences) if all(seq is not None for seq in sequences) else None
+
+                for position, prediction in zip(positions, predictor.predict_batch(features, lstm_sequences)):
+                    results[position] = prediction
+            except Exception as e:
+                print(f"Error making batch prediction for {pair}: {e}")
+                for position in positions:
+                    results[position] = predictor._error_prediction(e)
+
+        return results
+
+    def status(self):
+        """
+        Summary of the models currently in memory
+
+        Returns:
+            list: One dict per loaded model
+        """
+        with self.lock:
+            items = list(self.predictors.items())
+
+        return [{
+            'pair': pair,
+            'interval': interval,
+            'feature_version': FEATURE_VERSION,
+            'trained_at': predictor.trained_at,
+            'trained_through': predictor.trained_through,
+            'training_samples': predictor.training_samples,
+            'lstm': predictor.lstm_trained,
+            'accuracies': predictor.accuracies
+        } for (pair, interval), predictor in items]
@@ -0,0 +1,392 @@
+"""
+Monte Carlo Robustness Analysis
+Resamples a backtest's trade list (order shuffles, block bootstraps, delayed entries)
+to get confidence intervals for return, drawdown and Sharpe ratio
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from vectorized_backtest import first_exits, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT
+from trade_store import load_results
+
+
+RESAMPLING_METHODS = ['trade_shuffle', 'bootstrap', 'block_bootstrap', 'entry_delay']
+METRICS = ['total_return', 'max_drawdown', 'sharpe_ratio']
+
+# Upper bound on simulated trade returns held in memory at once (per worker)
+BATCH_ELEMENTS = 2_000_000
+
+
+def trade_frame(trades):
+    """Trades as a DataFrame (lists of trade dicts from Backtester are converted)"""
+    return trades if isinstance(trades, pd.DataFrame) else pd.DataFrame(list(trades))
+
+
+def trade_returns(trades):
+    """
+    Return of every trade on the capital at its entry
+
+    Compounding these reproduces the backtest equity curve, since position
+    sizes are a fraction of the capital at entry.
+
+    Args:
+        trades: List or DataFrame of trades from Backtester (needs 'pnl' and 'capital_at_entry')
+
+    Returns:
+        numpy array of per-trade returns (0.01 = +1%)
+    """
+    trades = trade_frame(trades)
+    if not len(trades):
+        return np.array([], dtype=float)
+    return trades['pnl'].to_numpy(dtype=float) / trades['capital_at_entry'].to_numpy(dtype=float)
+
+
+def path_metrics(returns):
+    """
+    Metrics of many equity paths at once, defined as in Backtester.analyze_results
+
+    Args:
+        returns: 2D array (paths x trades) of per-trade returns
+
+    Returns:
+        dict: 'total_return' and 'max_drawdown' in percent and 'sharpe_ratio' per path
+    """
+    returns = np.atleast_2d(returns)
+    n_paths, n_trades = returns.shape
+    if n_trades == 0:
+        zeros = np.zeros(n_paths)
+        return {'total_return': zeros, 'max_drawdown': zeros, 'sharpe_ratio': zeros}
+
+    # Equity relative to initial capital, starting with the initial point
+    equity = np.cumprod(1 + returns, axis=1)
+    equity = np.concatenate([np.ones((n_paths, 1)), equity], axis=1)
+    running_max = np.maximum.accumulate(equity, axis=1)
+    max_drawdown = np.abs(((equity - running_max) / running_max).min(axis=1)) * 100
+
+    if n_trades > 1:
+        std = returns.std(axis=1, ddof=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = np.where(std > 0, returns.mean(axis=1) / std * np.sqrt(252), 0.0)
+    else:
+        sharpe = np.zeros(n_paths)
+
+    return {
+        'total_return': (equity[:, -1] - 1) * 100,
+        'max_drawdown': max_drawdown,
+        'sharpe_ratio': sharpe
+    }
+
+
+def shuffled_paths(returns, n_paths, rng):
+    """Trade order permutations (same trades, different sequence)"""
+    return rng.permuted(np.broadcast_to(returns, (n_paths, len(returns))), axis=1)
+
+
+def bootstrap_paths(returns, n_paths, rng, block_size=1):
+    """
+    Moving-block bootstrap of trade returns
+
+    Blocks of consecutive trades are drawn with replacement, keeping streaks
+    (e.g. a regime of losing trades) together; block_size=1 is the plain bootstrap.
+    """
+    n_trades = len(returns)
+    block_size = max(1, min(block_size, n_trades))
+    n_blocks = -(-n_trades // block_size)
+    starts = rng.integers(0, n_trades - block_size + 1, size=(n_paths, n_blocks))
+    index = (starts[:, :, None] + np.arange(block_size)).reshape(n_paths, -1)[:, :n_trades]
+    return returns[index]
+
+
+def delayed_paths(delay_table, n_paths, rng):
+    """
+    Trade returns with every entry delayed by a random number of bars
+
+    Args:
+        delay_table: 2D array (trades x delays) from entry_delay_table
+    """
+    n_trades, n_delays = delay_table.shape
+    delays = rng.integers(0, n_delays, size=(n_paths, n_trades))
+    return delay_table[np.arange(n_trades), delays]
+
+
+def entry_delay_table(trades, history, max_delay):
+    """
+    Return of every trade if its entry had come 0..max_delay bars later
+
+    The delayed entry fills at that bar's close with stop loss and take
+    profit at the same distances (in percent) and the same share of capital;
+    exits are found with the vectorized engine. Entries are matched to bars
+    by their 'entry_date' (first bar of that date).
+
+    Args:
+        trades: List or DataFrame of trades from Backtester
+        history: OHLCV DataFrame covering the trades (lowercase columns)
+        max_delay: Largest delay in bars
+
+    Returns:
+        2D array (trades x delays) of per-trade returns
+    """
+    high = history['high'].to_numpy(dtype=float)
+    low = history['low'].to_numpy(dtype=float)
+    close = history['close'].to_numpy(dtype=float)
+    n_bars = len(close)
+    dates = np.asarray(history.index.strftime('%Y-%m-%d'))
+
+    trades = trade_frame(trades)
+    entry_bars = np.searchsorted(dates, trades['entry_date'].astype(str).to_numpy())
+    if 'direction' in trades:
+        direction = np.where(trades['direction'].astype(object).fillna('LONG').to_numpy() == 'LONG', 1, -1)
+    else:
+        direction = np.ones(len(trades), dtype=int)
+    entry_price = trades['entry_price'].to_numpy(dtype=float)
+    stop_distance = trades['stop_loss'].to_numpy(dtype=float) / entry_price
+    target_distance = trades['take_profit'].to_numpy(dtype=float) / entry_price
+    fraction = trades['position_size'].to_numpy(dtype=float) / trades['capital_at_entry'].to_numpy(dtype=float)
+
+    # One row per (trade, delay) pair
+    delays = np.arange(max_delay + 1)
+    entry_index = np.minimum(entry_bars[:, None] + delays, n_bars - 1).ravel()
+    pair_direction = np.repeat(direction, len(delays))
+    pair_entry = close[entry_index]
+    pair_stop = pair_entry * np.repeat(stop_distance, len(delays))
+    pair_target = pair_entry * np.repeat(target_distance, len(delays))
+
+    _, exit_code = first_exits(high, low, entry_index, pair_direction, pair_stop, pair_target)
+    exit_price = np.select(
+        [exit_code == EXIT_STOP_LOSS, exit_code == EXIT_TAKE_PROFIT],
+        [pair_stop, pair_target],
+        close[-1]
+    )
+
+    returns = np.repeat(fraction, len(delays)) * pair_direction * (exit_price - pair_entry) / pair_entry
+    return returns.reshape(len(trades), len(delays))
+
+
+def simulate(method, table, n_paths, seed, block_size=5):
+    """
+    Metrics of n_paths resampled equity paths
+
+    Paths are generated in batches so memory stays bounded for long trade lists.
+
+    Args:
+        method: One of RESAMPLING_METHODS
+        table: Trade returns (1D) or entry delay table (2D, for 'entry_delay')
+        n_paths: Number of simulated paths
+        seed: Seed (int or numpy SeedSequence)
+        block_size: Trades per block for 'block_bootstrap'
+
+    Returns:
+        dict: metric -> array of n_paths values
+    """
+    rng = np.random.default_rng(seed)
+    n_trades = len(table)
+    batch = max(1, BATCH_ELEMENTS // max(n_trades, 1))
+    results = {metric: [] for metric in METRICS}
+
+    for start in range(0, n_paths, batch):
+        size = min(batch, n_paths - start)
+        if method == 'trade_shuffle':
+            paths = shuffled_paths(table, size, rng)
+        elif method == 'bootstrap':
+            paths = bootstrap_paths(table, size, rng)
+        elif method == 'block_bootstrap':
+            paths = bootstrap_paths(table, size, rng, block_size)
+        elif method == 'entry_delay':
+            paths = delayed_paths(table, size, rng)
+        else:
+            raise ValueError(f"Unknown resampling method: {method}")
+
+        for metric, values in path_metrics(paths).items():
+            results[metric].append(values)
+
+    return {metric: np.concatenate(values) for metric, values in results.items()}
+
+
+def _simulate_task(task):
+    """Worker entry point (tuple of simulate arguments)"""
+    return simulate(*task)
+
+
+def confidence_interval(values, confidence=0.90):
+    """Summary of a metric's distribution with a central confidence interval"""
+    tail = (1 - confidence) / 2 * 100
+    low, median, high = np.percentile(values, [tail, 50, 100 - tail])
+    return {
+        'mean': float(values.mean()),
+        'median': float(median),
+        'lower': float(low),
+        'upper': float(high),
+        'std': float(values.std()),
+    }
+
+
+class MonteCarloAnalyzer:
+    """
+    Confidence intervals for a backtest from resampled trade sequences
+
+    - trade_shuffle: same trades in random order (drawdown risk of the sequence)
+    - bootstrap / block_bootstrap: trades drawn with replacement (single or in blocks)
+    - entry_delay: every entry delayed by 0..max_delay bars (needs the price history)
+    """
+
+    def __init__(self, simulations=10000, confidence=0.90, block_size=5, max_workers=None, seed=42):
+        """
+        Args:
+            simulations: Paths per resampling method
+            confidence: Width of the reported intervals (0.90 = 5th to 95th percentile)
+            block_size: Trades per block for the block bootstrap
+            max_workers: Worker processes (defaults to the CPU count; 1 runs in-process)
+            seed: Random seed (results are reproducible for a given seed and worker count)
+        """
+        self.simulations = simulations
+        self.confidence = confidence
+        self.block_size = block_size
+        self.max_workers = max_workers or os.cpu_count()
+        self.seed = seed
+
+    def _simulate(self, method, table, seed_sequence):
+        """Run one method's simulations, split across worker processes"""
+        workers = min(self.max_workers, max(1, self.simulations // 1000))
+        if workers <= 1:
+            return simulate(method, table, self.simulations, seed_sequence, self.block_size)
+
+        sizes = [len(part) for part in np.array_split(np.arange(self.simulations), workers)]
+        tasks = [(method, table, size, child, self.block_size)
+                 for size, child in zip(sizes, seed_sequence.spawn(workers))]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(_simulate_task, tasks))
+        return {metric: np.concatenate([part[metric] for part in parts]) for metric in METRICS}
+
+    def run(self, trades, history=None, max_delay=0, methods=None):
+        """
+        Resample a backtest's trades
+
+        Args:
+            trades: List or DataFrame of trades from Backtester
+            history: OHLCV DataFrame for 'entry_delay' (skipped without it)
+            max_delay: Largest entry delay in bars for 'entry_delay'
+            methods: Resampling methods to run (default: all available)
+
+        Returns:
+            dict: Observed metrics, and per method the confidence interval of every
+                  metric plus the probability of a loss
+        """
+        if not len(trades):
+            return {'error': 'No trades executed', 'total_trades': 0}
+
+        returns = trade_returns(trades)
+        observed = {metric: float(values[0]) for metric, values in path_metrics(returns).items()}
+
+        methods = methods or RESAMPLING_METHODS
+        if history is None or max_delay <= 0:
+            methods = [method for method in methods if method != 'entry_delay']
+
+        report = {
+            'total_trades': len(trades),
+            'simulations': self.simulations,
+            'confidence': self.confidence,
+            'block_size': self.block_size,
+            'max_delay': max_delay,
+            'observed': observed,
+            'methods': {}
+        }
+
+        seeds = np.random.SeedSequence(self.seed).spawn(len(RESAMPLING_METHODS))
+        for method in methods:
+            start = time.time()
+            if method == 'entry_delay':
+                table = entry_delay_table(trades, history, max_delay)
+            else:
+                table = returns
+            samples = self._simulate(method, table, seeds[RESAMPLING_METHODS.index(method)])
+
+            summary = {metric: confidence_interval(samples[metric], self.confidence) for metric in METRICS}
+            summary['probability_of_loss'] = float((samples['total_return'] < 0).mean())
+            # Share of paths at least as good as the backtest itself
+            summary['observed_percentile'] = {
+                metric: float((samples[metric] <= observed[metric]).mean() * 100) for metric in METRICS
+            }
+            summary['seconds'] = round(time.time() - start, 3)
+            report['methods'][method] = summary
+
+        return report
+
+    @staticmethod
+    def print_report(report):
+        """Print the confidence intervals"""
+        if 'error' in report:
+            print(f"ERROR: {report['error']}")
+            return
+
+        confidence = report['confidence'] * 100
+        observed = report['observed']
+        print(f"\n{'='*72}")
+        print(f"MONTE CARLO ANALYSIS ({report['total_trades']} trades, "
+              f"{report['simulations']:,} paths per method, {confidence:.0f}% intervals)")
+        print(f"{'='*72}")
+        print(f"Observed: return {observed['total_return']:.2f}% | "
+              f"max drawdown {observed['max_drawdown']:.2f}% | Sharpe {observed['sharpe_ratio']:.2f}")
+
+        for method, summary in report['methods'].items():
+            print(f"\n{method} ({summary['seconds']:.2f}s)")
+            for metric in METRICS:
+                ci = summary[metric]
+                print(f"  {metric:<14} median {ci['median']:>9.2f}  "
+                      f"[{ci['lower']:>9.2f}, {ci['upper']:>9.2f}]  "
+                      f"observed at {summary['observed_percentile'][metric]:5.1f}th pct")
+            print(f"  P(loss)        {summary['probability_of_loss']*100:.1f}%")
+        print(f"{'='*72}\n")
+
+    @staticmethod
+    def save_report(report, filename='monte_carlo_report.json'):
+        """Save the report to a JSON file"""
+        with open(filename, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Monte Carlo report saved to {filename}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Monte Carlo confidence intervals for a saved backtest'
+    )
+    parser.add_argument('results', help='Backtest results JSON or .trades store (from Backtester.save_results)')
+    parser.add_argument('--simulations', type=int, default=10000, help='Paths per method (default: 10000)')
+    parser.add_argument('--confidence', type=float, default=0.90, help='Interval width (default: 0.90)')
+    parser.add_argument('--block-size', type=int, default=5, help='Trades per bootstrap block (default: 5)')
+    parser.add_argument('--max-delay', type=int, default=0,
+                        help='Largest entry delay in bars; downloads the price history (default: off)')
+    parser.add_argument('--interval', default='1d', help='Interval of the backtest for --max-delay (default: 1d)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('--output', help='Save the report to this JSON file')
+    args = parser.parse_args()
+
+    # Trades as columns: no per-trade dicts for large '.trades' stores
+    results = load_results(args.results, frame=True)
+    if not isinstance(results, dict):
+        print(f"ERROR: {args.results} holds historical test results, not backtest trades")
+        return
+    trades = results['trades']
+
+    history = None
+    if len(trades) and args.max_delay > 0:
+        from backtester import Backtester
+        first = trades.iloc[0]
+        history = Backtester.download_history(
+            first['symbol'], first.get('market_type', 'forex'),
+            trades['entry_date'].astype(str).min(), None, args.interval
+        )
+
+    analyzer = MonteCarloAnalyzer(args.simulations, args.confidence, args.block_size, args.workers, args.seed)
+    report = analyzer.run(trades, history, args.max_delay)
+    analyzer.print_report(report)
+    if args.output:
+        analyzer.save_report(report, args.output)
+
+
+if __name__ == '__main__':
+    main()
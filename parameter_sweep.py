@@ -0,0 +1,424 @@
+"""
+Parameter Sweep
+Runs the Backtester strategy over many parameter sets (grid or random search)
+sharing one data download and one pass of per-bar analysis
+"""
+import argparse
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from backtester import Backtester, strategy_params
+from vectorized_backtest import run_vectorized_backtest, EXIT_REASONS
+
+
+# Parameters a sweep may vary (everything else in strategy_params is fixed)
+SWEEP_PARAMETERS = [
+    'signal_threshold', 'ml_threshold', 'min_score', 'stop_loss_pct', 'take_profit_pct',
+    'max_position', 'risk_per_trade', 'dynamic_stops'
+]
+
+# Per-bar analysis shared by the worker processes (set by _init_worker)
+_worker_bars = None
+_worker_backtester = None
+
+
+def prepare_sweep_bars(symbol, market_type, start_date, end_date, interval='1d', backtester=None):
+    """
+    Download history and analyze every bar once
+
+    Everything a parameter set changes (thresholds, stops, sizing) is applied
+    afterwards to these arrays, so each run only costs a vectorized backtest.
+
+    Returns:
+        dict: Per-bar arrays (prices, signal side/strength, patterns, ML side/confidence,
+              stop ladders) or None if no data is available
+    """
+    backtester = backtester or Backtester()
+    history = backtester.download_history(symbol, market_type, start_date, end_date, interval)
+    if history is None:
+        return None
+
+    from technical_indicators import calculate_indicator_frame
+    indicator_frame = calculate_indicator_frame(history)
+    ladders = backtester.stop_ladders(history)
+    start_idx = backtester.start_index(interval)
+
+    n_bars = len(history)
+    signal_label = np.full(n_bars, 'HOLD', dtype=object)
+    signal_side = np.zeros(n_bars, dtype=np.int8)
+    strength = np.zeros(n_bars)
+    has_patterns = np.zeros(n_bars, dtype=bool)
+    ml_side = np.zeros(n_bars, dtype=np.int8)
+    ml_confidence = np.zeros(n_bars)
+    pattern_side = np.zeros(n_bars, dtype=np.int8)  # Direction of the pattern levels (1 LONG, -1 SHORT)
+    pattern_stop = np.full(n_bars, np.nan)
+    pattern_target = np.full(n_bars, np.nan)
+
+    print(f"Analyzing {n_bars - start_idx} bars...")
+    for i in range(start_idx, n_bars):
+        analysis = backtester.analyzer.analyze_at(
+            history, i, symbol, market_type, timeframe=interval, indicator_frame=indicator_frame
+        )
+        if not analysis:
+            continue
+
+        signal = analysis.get('signal', 'HOLD')
+        signal_label[i] = signal
+        signal_side[i] = 1 if signal in ['STRONG BUY', 'BUY'] else -1 if signal in ['STRONG SELL', 'SELL'] else 0
+        strength[i] = analysis.get('strength', 0)
+
+        # Same keys Backtester._entry_decision / _trade_levels read
+        has_patterns[i] = bool(analysis.get('candle_patterns_5m') or analysis.get('candle_patterns_4h'))
+        entry_exit = analysis.get('entry_exit_4h')
+        if entry_exit and entry_exit.get('stop_loss') is not None:
+            pattern_side[i] = 1 if entry_exit.get('trade_type') == 'LONG' else -1
+            pattern_stop[i] = entry_exit['stop_loss']
+            pattern_target[i] = entry_exit['take_profit']
+
+        ml_prediction = analysis.get('ml_prediction') if market_type == 'forex' else None
+        if ml_prediction:
+            direction = ml_prediction.get('direction')
+            ml_side[i] = 1 if direction == 'BULLISH' else -1 if direction == 'BEARISH' else 0
+            ml_confidence[i] = ml_prediction.get('confidence', 0)
+
+    return {
+        'symbol': symbol,
+        'interval': interval,
+        'start_index': start_idx,
+        'dates': np.asarray(history.index.strftime('%Y-%m-%d')),
+        'times': history.index.values.astype('datetime64[ns]').astype(np.int64),
+        'high': history['high'].to_numpy(dtype=float),
+        'low': history['low'].to_numpy(dtype=float),
+        'close': history['close'].to_numpy(dtype=float),
+        'signal': signal_label,
+        'signal_side': signal_side,
+        'strength': strength,
+        'has_patterns': has_patterns,
+        'ml_side': ml_side,
+        'ml_confidence': ml_confidence,
+        'pattern_side': pattern_side,
+        'pattern_stop': pattern_stop,
+        'pattern_target': pattern_target,
+        'ladders': {direction: {key: np.asarray(ladder[key], dtype=float) for key in ('stop_loss', 'take_profit')}
+                    for direction, ladder in ladders.items()}
+    }
+
+
+def entry_signals(bars, params):
+    """
+    Entry direction per bar (1 LONG, -1 SHORT, 0 none) under one parameter set
+
+    Array version of Backtester._entry_decision.
+    """
+    signal_ok = (bars['signal_side'] != 0) & (bars['strength'] >= params['signal_threshold'])
+    ml_ok = (bars['ml_side'] != 0) & (bars['ml_confidence'] >= params['ml_threshold'])
+    score = signal_ok.astype(int) + bars['has_patterns'] + ml_ok
+
+    direction = np.where(signal_ok, bars['signal_side'], 0)
+    direction = np.where((direction == 0) & ml_ok, bars['ml_side'], direction)
+    return np.where(score >= params['min_score'], direction, 0).astype(np.int8)
+
+
+def trade_levels(bars, signals, params):
+    """
+    Stop loss and take profit per bar for the entry direction
+
+    Array version of Backtester._trade_levels.
+    """
+    close = bars['close']
+    is_long = signals > 0
+    stop_loss = np.where(is_long, close * (1 - params['stop_loss_pct']), close * (1 + params['stop_loss_pct']))
+    take_profit = np.where(is_long, close * (1 + params['take_profit_pct']), close * (1 - params['take_profit_pct']))
+
+    if params.get('dynamic_stops'):
+        ladders = bars['ladders']
+        stop_loss = np.where(is_long, ladders['LONG']['stop_loss'], ladders['SHORT']['stop_loss'])
+        take_profit = np.where(is_long, ladders['LONG']['take_profit'], ladders['SHORT']['take_profit'])
+
+    # Pattern entry/exit recommendations take precedence when they point the same way
+    use_pattern = (bars['pattern_side'] == signals) & (signals != 0)
+    stop_loss = np.where(use_pattern, bars['pattern_stop'], stop_loss)
+    take_profit = np.where(use_pattern, bars['pattern_target'], take_profit)
+    return stop_loss, take_profit
+
+
+def run_parameter_set(bars, params, backtester):
+    """
+    Backtest one parameter set on prepared bars
+
+    Returns:
+        dict: The parameters followed by Backtester.analyze_results metrics
+    """
+    signals = entry_signals(bars, params)
+    stop_loss, take_profit = trade_levels(bars, signals, params)
+
+    result = run_vectorized_backtest(
+        bars['high'], bars['low'], bars['close'], signals, stop_loss, take_profit,
+        backtester.initial_capital, params['risk_per_trade'], bars['start_index'],
+        max_position=params['max_position']
+    )
+
+    dates = bars['dates']
+    trades = [{
+        'pnl': float(pnl),
+        'exit_reason': EXIT_REASONS[int(code)]
+    } for pnl, code in zip(result['pnl'], result['exit_code'])]
+    equity_history = [(dates[bars['start_index']], backtester.initial_capital)] + [
+        (dates[exit_index], float(capital)) for exit_index, capital in zip(result['exit_index'], result['equity'])
+    ]
+
+    metrics = backtester.analyze_results(trades, equity_history)
+    metrics.pop('error', None)
+    by_exit_reason = metrics.pop('by_exit_reason', {})
+
+    row = {name: params[name] for name in SWEEP_PARAMETERS}
+    row.update(metrics)
+    for reason, data in by_exit_reason.items():
+        row[f"{reason.lower()}_count"] = data['count']
+    return row
+
+
+def _init_worker(bars, initial_capital):
+    """Keep the prepared bars in each worker process"""
+    global _worker_bars, _worker_backtester
+    _worker_bars = bars
+    _worker_backtester = Backtester(initial_capital=initial_capital)
+
+
+def _run_in_worker(params):
+    """Run one parameter set in a worker process"""
+    return run_parameter_set(_worker_bars, params, _worker_backtester)
+
+
+def grid_parameter_sets(grid):
+    """
+    Every combination of a parameter grid
+
+    Args:
+        grid: dict of parameter name -> list of values
+
+    Returns:
+        list: Parameter override dicts
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def _sample(spec, rng):
+    """One random value: (low, high) range (int if both ints) or list of choices"""
+    if isinstance(spec, tuple):
+        low, high = spec
+        if isinstance(low, int) and isinstance(high, int):
+            return rng.randint(low, high)
+        return round(rng.uniform(low, high), 6)
+    return rng.choice(spec)
+
+
+def random_parameter_sets(space, samples, seed=42):
+    """
+    Random samples from a search space
+
+    Args:
+        space: dict of parameter name -> (low, high) range or list of choices
+        samples: Number of parameter sets
+        seed: Random seed
+
+    Returns:
+        list: Parameter override dicts
+    """
+    rng = random.Random(seed)
+    return [{name: _sample(spec, rng) for name, spec in space.items()} for _ in range(samples)]
+
+
+def refined_parameter_sets(space, best, samples, scale, seed=42):
+    """
+    Random samples around the best parameter sets so far
+
+    Ranges shrink to `scale` of their width, centred on each of the best
+    sets; choice parameters keep the best set's value.
+    """
+    rng = random.Random(seed)
+    parameter_sets = []
+    for k in range(samples):
+        centre = best[k % len(best)]
+        overrides = {}
+        for name, spec in space.items():
+            if isinstance(spec, tuple):
+                low, high = spec
+                half = (high - low) * scale / 2
+                local = (max(low, centre[name] - half), min(high, centre[name] + half))
+                if isinstance(low, int) and isinstance(high, int):
+                    local = (int(round(local[0])), int(round(local[1])))
+                overrides[name] = _sample(local, rng)
+            else:
+                overrides[name] = centre[name]
+        parameter_sets.append(overrides)
+    return parameter_sets
+
+
+class ParameterSweep:
+    """
+    Grid or random search over strategy parameters for one symbol
+    """
+
+    def __init__(self, initial_capital=10000, risk_per_trade=0.01, max_workers=None):
+        """
+        Args:
+            initial_capital: Starting capital of every run
+            risk_per_trade: Default risk per trade (0.01 = 1%)
+            max_workers: Worker processes (defaults to the CPU count; 1 runs in-process)
+        """
+        self.initial_capital = initial_capital
+        self.risk_per_trade = risk_per_trade
+        self.max_workers = max_workers or os.cpu_count()
+        self.backtester = Backtester(initial_capital=initial_capital, risk_per_trade=risk_per_trade)
+
+    def _full_params(self, bars, overrides):
+        """Strategy settings of the interval with one run's overrides applied"""
+        params = strategy_params(bars['interval'])
+        params['risk_per_trade'] = self.risk_per_trade
+        params['dynamic_stops'] = False
+        params.update(overrides)
+        return params
+
+    def run(self, bars, parameter_sets):
+        """
+        Backtest many parameter sets on prepared bars
+
+        Args:
+            bars: Output of prepare_sweep_bars
+            parameter_sets: List of parameter override dicts
+
+        Returns:
+            list: One result row per parameter set (same order)
+        """
+        full_sets = [self._full_params(bars, overrides) for overrides in parameter_sets]
+
+        if self.max_workers > 1 and len(full_sets) > 1:
+            workers = min(self.max_workers, len(full_sets))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(bars, self.initial_capital)) as executor:
+                chunksize = max(1, len(full_sets) // (workers * 4))
+                return list(executor.map(_run_in_worker, full_sets, chunksize=chunksize))
+
+        return [run_parameter_set(bars, params, self.backtester) for params in full_sets]
+
+    def grid_search(self, bars, grid):
+        """Run every combination of a parameter grid"""
+        return self.run(bars, grid_parameter_sets(grid))
+
+    def random_search(self, bars, space, samples=50, refine_rounds=0, objective='sharpe_ratio', seed=42):
+        """
+        Random search, optionally refined around the best results
+
+        Each refinement round samples `samples` new sets around the top five
+        results so far within ranges half as wide as the previous round.
+
+        Returns:
+            list: Result rows of every evaluated parameter set
+        """
+        results = self.run(bars, random_parameter_sets(space, samples, seed))
+        scale = 0.5
+        for round_number in range(refine_rounds):
+            best = rank_results(results, objective)[:5]
+            results += self.run(bars, refined_parameter_sets(space, best, samples, scale, seed + round_number + 1))
+            scale /= 2
+        return results
+
+
+def rank_results(results, objective='sharpe_ratio'):
+    """Result rows sorted best first by an analyze_results metric"""
+    def key(row):
+        value = row.get(objective)
+        return float('-inf') if value is None or (isinstance(value, float) and np.isnan(value)) else value
+    return sorted(results, key=key, reverse=True)
+
+
+def save_results(results, filename='sweep_results.csv', objective='sharpe_ratio'):
+    """
+    Write the results table (best first) to CSV
+
+    Returns:
+        DataFrame with the results
+    """
+    table = pd.DataFrame(rank_results(results, objective))
+    table.to_csv(filename, index=False)
+    print(f"SUCCESS: {len(table)} results saved to {filename}")
+    return table
+
+
+def _parse_values(text):
+    """'15,20,25' -> [15, 20, 25]; 'true,false' -> [True, False]"""
+    values = []
+    for item in text.split(','):
+        item = item.strip()
+        if item.lower() in ('true', 'false'):
+            values.append(item.lower() == 'true')
+        else:
+            number = float(item)
+            values.append(int(number) if number.is_integer() and '.' not in item else number)
+    return values
+
+
+def _parse_spec(items, ranges=False):
+    """NAME=VALUES command-line items -> grid lists or search-space ranges"""
+    spec = {}
+    for item in items or []:
+        name, _, text = item.partition('=')
+        if name not in SWEEP_PARAMETERS:
+            raise SystemExit(f"Unknown parameter '{name}' (choose from {', '.join(SWEEP_PARAMETERS)})")
+        if ranges and ':' in text:
+            low, high = _parse_values(text.replace(':', ','))
+            spec[name] = (low, high)
+        else:
+            spec[name] = _parse_values(text)
+    return spec
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Sweep Backtester strategy parameters over one symbol'
+    )
+    parser.add_argument('--symbol', default='EURUSD=X', help='Symbol to backtest (default: EURUSD=X)')
+    parser.add_argument('--market', choices=['crypto', 'forex'], default='forex', help='Market type')
+    parser.add_argument('--start', required=True, help='Start date (YYYY-MM-DD)')
+    parser.add_argument('--end', required=True, help='End date (YYYY-MM-DD)')
+    parser.add_argument('--interval', default='1d', help='Data interval (default: 1d)')
+    parser.add_argument('--grid', nargs='+', metavar='NAME=V1,V2',
+                        help='Grid values, e.g. signal_threshold=15,20,25 stop_loss_pct=0.02,0.03')
+    parser.add_argument('--random', type=int, metavar='N', help='Random search with N samples per round')
+    parser.add_argument('--space', nargs='+', metavar='NAME=LOW:HIGH',
+                        help='Random search ranges (or comma-separated choices)')
+    parser.add_argument('--refine', type=int, default=0, help='Refinement rounds around the best results')
+    parser.add_argument('--objective', default='sharpe_ratio', help='Metric used for ranking (default: sharpe_ratio)')
+    parser.add_argument('--capital', type=float, default=10000, help='Initial capital (default: 10000)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--output', default='sweep_results.csv', help='Results CSV (default: sweep_results.csv)')
+    args = parser.parse_args()
+
+    sweep = ParameterSweep(initial_capital=args.capital, max_workers=args.workers)
+
+    start = time.time()
+    bars = prepare_sweep_bars(args.symbol, args.market, args.start, args.end, args.interval, sweep.backtester)
+    if bars is None:
+        return
+    print(f"Prepared {len(bars['close'])} bars in {time.time() - start:.1f}s")
+
+    start = time.time()
+    if args.random:
+        results = sweep.random_search(bars, _parse_spec(args.space, ranges=True), args.random,
+                                      args.refine, args.objective)
+    else:
+        results = sweep.grid_search(bars, _parse_spec(args.grid))
+    print(f"Ran {len(results)} backtests in {time.time() - start:.1f}s")
+
+    table = save_results(results, args.output, args.objective)
+    print(table.head(10).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+"""
+Pattern Occurrence Index
+Persists candlestick pattern occurrences per (symbol, interval) for fast historical queries
+"""
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from candle_analysis import CandlePatternAnalyzer, PATTERN_DEFINITIONS
+
+
+PATTERN_NAMES = [name for name, _, _, _ in PATTERN_DEFINITIONS]
+
+# Candles of context the longest pattern (3-candle stars/soldiers) looks back over
+CONTEXT_BARS = 2
+
+
+def _timestamp_value(value):
+    """Convert a date-like value to int64 nanoseconds (naive values treated as UTC)"""
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize('UTC')
+    return ts.value
+
+
+class PatternIndex:
+    """
+    Every pattern occurrence stored as a sorted int32 array of bar offsets,
+    alongside the bar timestamps and closes needed for forward-return queries
+    """
+
+    def __init__(self, symbol, interval, base_dir='data/pattern_index'):
+        """
+        Args:
+            symbol: Trading symbol
+            interval: Candle interval (e.g., '4h', '1d')
+            base_dir: Directory holding the persisted index files
+        """
+        self.symbol = symbol
+        self.interval = interval
+        self.base_dir = base_dir
+        self.analyzer = CandlePatternAnalyzer()
+
+        self.timestamps = np.array([], dtype=np.int64)
+        self.close = np.array([], dtype=float)
+        self.context = np.empty((0, 4), dtype=float)  # Last OHLC rows (CONTEXT_BARS + 1) for incremental scans
+        self.offsets = {name: np.array([], dtype=np.int32) for name in PATTERN_NAMES}
+
+    @property
+    def path(self):
+        """File path of the persisted index"""
+        safe_symbol = self.symbol.replace('/', '_').replace('=', '_')
+        return os.path.join(self.base_dir, f"{safe_symbol}_{self.interval}.npz")
+
+    @classmethod
+    def load(cls, symbol, interval, base_dir='data/pattern_index'):
+        """
+        Load an index from disk (returns an empty index if none exists yet)
+
+        Returns:
+            PatternIndex
+        """
+        index = cls(symbol, interval, base_dir)
+        if not os.path.exists(index.path):
+            return index
+
+        with np.load(index.path, allow_pickle=False) as data:
+            index.timestamps = data['timestamps']
+            index.close = data['close']
+            index.context = data['context']
+            stored_names = list(data['pattern_names'])
+            for i, name in enumerate(stored_names):
+                if name in index.offsets:
+                    index.offsets[name] = data[f'pattern_{i}']
+
+        return index
+
+    def save(self):
+        """Persist the index to disk"""
+        os.makedirs(self.base_dir, exist_ok=True)
+        arrays = {
+            'timestamps': self.timestamps,
+            'close': self.close,
+            'context': self.context,
+            'pattern_names': np.array(PATTERN_NAMES),
+        }
+        for i, name in enumerate(PATTERN_NAMES):
+            arrays[f'pattern_{i}'] = self.offsets[name]
+
+        # Write then rename so readers never see a partial file
+        tmp_path = self.path + '.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def update(self, df):
+        """
+        Append bars newer than the last indexed bar
+
+        The last indexed bar is scanned again (it may still have been forming
+        when it was stored), so only it and the new bars (plus the stored
+        context candles) are scanned and keeping the index current costs
+        O(new bars).
+
+        Args:
+            df: DataFrame with OHLC data (DatetimeIndex)
+
+        Returns:
+            int: Number of bars scanned (new bars plus the re-scanned last bar)
+        """
+        if df is None or len(df) == 0:
+            return 0
+
+        # Nanoseconds since epoch (UTC for tz-aware indexes)
+        index_values = pd.DatetimeIndex(df.index).as_unit('ns').asi8
+
+        if len(self.timestamps):
+            last = self.timestamps[-1]
+            # Rescanning needs the context before the last bar (older files kept CONTEXT_BARS rows)
+            rescan = len(self.context) == min(len(self.timestamps), CONTEXT_BARS + 1)
+            if rescan and (index_values == last).any():
+                self._drop_last_bar()
+                new_mask = index_values >= last
+            else:
+                new_mask = index_values > last
+        else:
+            new_mask = np.ones(len(df), dtype=bool)
+
+        if not new_mask.any():
+            return 0
+
+        new_bars = df.loc[new_mask, ['open', 'high', 'low', 'close']]
+        new_times = index_values[new_mask]
+
+        context_frame = pd.DataFrame(self.context, columns=['open', 'high', 'low', 'close'])
+        frame = pd.concat([context_frame, new_bars.reset_index(drop=True)], ignore_index=True)
+        scan = self.analyzer.scan_patterns(frame)
+
+        skip = len(self.context)
+        base_offset = len(self.timestamps)
+
+        for name in PATTERN_NAMES:
+            hits = np.flatnonzero(scan[name].to_numpy()[skip:]).astype(np.int32) + base_offset
+            if len(hits):
+                self.offsets[name] = np.concatenate([self.offsets[name], hits])
+
+        self.timestamps = np.concatenate([self.timestamps, new_times.astype(np.int64)])
+        self.close = np.concatenate([self.close, new_bars['close'].to_numpy(dtype=float)])
+        self.context = frame[['open', 'high', 'low', 'close']].to_numpy(dtype=float)[-(CONTEXT_BARS + 1):]
+
+        return int(new_mask.sum())
+
+    def _drop_last_bar(self):
+        """Remove the last indexed bar and its occurrences (context keeps the bars before it)"""
+        last_offset = len(self.timestamps) - 1
+        for name in PATTERN_NAMES:
+            offsets = self.offsets[name]
+            if len(offsets) and offsets[-1] == last_offset:
+                self.offsets[name] = offsets[:-1]
+        self.timestamps = self.timestamps[:-1]
+        self.close = self.close[:-1]
+        self.context = self.context[:-1]
+
+    def _bar_range(self, start=None, end=None):
+        """Convert a date range to a [first, last) bar offset range"""
+        first = 0 if start is None else int(np.searchsorted(self.timestamps, _timestamp_value(start), 'left'))
+        last = len(self.timestamps) if end is None else \
+            int(np.searchsorted(self.timestamps, _timestamp_value(end), 'right'))
+        return first, last
+
+    def occurrences(self, pattern, start=None, end=None):
+        """
+        Bar offsets where a pattern occurred
+
+        Args:
+            pattern: Pattern name (e.g., 'Bullish Engulfing')
+            start: Optional start date (inclusive)
+            end: Optional end date (inclusive)
+
+        Returns:
+            numpy int32 array of bar offsets
+        """
+        if pattern not in self.offsets:
+            raise ValueError(f"Unknown pattern: {pattern}")
+
+        offsets = self.offsets[pattern]
+        first, last = self._bar_range(start, end)
+        lo = np.searchsorted(offsets, first, 'left')
+        hi = np.searchsorted(offsets, last, 'left')
+        return offsets[lo:hi]
+
+    def occurrence_dates(self, pattern, start=None, end=None):
+        """Timestamps (UTC) of a pattern's occurrences"""
+        offsets = self.occurrences(pattern, start, end)
+        return pd.to_datetime(self.timestamps[offsets], utc=True)
+
+    def count(self, pattern, start=None, end=None):
+        """Number of occurrences of a pattern in a date range"""
+        return int(len(self.occurrences(pattern, start, end)))
+
+    def forward_returns(self, pattern, horizon=5, start=None, end=None):
+        """
+        Percent price change from each occurrence's close to the close
+        `horizon` bars later (occurrences without enough future bars are skipped)
+
+        Returns:
+            numpy float array of returns in percent
+        """
+        offsets = self.occurrences(pattern, start, end)
+        offsets = offsets[offsets + horizon < len(self.close)]
+        entry = self.close[offsets]
+        exit_ = self.close[offsets + horizon]
+        return (exit_ - entry) / entry * 100
+
+    def forward_return_stats(self, pattern, horizon=5, start=None, end=None):
+        """
+        Distribution of forward returns after a pattern
+
+        Returns:
+            dict: count, mean, median, std, win_rate and 5/25/75/95th percentiles (percent)
+        """
+        returns = self.forward_returns(pattern, horizon, start, end)
+
+        if len(returns) == 0:
+            return {'pattern': pattern, 'horizon': horizon, 'count': 0}
+
+        p5, p25, p75, p95 = np.percentile(returns, [5, 25, 75, 95])
+        return {
+            'pattern': pattern,
+            'horizon': horizon,
+            'count': int(len(returns)),
+            'mean': float(returns.mean()),
+            'median': float(np.median(returns)),
+            'std': float(returns.std(ddof=1)) if len(returns) > 1 else 0.0,
+            'win_rate': float((returns > 0).mean() * 100),
+            'p5': float(p5),
+            'p25': float(p25),
+            'p75': float(p75),
+            'p95': float(p95),
+        }
+
+    def summary(self, horizon=5, start=None, end=None):
+        """Forward-return stats for every pattern"""
+        return {name: self.forward_return_stats(name, horizon, start, end) for name in PATTERN_NAMES}
+
+
+def update_pattern_index(symbol, interval, df, base_dir='data/pattern_index'):
+    """
+    Load, update and persist the index for a symbol/interval
+
+    Args:
+        symbol: Trading symbol
+        interval: Candle interval
+        df: DataFrame with the latest OHLC data
+        base_dir: Index directory
+
+    Returns:
+        PatternIndex
+    """
+    index = PatternIndex.load(symbol, interval, base_dir)
+    if index.update(df):
+        index.save()
+    return index
+
+
+def main():
+    from data_fetcher import DataFetcher
+
+    parser = argparse.ArgumentParser(
+        description='Update pattern occurrence indexes and print forward-return statistics'
+    )
+    parser.add_argument('symbols', nargs='+', help='Symbols to index (e.g. EURUSD=X BTC/USDT)')
+    parser.add_argument('--market', choices=['crypto', 'forex'], default='forex', help='Market type')
+    parser.add_argument('--interval', default='1d', help='Candle interval (default: 1d)')
+    parser.add_argument('--period', default='730d', help='Yahoo Finance period for forex (default: 730d)')
+    parser.add_argument('--limit', type=int, default=1000, help='Candles for crypto (default: 1000)')
+    parser.add_argument('--horizon', type=int, default=5, help='Bars ahead for forward returns (default: 5)')
+    parser.add_argument('--base-dir', default='data/pattern_index',
+                        help='Index directory (default: data/pattern_index)')
+    args = parser.parse_args()
+
+    fetcher = DataFetcher()
+    for symbol in args.symbols:
+        if args.market == 'crypto':
+            df = fetcher.fetch_crypto_data(symbol, args.interval, args.limit)
+        else:
+            df = fetcher.fetch_forex_data(symbol, period=args.period, interval=args.interval)
+        if df is None or len(df) == 0:
+            print(f"  {symbol} ({args.interval}): no data")
+            continue
+
+        index = update_pattern_index(symbol, args.interval, df, args.base_dir)
+        print(f"  {symbol} ({args.interval}): {len(index)} bars indexed")
+        for name, stats in index.summary(args.horizon).items():
+            if stats['count']:
+                print(f"    {name:22s} {stats['count']:5d} hits  mean {stats['mean']:+.2f}%  "
+                      f"win rate {stats['win_rate']:.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+Streaming Performance Metrics
+Constant-memory version of Backtester.analyze_results, updated one closed trade at a time
+"""
+import json
+import math
+
+
+class TradeLog:
+    """
+    Append-only JSON Lines file of closed trades (one compact line per trade)
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: File to append to (created if missing)
+        """
+        self.path = path
+        self.file = open(path, 'a')
+
+    def append(self, trade):
+        """Write one trade"""
+        self.file.write(json.dumps(trade, default=str, separators=(',', ':')) + '\n')
+
+    def close(self):
+        self.file.close()
+
+    @staticmethod
+    def read(path):
+        """
+        Trades stored in a log
+
+        Yields:
+            Trade dicts in the order they were closed
+        """
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class MetricsAccumulator:
+    """
+    Running backtest metrics without keeping trades or the equity curve
+
+    Sharpe ratio uses Welford's running mean/variance of the per-trade
+    equity returns, max drawdown a running peak; both match the equity
+    history that Backtester.analyze_results reads (initial capital, then the
+    capital after every trade).
+    """
+
+    def __init__(self, initial_capital=10000, trade_log=None):
+        """
+        Args:
+            initial_capital: Starting capital
+            trade_log: Optional TradeLog that receives every closed trade
+        """
+        self.initial_capital = initial_capital
+        self.trade_log = trade_log
+
+        self.capital = initial_capital
+        self.total_trades = 0
+        self.winning_trades = 0
+        self.losing_trades = 0
+        self.total_profit = 0.0
+        self.total_loss = 0.0
+
+        # Welford state of equity returns
+        self.return_count = 0
+        self.return_mean = 0.0
+        self.return_m2 = 0.0
+
+        self.peak = initial_capital
+        self.max_drawdown = 0.0
+
+        self.by_exit_reason = {}  # reason -> [count, pnl sum]
+
+    def add_trade(self, trade):
+        """
+        Update the metrics with a closed trade
+
+        Args:
+            trade: Trade dict with 'pnl', 'exit_reason' and 'final_capital'
+        """
+        pnl = trade['pnl']
+        self.total_trades += 1
+        if pnl > 0:
+            self.winning_trades += 1
+            self.total_profit += pnl
+        elif pnl < 0:
+            self.losing_trades += 1
+            self.total_loss += -pnl
+
+        reason = self.by_exit_reason.setdefault(trade['exit_reason'], [0, 0.0])
+        reason[0] += 1
+        reason[1] += pnl
+
+        self.add_equity(trade['final_capital'])
+
+        if self.trade_log is not None:
+            self.trade_log.append(trade)
+
+    def add_equity(self, capital):
+        """Update the equity statistics with the capital after a trade"""
+        if self.capital != 0:
+            change = capital / self.capital - 1
+            self.return_count += 1
+            delta = change - self.return_mean
+            self.return_mean += delta / self.return_count
+            self.return_m2 += delta * (change - self.return_mean)
+        self.capital = capital
+
+        self.peak = max(self.peak, capital)
+        if self.peak > 0:
+            self.max_drawdown = max(self.max_drawdown, (self.peak - capital) / self.peak)
+
+    def sharpe_ratio(self):
+        """Annualized Sharpe ratio of the per-trade equity returns (as in analyze_results)"""
+        if self.return_count < 2:
+            return 0.0
+        std = math.sqrt(self.return_m2 / (self.return_count - 1))
+        return self.return_mean / std * math.sqrt(252) if std > 0 else 0.0
+
+    def metrics(self):
+        """
+        Metrics in the format of Backtester.analyze_results
+
+        Returns:
+            Dictionary with performance metrics
+        """
+        if not self.total_trades:
+            return {
+                'error': 'No trades executed',
+                'initial_capital': self.initial_capital,
+                'final_capital': self.initial_capital,
+                'total_return': 0.0,
+                'total_trades': 0,
+                'winning_trades': 0,
+                'losing_trades': 0,
+                'win_rate': 0.0,
+                'total_profit': 0.0,
+                'total_loss': 0.0,
+                'avg_win': 0.0,
+                'avg_loss': 0.0,
+                'profit_factor': None,
+                'sharpe_ratio': 0.0,
+                'max_drawdown': 0.0,
+                'by_exit_reason': {},
+            }
+
+        return {
+            'initial_capital': self.initial_capital,
+            'final_capital': float(self.capital),
+            'total_return': float((self.capital - self.initial_capital) / self.initial_capital * 100),
+            'total_trades': self.total_trades,
+            'winning_trades': self.winning_trades,
+            'losing_trades': self.losing_trades,
+            'win_rate': self.winning_trades / self.total_trades * 100,
+            'total_profit': float(self.total_profit),
+            'total_loss': float(self.total_loss),
+            'avg_win': self.total_profit / self.winning_trades if self.winning_trades else 0.0,
+            'avg_loss': self.total_loss / self.losing_trades if self.losing_trades else 0.0,
+            'profit_factor': float(self.total_profit / self.total_loss) if self.total_loss > 0 else None,
+            'sharpe_ratio': float(self.sharpe_ratio()),
+            'max_drawdown': float(self.max_drawdown * 100),
+            'by_exit_reason': {
+                reason: {'count': count, 'avg_pnl': float(pnl / count)}
+                for reason, (count, pnl) in self.by_exit_reason.items()
+            },
+        }
+
+
+def replay_metrics(pnl, exit_reason, final_capital, initial_capital):
+    """
+    Metrics of stored trades (e.g. a trade log) as one equity path
+
+    Args:
+        pnl, exit_reason, final_capital: Per-trade arrays in closing order
+        initial_capital: Capital before the first trade
+
+    Returns:
+        Dictionary in the format of Backtester.analyze_results
+    """
+    accumulator = MetricsAccumulator(initial_capital)
+    for trade_pnl, reason, capital in zip(pnl.tolist(), exit_reason.tolist(), final_capital.tolist()):
+        accumulator.add_trade({'pnl': trade_pnl, 'exit_reason': reason, 'final_capital': capital})
+    return accumulator.metrics()
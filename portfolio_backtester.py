@@ -0,0 +1,381 @@
+"""
+Portfolio Backtesting Module
+Trades many symbols on one time-ordered timeline with a shared capital pool,
+position limits and exposure caps per asset class and currency
+"""
+import argparse
+import heapq
+import json
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from backtester import Backtester, strategy_params
+from parameter_sweep import prepare_sweep_bars, entry_signals, trade_levels
+from vectorized_backtest import first_exits, EXIT_REASONS, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT, EXIT_END_OF_PERIOD
+
+
+def symbol_legs(symbol):
+    """
+    Currencies/assets a symbol is long and short of when bought
+
+    'EURUSD=X' -> ('EUR', 'USD'), 'BTC/USDT' -> ('BTC', 'USDT'), other -> (symbol, None)
+    """
+    if '/' in symbol:
+        base, quote = symbol.split('/', 1)
+        return base, quote
+    pair = symbol.replace('=X', '')
+    if symbol.endswith('=X') and len(pair) == 6:
+        return pair[:3], pair[3:]
+    return symbol, None
+
+
+def _prepare_in_worker(task):
+    """Prepare one symbol in a worker process"""
+    settings, symbol, market_type, start_date, end_date, interval = task
+    return PortfolioBacktester(**settings).prepare_symbol(symbol, market_type, start_date, end_date, interval)
+
+
+class PortfolioBacktester:
+    """
+    Backtests several symbols at once against one capital pool
+
+    Entry signals, stops and targets come from the same per-bar analysis and
+    rules as Backtester. Each symbol holds at most one position; entries are
+    taken in time order as long as the portfolio limits allow them.
+    """
+
+    def __init__(self, initial_capital=10000, risk_per_trade=0.01, max_positions=5,
+                 asset_class_caps=None, currency_cap=None, max_exposure=1.0,
+                 dynamic_stops=False, strategy=None, max_workers=1):
+        """
+        Args:
+            initial_capital: Starting capital shared by all symbols
+            risk_per_trade: Risk percentage per trade (0.01 = 1%)
+            max_positions: Maximum open positions across all symbols
+            asset_class_caps: Optional dict market type -> largest share of capital in open
+                              positions of that class (e.g. {'crypto': 0.3, 'forex': 0.5})
+            currency_cap: Optional largest net share of capital long or short any single
+                          currency/asset across open positions (correlated exposure)
+            max_exposure: Largest share of capital in open positions overall
+            dynamic_stops: Use the EntryExitCalculator stop ladder instead of fixed 3%/6% levels
+            strategy: Optional overrides of the strategy settings (see strategy_params)
+            max_workers: Processes analyzing symbols in parallel before the portfolio pass
+        """
+        self.initial_capital = initial_capital
+        self.risk_per_trade = risk_per_trade
+        self.max_positions = max_positions
+        self.asset_class_caps = asset_class_caps or {}
+        self.currency_cap = currency_cap
+        self.max_exposure = max_exposure
+        self.dynamic_stops = dynamic_stops
+        self.strategy = strategy or {}
+        self.max_workers = max_workers
+        self.backtester = Backtester(initial_capital=initial_capital, risk_per_trade=risk_per_trade)
+
+    def prepare_symbol(self, symbol, market_type, start_date, end_date, interval):
+        """
+        Candidate trades of one symbol: every entry signal with its levels and exit
+
+        Returns:
+            dict of per-candidate arrays, or None if no data is available
+        """
+        bars = prepare_sweep_bars(symbol, market_type, start_date, end_date, interval, self.backtester)
+        if bars is None:
+            return None
+
+        params = strategy_params(interval, self.strategy)
+        params['dynamic_stops'] = self.dynamic_stops
+        signals = entry_signals(bars, params)
+        stop_loss, take_profit = trade_levels(bars, signals, params)
+
+        candidates = np.flatnonzero(signals != 0)
+        candidates = candidates[candidates >= bars['start_index']]
+        exit_index, exit_code = first_exits(
+            bars['high'], bars['low'], candidates, signals[candidates],
+            stop_loss[candidates], take_profit[candidates]
+        )
+
+        # Trades still open at the end close at the last bar
+        open_at_end = exit_index >= len(bars['close'])
+        exit_code[open_at_end] = EXIT_END_OF_PERIOD
+        exit_index[open_at_end] = len(bars['close']) - 1
+
+        return {
+            'symbol': symbol,
+            'market_type': market_type,
+            'legs': symbol_legs(symbol),
+            'max_position': params['max_position'],
+            'times': bars['times'],
+            'close': bars['close'],
+            'signal': bars['signal'],
+            'strength': bars['strength'],
+            'entry_index': candidates,
+            'direction': signals[candidates],
+            'stop_loss': stop_loss[candidates],
+            'take_profit': take_profit[candidates],
+            'exit_index': exit_index,
+            'exit_code': exit_code
+        }
+
+    @staticmethod
+    def _candidate_stream(k, data):
+        """(entry time, symbol number, candidate number) for one symbol, oldest first"""
+        entry_times = data['times'][data['entry_index']]
+        return zip(entry_times.tolist(), [k] * len(entry_times), range(len(entry_times)))
+
+    def _blocking_limit(self, position_size, market_type, legs, direction, capital, state):
+        """
+        Portfolio limit a new position would break
+
+        Returns:
+            None if allowed, otherwise the name of the limit that blocks it
+        """
+        if len(state['open']) >= self.max_positions:
+            return 'max_positions'
+        if state['exposure'] + position_size > self.max_exposure * capital:
+            return 'max_exposure'
+
+        cap = self.asset_class_caps.get(market_type)
+        if cap is not None and state['class_exposure'].get(market_type, 0) + position_size > cap * capital:
+            return f"{market_type}_cap"
+
+        if self.currency_cap is not None:
+            base, quote = legs
+            for currency, sign in ((base, direction), (quote, -direction)):
+                if currency is None:
+                    continue
+                net = state['currency_exposure'].get(currency, 0) + sign * position_size
+                if abs(net) > self.currency_cap * capital:
+                    return f"{currency}_cap"
+        return None
+
+    def _change_exposure(self, state, trade, sign):
+        """Add (sign=1) or remove (sign=-1) a position's exposure"""
+        size = trade['position_size'] * sign
+        direction = 1 if trade['direction'] == 'LONG' else -1
+        state['exposure'] += size
+        state['class_exposure'][trade['market_type']] = state['class_exposure'].get(trade['market_type'], 0) + size
+        base, quote = trade['legs']
+        if base is not None:
+            state['currency_exposure'][base] = state['currency_exposure'].get(base, 0) + direction * size
+        if quote is not None:
+            state['currency_exposure'][quote] = state['currency_exposure'].get(quote, 0) - direction * size
+
+    def backtest_portfolio(self, symbols, start_date, end_date, interval='1d'):
+        """
+        Backtest a portfolio
+
+        Args:
+            symbols: List of (symbol, market_type) tuples
+            start_date: Start date (YYYY-MM-DD)
+            end_date: End date (YYYY-MM-DD)
+            interval: Data interval
+
+        Returns:
+            (trades, equity_history, rejected) where rejected counts entry signals
+            skipped per portfolio limit
+        """
+        print(f"\n{'='*60}")
+        print(f"Portfolio backtest: {len(symbols)} symbols")
+        print(f"Period: {start_date} to {end_date} ({interval})")
+        print(f"Initial Capital: ${self.initial_capital:,.2f}")
+        print(f"Max Positions: {self.max_positions}")
+        print(f"{'='*60}\n")
+
+        # Per-symbol analysis is independent, so it may run in parallel
+        if self.max_workers > 1 and len(symbols) > 1:
+            settings = {
+                'initial_capital': self.initial_capital,
+                'risk_per_trade': self.risk_per_trade,
+                'dynamic_stops': self.dynamic_stops,
+                'strategy': self.strategy
+            }
+            tasks = [(settings, symbol, market_type, start_date, end_date, interval) for symbol, market_type in symbols]
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(symbols))) as executor:
+                prepared = list(executor.map(_prepare_in_worker, tasks))
+        else:
+            prepared = [self.prepare_symbol(symbol, market_type, start_date, end_date, interval)
+                        for symbol, market_type in symbols]
+        universe = [data for data in prepared if data is not None]
+
+        capital = self.initial_capital
+        trades = []
+        equity_history = [(start_date, capital)]
+        rejected = {}
+        state = {'open': {}, 'exposure': 0.0, 'class_exposure': {}, 'currency_exposure': {}}
+        exits = []          # heap of (exit time, sequence, symbol number)
+        blocked_until = {}  # symbol number -> last bar of its previous trade
+        sequence = 0
+
+        def close_next():
+            nonlocal capital
+            _, _, k = heapq.heappop(exits)
+            trade = state['open'].pop(k)
+            data = universe[k]
+            c = trade.pop('_candidate')
+            code = int(data['exit_code'][c])
+            if code == EXIT_STOP_LOSS:
+                exit_price = float(data['stop_loss'][c])
+            elif code == EXIT_TAKE_PROFIT:
+                exit_price = float(data['take_profit'][c])
+            else:
+                exit_price = float(data['close'][data['exit_index'][c]])
+            exit_date = str(pd.Timestamp(int(data['times'][data['exit_index'][c]])))
+
+            capital = self.backtester._close_trade(trade, exit_price, EXIT_REASONS[code], exit_date, capital)
+            self._change_exposure(state, trade, -1)
+            trade.pop('legs')
+            trades.append(trade)
+            equity_history.append((exit_date, capital))
+
+        # One time-ordered pass over the entry signals of every symbol
+        streams = [self._candidate_stream(k, data) for k, data in enumerate(universe)]
+        for entry_time, k, c in heapq.merge(*streams):
+            # Exits up to and including this bar free capital first
+            while exits and exits[0][0] <= entry_time:
+                close_next()
+
+            data = universe[k]
+            entry_bar = int(data['entry_index'][c])
+            if k in state['open'] or entry_bar <= blocked_until.get(k, -1):
+                continue
+
+            direction = int(data['direction'][c])
+            entry_price = float(data['close'][entry_bar])
+            stop_loss = float(data['stop_loss'][c])
+
+            # Same sizing as Backtester, on the shared capital
+            risk_amount = capital * self.risk_per_trade
+            price_risk = abs(entry_price - stop_loss)
+            max_position = capital * data['max_position']
+            position_size = min(risk_amount / price_risk if price_risk > 0 else max_position, max_position)
+
+            blocked = self._blocking_limit(position_size, data['market_type'], data['legs'], direction, capital, state)
+            if blocked:
+                rejected[blocked] = rejected.get(blocked, 0) + 1
+                continue
+
+            trade = {
+                'symbol': data['symbol'],
+                'market_type': data['market_type'],
+                'entry_date': str(pd.Timestamp(entry_time)),
+                'entry_price': entry_price,
+                'stop_loss': stop_loss,
+                'take_profit': float(data['take_profit'][c]),
+                'direction': 'LONG' if direction > 0 else 'SHORT',
+                'signal': data['signal'][entry_bar],
+                'signal_strength': float(data['strength'][entry_bar]),
+                'position_size': position_size,
+                'risk_amount': risk_amount,
+                'capital_at_entry': capital,
+                'legs': data['legs'],
+                '_candidate': c
+            }
+            state['open'][k] = trade
+            self._change_exposure(state, trade, 1)
+            blocked_until[k] = int(data['exit_index'][c])
+            heapq.heappush(exits, (int(data['times'][data['exit_index'][c]]), sequence, k))
+            sequence += 1
+
+        while exits:
+            close_next()
+
+        print(f"\nSUCCESS: Portfolio backtest complete!")
+        print(f"Total Trades: {len(trades)}")
+        print(f"Final Capital: ${capital:,.2f}")
+        print(f"Total Return: {((capital - self.initial_capital) / self.initial_capital * 100):.2f}%\n")
+
+        return trades, equity_history, rejected
+
+    def analyze_results(self, trades, equity_history, rejected=None):
+        """
+        Portfolio metrics (Backtester.analyze_results) plus a per-symbol breakdown
+
+        Returns:
+            Dictionary with performance metrics
+        """
+        metrics = self.backtester.analyze_results(trades, equity_history)
+
+        by_symbol = {}
+        for trade in trades:
+            entry = by_symbol.setdefault(trade['symbol'], {'trades': 0, 'wins': 0, 'pnl': 0.0})
+            entry['trades'] += 1
+            entry['wins'] += int(trade['pnl'] > 0)
+            entry['pnl'] += float(trade['pnl'])
+        metrics['by_symbol'] = by_symbol
+        metrics['rejected_entries'] = rejected or {}
+        return metrics
+
+    def save_results(self, trades, metrics, filename='portfolio_backtest_results.json'):
+        """
+        Save portfolio backtest results to JSON
+        """
+        results = {
+            'metrics': metrics,
+            'trades': trades,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+        with open(filename, 'w') as f:
+            json.dump(results, f, indent=2, default=str)
+
+        print(f"SUCCESS: Results saved to {filename}")
+
+
+def main():
+    from data_fetcher import FOREX_PAIRS
+
+    parser = argparse.ArgumentParser(
+        description='Backtest several symbols with one shared capital pool'
+    )
+    parser.add_argument('--forex', nargs='*', default=None, help='Forex pairs (default: all supported pairs)')
+    parser.add_argument('--crypto', nargs='*', default=[], help='Crypto symbols (e.g. BTC/USDT)')
+    parser.add_argument('--start', required=True, help='Start date (YYYY-MM-DD)')
+    parser.add_argument('--end', required=True, help='End date (YYYY-MM-DD)')
+    parser.add_argument('--interval', default='1d', help='Data interval (default: 1d)')
+    parser.add_argument('--capital', type=float, default=10000, help='Initial capital (default: 10000)')
+    parser.add_argument('--risk', type=float, default=0.01, help='Risk per trade (default: 0.01)')
+    parser.add_argument('--max-positions', type=int, default=5, help='Maximum open positions (default: 5)')
+    parser.add_argument('--forex-cap', type=float, help='Largest share of capital in forex positions')
+    parser.add_argument('--crypto-cap', type=float, help='Largest share of capital in crypto positions')
+    parser.add_argument('--currency-cap', type=float, help='Largest net share of capital per currency/asset')
+    parser.add_argument('--workers', type=int, default=1, help='Processes analyzing symbols in parallel')
+    parser.add_argument('--dynamic-stops', action='store_true', help='Use ATR/support/swing stop ladders')
+    parser.add_argument('--output', default='portfolio_backtest_results.json', help='Results JSON file')
+    args = parser.parse_args()
+
+    forex = FOREX_PAIRS if args.forex is None else args.forex
+    symbols = [(symbol, 'forex') for symbol in forex] + [(symbol, 'crypto') for symbol in args.crypto]
+
+    caps = {}
+    if args.forex_cap is not None:
+        caps['forex'] = args.forex_cap
+    if args.crypto_cap is not None:
+        caps['crypto'] = args.crypto_cap
+
+    portfolio = PortfolioBacktester(
+        initial_capital=args.capital,
+        risk_per_trade=args.risk,
+        max_positions=args.max_positions,
+        asset_class_caps=caps,
+        currency_cap=args.currency_cap,
+        dynamic_stops=args.dynamic_stops,
+        max_workers=args.workers
+    )
+    trades, equity_history, rejected = portfolio.backtest_portfolio(symbols, args.start, args.end, args.interval)
+    metrics = portfolio.analyze_results(trades, equity_history, rejected)
+    portfolio.backtester.print_results(metrics, trades)
+
+    print("BY SYMBOL")
+    print("-" * 60)
+    for symbol, data in metrics['by_symbol'].items():
+        print(f"{symbol:12s}: {data['trades']:3d} trades, {data['wins']:3d} wins, P/L ${data['pnl']:+,.2f}")
+    if rejected:
+        print(f"\nSkipped entries: {rejected}")
+
+    portfolio.save_results(trades, metrics, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+"""
+Precomputation Cache
+Disk-persisted bars, indicator matrix and per-bar analyses (patterns, entry/exit, ML)
+shared by Backtester and HistoricalTester
+"""
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from data_fetcher import download_history
+from forex_prediction import FEATURE_VERSION
+from technical_indicators import calculate_indicator_frame, indicators_at
+
+
+# Modules whose code determines the cached values; editing any of them starts a new cache
+CACHED_MODULES = [
+    'data_fetcher.py', 'technical_indicators.py', 'candle_analysis.py', 'support_resistance.py',
+    'market_analyzer.py', 'forex_prediction.py', 'model_registry.py', 'precompute_cache.py'
+]
+
+_code_version = None
+
+
+def code_version():
+    """Hash of the cached modules' source and the ML feature version"""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha1(f"v{FEATURE_VERSION}".encode())
+        directory = os.path.dirname(os.path.abspath(__file__))
+        for name in CACHED_MODULES:
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+        _code_version = digest.hexdigest()[:12]
+    return _code_version
+
+
+def _json_value(value):
+    """JSON fallback for numpy scalars and other values in analyses"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class CachedPeriod:
+    """
+    One (symbol, interval, date range) entry of the cache
+
+    Analyses are stored per bar and per ML model version (the last bar the
+    model was trained on, 'none' without a model), so a bar analyzed before
+    a model was trained is never served to a run that has one, and runs
+    training their models at different bars each get their own analyses.
+
+    The outcome of every model training (history length -> success) is
+    stored with the analyses; a model's version is its last training bar,
+    so once the outcome is known a run looks up cached analyses without
+    training, and trains only when it has to analyze a bar itself.
+
+    Attributes:
+        history: OHLCV DataFrame (lowercase columns)
+        indicator_frame: calculate_indicator_frame(history)
+    """
+
+    def __init__(self, directory, symbol, market_type, interval, history, indicator_frame, analyzer):
+        self.directory = directory
+        self.symbol = symbol
+        self.market_type = market_type
+        self.interval = interval
+        self.history = history
+        self.indicator_frame = indicator_frame
+        self.analyzer = analyzer
+
+        self.analyses = self._load_analyses()  # bar -> {model version -> analysis}
+        self.training_outcomes = self._load_training_outcomes()  # history length -> trained
+        self.saved_outcomes = len(self.training_outcomes)
+        self.new_analyses = 0
+        self.hits = 0
+
+    def model_version(self, bar_index):
+        """
+        Version of the ML model the analysis at a bar uses
+
+        Asks the analyzer's registry, which trains the model on demand exactly
+        as analyze_at would, or defers the training when its outcome is
+        already cached; 'none' for crypto and bars without indicators.
+        """
+        if self.market_type != 'forex' or not indicators_at(self.indicator_frame, bar_index):
+            return 'none'
+        return self.analyzer.model_registry.model_version(
+            self.symbol, self.interval, self.history.iloc[:bar_index + 1], self.training_outcomes
+        )
+
+    def _analyses_path(self):
+        return os.path.join(self.directory, 'analyses.json')
+
+    def _load_analyses(self):
+        path = self._analyses_path()
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path) as f:
+                return {int(bar): versions for bar, versions in json.load(f).items()}
+        except Exception as e:
+            print(f"Error loading cached analyses from {path}: {e}")
+            return {}
+
+    def _training_path(self):
+        return os.path.join(self.directory, 'training.json')
+
+    def _load_training_outcomes(self):
+        path = self._training_path()
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path) as f:
+                return {int(length): trained for length, trained in json.load(f).items()}
+        except Exception as e:
+            print(f"Error loading cached training outcomes from {path}: {e}")
+            return {}
+
+    def analyze(self, bar_index):
+        """
+        Point-in-time analysis at a bar (MarketAnalyzer.analyze_at), cached
+
+        Returns:
+            dict: Analysis or None
+        """
+        model_version = self.model_version(bar_index)
+        versions = self.analyses.setdefault(bar_index, {})
+        if model_version in versions:
+            self.hits += 1
+            return versions[model_version]
+
+        analysis = self.analyzer.analyze_at(
+            self.history, bar_index, self.symbol, self.market_type,
+            timeframe=self.interval, indicator_frame=self.indicator_frame
+        )
+        versions[model_version] = analysis
+        self.new_analyses += 1
+        return analysis
+
+    def save(self):
+        """Persist analyses and training outcomes recorded since the entry was opened"""
+        if len(self.training_outcomes) != self.saved_outcomes:
+            path = self._training_path()
+            try:
+                with open(path, 'w') as f:
+                    json.dump({str(length): trained for length, trained in self.training_outcomes.items()}, f)
+                self.saved_outcomes = len(self.training_outcomes)
+            except Exception as e:
+                print(f"Error saving cached training outcomes to {path}: {e}")
+
+        if not self.new_analyses:
+            return
+
+        path = self._analyses_path()
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({str(bar): versions for bar, versions in self.analyses.items()}, f,
+                          default=_json_value, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error saving cached analyses to {path}: {e}")
+        self.new_analyses = 0
+
+
+class PrecomputeCache:
+    """
+    Cache keyed by (symbol, interval, date range, code version)
+
+    The bars and the indicator matrix are stored once per key; analyses are
+    stored per bar and ML model version as they are computed, so a
+    HistoricalTester run and a Backtester run over the same period share
+    the download and every bar either of them analyzed.
+    """
+
+    def __init__(self, base_dir='data/precompute'):
+        """
+        Args:
+            base_dir: Cache directory
+        """
+        self.base_dir = base_dir
+        self.periods = {}  # key -> CachedPeriod (reused within the process)
+
+    def key(self, symbol, interval, start_date, end_date):
+        """Directory name of an entry"""
+        safe_symbol = symbol.replace('/', '_').replace('=', '_')
+        return f"{safe_symbol}_{interval}_{start_date}_{end_date}_{code_version()}"
+
+    def open(self, symbol, market_type, start_date, end_date, interval, analyzer):
+        """
+        Cached period, downloading and computing it on the first request
+
+        Args:
+            symbol: Trading symbol
+            market_type: 'crypto' or 'forex'
+            start_date, end_date: Period (YYYY-MM-DD)
+            interval: Data interval
+            analyzer: MarketAnalyzer used for analyses that are not cached yet
+
+        Returns:
+            CachedPeriod or None if no data is available
+        """
+        key = self.key(symbol, interval, start_date, end_date)
+        period = self.periods.get(key)
+        if period is not None:
+            period.analyzer = analyzer
+            return period
+
+        directory = os.path.join(self.base_dir, key)
+        frames = self._load_frames(directory)
+        if frames is None:
+            history = download_history(symbol, market_type, start_date, end_date, interval)
+            if history is None:
+                return None
+            frames = (history, calculate_indicator_frame(history))
+            self._save_frames(directory, *frames)
+        else:
+            print(f"SUCCESS: Loaded {len(frames[0])} cached data points")
+
+        period = CachedPeriod(directory, symbol, market_type, interval, *frames, analyzer)
+        self.periods[key] = period
+        return period
+
+    @staticmethod
+    def _save_frames(directory, history, indicator_frame):
+        """Write bars and indicators as column arrays plus a JSON description"""
+        os.makedirs(directory, exist_ok=True)
+        index = history.index
+        tz = str(index.tz) if getattr(index, 'tz', None) is not None else None
+        timestamps = (index.tz_convert('UTC').tz_localize(None) if tz else index).as_unit('ns').asi8
+
+        arrays = {'index': timestamps}
+        arrays.update({f"bar__{name}": history[name].to_numpy(dtype=float) for name in history.columns})
+        if indicator_frame is not None:
+            arrays.update({f"indicator__{name}": indicator_frame[name].to_numpy(dtype=float)
+                           for name in indicator_frame.columns})
+
+        meta = {
+            'tz': tz,
+            'index_name': index.name,
+            'bar_columns': list(history.columns),
+            'indicator_columns': list(indicator_frame.columns) if indicator_frame is not None else None
+        }
+
+        tmp_path = os.path.join(directory, 'frames.tmp.npz')
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, os.path.join(directory, 'frames.npz'))
+        with open(os.path.join(directory, 'frames.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    @staticmethod
+    def _load_frames(directory):
+        """(history, indicator_frame) of an entry, or None if not cached"""
+        arrays_path = os.path.join(directory, 'frames.npz')
+        meta_path = os.path.join(directory, 'frames.json')
+        if not (os.path.exists(arrays_path) and os.path.exists(meta_path)):
+            return None
+
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with np.load(arrays_path, allow_pickle=False) as data:
+                index = pd.DatetimeIndex(data['index'].astype('datetime64[ns]'), name=meta['index_name'])
+                if meta['tz']:
+                    index = index.tz_localize('UTC').tz_convert(meta['tz'])
+                history = pd.DataFrame({name: data[f"bar__{name}"] for name in meta['bar_columns']}, index=index)
+                indicator_frame = None
+                if meta['indicator_columns'] is not None:
+                    indicator_frame = pd.DataFrame(
+                        {name: data[f"indicator__{name}"] for name in meta['indicator_columns']}, index=index
+                    )
+        except Exception as e:
+            print(f"Error loading cached frames from {directory}: {e}")
+            return None
+
+        return history, indicator_frame
@@ -1,8 +1,9 @@
 """
 HTML Report Generator for Backtest and Historical Test Results
 """
-import json
 from datetime import datetime
+import pandas as pd
+from trade_store import load_results
 
 
 def generate_html_report(results_file, output_file='test_report.html'):
@@ -10,15 +11,14 @@ def generate_html_report(results_file, output_file='test_report.html'):
     Generate HTML report from test results JSON
 
     Args:
-        results_file: Path to JSON results file
+        results_file: Path to JSON results file (or columnar '.trades' store)
         output_file: Output HTML file path
     """
-    # Load results
-    with open(results_file, 'r') as f:
-        data = json.load(f)
+    # Load results (trades as a DataFrame: no per-trade dicts for large stores)
+    data = load_results(results_file, frame=True)
 
     # Check if it's backtest or historical test
-    is_backtest = 'metrics' in data
+    is_backtest = isinstance(data, dict)
 
     if is_backtest:
         html = generate_backtest_report(data)
@@ -32,15 +32,31 @@ def generate_html_report(results_file, output_file='test_report.html'):
     print(f"✅ HTML report generated: {output_file}")
 
 
+def trade_table(trades):
+    """
+    Columns of the trades table, missing values filled as in the JSON report
+
+    Args:
+        trades: DataFrame of trades (load_results(..., frame=True)) or None
+
+    Returns:
+        DataFrame with one row per trade
+    """
+    text_columns = ['entry_date', 'exit_date', 'signal', 'exit_reason']
+    number_columns = ['entry_price', 'exit_price', 'pnl']
+    table = pd.DataFrame(trades).reindex(columns=text_columns + number_columns)
+    for name in text_columns:
+        table[name] = table[name].astype(object).where(table[name].notna(), 'N/A')
+    table[number_columns] = table[number_columns].astype(float).fillna(0)
+    return table
+
+
 def generate_backtest_report(data):
     """Generate HTML report for backtest results"""
     metrics = data['metrics']
-    trades = data.get('trades', [])
-    timestamp = data.get('timestamp', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-
-    # Calculate additional stats
-    winning_trades = [t for t in trades if t.get('pnl', 0) > 0]
-    losing_trades = [t for t in trades if t.get('pnl', 0) < 0]
+    trades = trade_table(data.get('trades'))
+    timestamp = data.get('timestamp') or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    profit_factor = f"{metrics['profit_factor']:.2f}" if metrics.get('profit_factor') else '∞'
 
     html = f"""
 <!DOCTYPE html>
@@ -294,7 +310,7 @@ def generate_backtest_report(data):
             <div class="metric-card">
                 <div class="metric-label">Profit Factor</div>
                 <div class="metric-value {'positive' if metrics.get('profit_factor', 0) and metrics['profit_factor'] > 1 else 'negative'}">
-                    {metrics['profit_factor']:.2f if metrics.get('profit_factor') else '∞'}
+                    {profit_factor}
                 </div>
             </div>
 
@@ -364,15 +380,15 @@ def generate_backtest_report(data):
                     {''.join([f'''
                     <tr>
                         <td>{i+1}</td>
-                        <td>{trade.get('entry_date', 'N/A')}</td>
-                        <td>{trade.get('exit_date', 'N/A')}</td>
-                        <td><span class="badge badge-neutral">{trade.get('signal', 'N/A')}</span></td>
-                        <td>${trade.get('entry_price', 0):.2f}</td>
-                        <td>${trade.get('exit_price', 0):.2f}</td>
-                        <td>{trade.get('exit_reason', 'N/A')}</td>
-                        <td class="{'profit' if trade.get('pnl', 0) > 0 else 'loss'}">${trade.get('pnl', 0):+,.2f}</td>
+                        <td>{trade.entry_date}</td>
+                        <td>{trade.exit_date}</td>
+                        <td><span class="badge badge-neutral">{trade.signal}</span></td>
+                        <td>${trade.entry_price:.2f}</td>
+                        <td>${trade.exit_price:.2f}</td>
+                        <td>{trade.exit_reason}</td>
+                        <td class="{'profit' if trade.pnl > 0 else 'loss'}">${trade.pnl:+,.2f}</td>
                     </tr>
-                    ''' for i, trade in enumerate(trades)])}
+                    ''' for i, trade in enumerate(trades.itertuples(index=False))])}
                 </tbody>
             </table>
         </div>
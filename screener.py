@@ -0,0 +1,416 @@
+"""
+Market Screener
+Screens large crypto and forex universes with filter expressions and top-K ranking
+"""
+import ast
+import operator
+import time
+import numpy as np
+import pandas as pd
+from market_analyzer import MarketAnalyzer
+from data_fetcher import (
+    DataFetcher, CRYPTO_UNIVERSE, FOREX_UNIVERSE, CRYPTO_NAMES, FOREX_NAMES
+)
+from technical_indicators import (
+    calculate_rsi, calculate_macd, calculate_sma, calculate_ema,
+    calculate_bollinger_bands, calculate_stochastic, calculate_roc,
+    calculate_williams_r, calculate_vwap, calculate_cmf, calculate_ichimoku,
+    calculate_fibonacci_levels
+)
+
+
+_COMPARE_OPS = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+
+_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+
+def _true_range(panel):
+    """True range for a wide panel (NaN-skipping max like the scalar version)"""
+    high_low = panel['high'] - panel['low']
+    high_close = (panel['high'] - panel['close'].shift()).abs()
+    low_close = (panel['low'] - panel['close'].shift()).abs()
+    return np.fmax(np.fmax(high_low, high_close), low_close)
+
+
+def _panel_atr(panel, period=14):
+    """Average True Range for every column of a wide panel"""
+    return _true_range(panel).rolling(period).mean()
+
+
+def _panel_adx(panel, period=14):
+    """ADX with +DI and -DI for every column of a wide panel"""
+    true_range = _true_range(panel)
+
+    up_move = panel['high'] - panel['high'].shift()
+    down_move = panel['low'].shift() - panel['low']
+
+    plus_dm = up_move.where((up_move > down_move) & (up_move > 0), 0)
+    minus_dm = down_move.where((down_move > up_move) & (down_move > 0), 0)
+
+    atr = true_range.rolling(window=period).mean()
+    plus_di = 100 * (plus_dm.rolling(window=period).mean() / atr)
+    minus_di = 100 * (minus_dm.rolling(window=period).mean() / atr)
+
+    dx = 100 * (plus_di - minus_di).abs() / (plus_di + minus_di)
+    adx = dx.rolling(window=period).mean()
+
+    return adx, plus_di, minus_di
+
+
+def _panel_mfi(panel, period=14):
+    """Money Flow Index for every column of a wide panel"""
+    typical_price = (panel['high'] + panel['low'] + panel['close']) / 3
+    money_flow = typical_price * panel['volume']
+    change = typical_price.diff()
+
+    positive_mf = money_flow.where(change > 0, 0).rolling(window=period).sum()
+    negative_mf = money_flow.where(change < 0, 0).rolling(window=period).sum()
+
+    return 100 - (100 / (1 + (positive_mf / negative_mf)))
+
+
+def calculate_panel_indicators(panel):
+    """
+    Calculate indicators for many symbols at once
+
+    The scalar indicator functions operate on df['close'] etc., so they are
+    reused directly on a panel whose fields are wide DataFrames. Recursive
+    indicators (Parabolic SAR, Supertrend, OBV) are not part of the screen.
+
+    Args:
+        panel: dict mapping 'open'/'high'/'low'/'close'/'volume' to DataFrames
+               (rows = candles, columns = symbols)
+
+    Returns:
+        DataFrame: one row per symbol with the latest indicator values
+    """
+    close = panel['close']
+
+    rsi = calculate_rsi(panel)
+    macd, macd_signal, macd_hist = calculate_macd(panel)
+    stoch_k, stoch_d = calculate_stochastic(panel)
+    bb_upper, bb_middle, bb_lower = calculate_bollinger_bands(panel)
+    adx, plus_di, minus_di = _panel_adx(panel)
+    ich_conversion, ich_base, ich_span_a, ich_span_b = calculate_ichimoku(panel)
+    fib_levels = calculate_fibonacci_levels(panel)
+
+    series = {
+        'close': close,
+        'high': panel['high'],
+        'low': panel['low'],
+        'volume': panel['volume'],
+        'change_pct': close.pct_change(fill_method=None) * 100,
+        'rsi': rsi,
+        'macd': macd,
+        'macd_signal': macd_signal,
+        'macd_histogram': macd_hist,
+        'stoch_k': stoch_k,
+        'stoch_d': stoch_d,
+        'roc': calculate_roc(panel),
+        'williams_r': calculate_williams_r(panel),
+        'sma_20': calculate_sma(panel, 20),
+        'sma_50': calculate_sma(panel, 50),
+        'sma_200': calculate_sma(panel, 200),
+        'ema_12': calculate_ema(panel, 12),
+        'ema_26': calculate_ema(panel, 26),
+        'ema_50': calculate_ema(panel, 50),
+        'adx': adx,
+        'plus_di': plus_di,
+        'minus_di': minus_di,
+        'bb_upper': bb_upper,
+        'bb_middle': bb_middle,
+        'bb_lower': bb_lower,
+        'atr': _panel_atr(panel),
+        'vwap': calculate_vwap(panel),
+        'mfi': _panel_mfi(panel),
+        'cmf': calculate_cmf(panel),
+        'ichimoku_conversion': ich_conversion,
+        'ichimoku_base': ich_base,
+        'ichimoku_span_a': ich_span_a,
+        'ichimoku_span_b': ich_span_b,
+    }
+    series.update(fib_levels)
+
+    # Latest value per symbol (forward-filled so symbols whose newest candle
+    # is missing still report their last complete bar)
+    latest = pd.DataFrame({name: values.ffill().iloc[-1] for name, values in series.items()})
+    latest['bars'] = close.notna().sum()
+
+    return latest
+
+
+def compile_filter(expression, fields):
+    """
+    Compile a screening expression such as "rsi < 30 and adx > 25"
+
+    Only comparisons, boolean logic (and/or/not), basic arithmetic, numeric
+    constants and string constants (for equality checks) are allowed, so user
+    input is never passed to eval().
+
+    Args:
+        expression: Filter expression string
+        fields: Allowed field names
+
+    Returns:
+        callable: function(DataFrame) -> boolean Series
+    """
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Invalid filter expression: {e.msg}")
+
+    fields = set(fields)
+
+    def build(node):
+        if isinstance(node, ast.Expression):
+            return build(node.body)
+
+        if isinstance(node, ast.BoolOp):
+            parts = [build(value) for value in node.values]
+            if isinstance(node.op, ast.And):
+                def evaluate(frame):
+                    result = parts[0](frame)
+                    for part in parts[1:]:
+                        result = result & part(frame)
+                    return result
+            else:
+                def evaluate(frame):
+                    result = parts[0](frame)
+                    for part in parts[1:]:
+                        result = result | part(frame)
+                    return result
+            return evaluate
+
+        if isinstance(node, ast.UnaryOp):
+            operand = build(node.operand)
+            if isinstance(node.op, ast.Not):
+                return lambda frame: ~operand(frame).astype(bool)
+            if isinstance(node.op, ast.USub):
+                return lambda frame: -operand(frame)
+            raise ValueError("Unsupported unary operator in filter")
+
+        if isinstance(node, ast.Compare):
+            operands = [build(node.left)] + [build(c) for c in node.comparators]
+            ops = []
+            for op in node.ops:
+                if type(op) not in _COMPARE_OPS:
+                    raise ValueError("Unsupported comparison in filter")
+                ops.append(_COMPARE_OPS[type(op)])
+
+            def evaluate(frame):
+                result = None
+                for i, op in enumerate(ops):
+                    part = op(operands[i](frame), operands[i + 1](frame))
+                    result = part if result is None else result & part
+                return result
+            return evaluate
+
+        if isinstance(node, ast.BinOp):
+            if type(node.op) not in _BINARY_OPS:
+                raise ValueError("Unsupported arithmetic operator in filter")
+            left = build(node.left)
+            right = build(node.right)
+            op = _BINARY_OPS[type(node.op)]
+            return lambda frame: op(left(frame), right(frame))
+
+        if isinstance(node, ast.Name):
+            if node.id not in fields:
+                raise ValueError(f"Unknown field in filter: {node.id}")
+            name = node.id
+            return lambda frame: frame[name]
+
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)) \
+                and not isinstance(node.value, bool):
+            value = node.value
+            return lambda frame: value
+
+        raise ValueError(f"Unsupported syntax in filter: {type(node).__name__}")
+
+    return build(tree)
+
+
+class MarketScreener:
+    def __init__(self, analyzer=None, universe=None, batch_size=200,
+                 latency_budget=30.0, cache_ttl=60):
+        """
+        Initialize the screener
+
+        Args:
+            analyzer: MarketAnalyzer used for signal scoring (created if None)
+            universe: dict {'crypto': [...], 'forex': [...]} (defaults to the
+                      extended CRYPTO_UNIVERSE / FOREX_UNIVERSE)
+            batch_size: Tickers per batched download
+            latency_budget: Seconds after which no new download batch is started
+            cache_ttl: Seconds a downloaded panel is reused between screens
+        """
+        self.analyzer = analyzer or MarketAnalyzer()
+        self.fetcher = DataFetcher()
+        self.universe = universe or {
+            'crypto': list(CRYPTO_UNIVERSE),
+            'forex': list(FOREX_UNIVERSE)
+        }
+        self.batch_size = batch_size
+        self.latency_budget = latency_budget
+        self.cache_ttl = cache_ttl
+        self._cache = {}
+
+    def _load_indicators(self, symbols, market_type, timeframe, deadline):
+        """Fetch (or reuse) the panel for a market and compute its indicators"""
+        key = (market_type, timeframe, tuple(symbols))
+        cached = self._cache.get(key)
+        if cached and time.monotonic() - cached['loaded_at'] < self.cache_ttl:
+            return cached['indicators'], cached['fetched']
+
+        panel, fetched = self.fetcher.fetch_batch(
+            symbols, market_type, timeframe,
+            batch_size=self.batch_size, deadline=deadline
+        )
+
+        if panel['close'].empty:
+            indicators = pd.DataFrame()
+        else:
+            indicators = calculate_panel_indicators(panel)
+            # Same minimum history as calculate_all_indicators
+            indicators = indicators[indicators['bars'] >= 52]
+
+        # Only cache complete universes
+        if len(fetched) == len(symbols):
+            self._cache[key] = {
+                'indicators': indicators,
+                'fetched': fetched,
+                'loaded_at': time.monotonic()
+            }
+
+        return indicators, fetched
+
+    def _score(self, indicators):
+        """Run the analyzer's signal generator on every screened symbol"""
+        signals, scores, strengths = [], [], []
+        records = indicators.astype(object).where(indicators.notna(), None).to_dict('index')
+
+        for symbol in indicators.index:
+            signal_data = self.analyzer.generate_signal(records[symbol])
+            signals.append(signal_data['signal'])
+            scores.append(signal_data['score'])
+            strengths.append(signal_data['strength'])
+
+        indicators = indicators.copy()
+        indicators['signal'] = signals
+        indicators['score'] = scores
+        indicators['strength'] = strengths
+        return indicators
+
+    def screen(self, filter_expr=None, market_type='all', timeframe='1h',
+               sort_by='score', top_k=20, ascending=False, symbols=None):
+        """
+        Screen the universe and return the top-K matches
+
+        Args:
+            filter_expr: Optional filter (e.g., "rsi < 30 and adx > 25")
+            market_type: 'crypto', 'forex' or 'all'
+            timeframe: Candle interval
+            sort_by: Field used for ranking (e.g., 'score', 'strength', 'rsi')
+            top_k: Number of results to return
+            ascending: Sort order for ranking
+            symbols: Optional dict overriding the universe for this call
+
+        Returns:
+            dict: {
+                'results': list of matches,
+                'universe_size': int,
+                'screened': int,
+                'matched': int,
+                'elapsed': float (seconds),
+                'truncated': bool (latency budget hit before the full universe was fetched)
+            }
+        """
+        started = time.monotonic()
+        deadline = started + self.latency_budget
+        universe = symbols or self.universe
+
+        if market_type == 'all':
+            markets = ['crypto', 'forex']
+        elif market_type in ('crypto', 'forex'):
+            markets = [market_type]
+        else:
+            raise ValueError(f"Unknown market type: {market_type}")
+
+        frames = []
+        universe_size = 0
+        fetched_count = 0
+
+        for market in markets:
+            market_symbols = list(universe.get(market, []))
+            universe_size += len(market_symbols)
+            if not market_symbols:
+                continue
+
+            indicators, fetched = self._load_indicators(market_symbols, market, timeframe, deadline)
+            fetched_count += len(fetched)
+
+            if indicators.empty:
+                continue
+
+            indicators = indicators.copy()
+            indicators['market_type'] = market
+            names = CRYPTO_NAMES if market == 'crypto' else FOREX_NAMES
+            indicators['name'] = [names.get(s, s) for s in indicators.index]
+            frames.append(indicators)
+
+        if frames:
+            screened = self._score(pd.concat(frames))
+        else:
+            screened = pd.DataFrame()
+
+        matched = screened
+        if filter_expr and not screened.empty:
+            predicate = compile_filter(filter_expr, screened.columns)
+            mask = predicate(screened)
+            if not isinstance(mask, pd.Series):
+                raise ValueError("Filter expression must compare at least one field")
+            matched = screened[mask.fillna(False).astype(bool)]
+
+        if not matched.empty:
+            if sort_by not in matched.columns:
+                raise ValueError(f"Unknown sort field: {sort_by}")
+            matched = matched.sort_values(sort_by, ascending=ascending, na_position='last')
+
+        top = matched.head(top_k) if top_k else matched
+        top = top.drop(columns=['bars'], errors='ignore').replace([np.inf, -np.inf], np.nan)
+        results = []
+        for symbol, row in top.astype(object).where(top.notna(), None).iterrows():
+            record = {'symbol': symbol}
+            record.update(row.to_dict())
+            results.append(record)
+
+        return {
+            'results': results,
+            'universe_size': universe_size,
+            'screened': int(len(screened)),
+            'matched': int(len(matched)),
+            'elapsed': round(time.monotonic() - started, 3),
+            'truncated': fetched_count < universe_size
+        }
+
+
+if __name__ == '__main__':
+    screener = MarketScreener()
+    output = screener.screen('rsi < 30 and adx > 25', market_type='crypto', top_k=10)
+
+    print(f"Screened {output['screened']}/{output['universe_size']} symbols "
+          f"in {output['elapsed']}s ({output['matched']} matches)")
+    for match in output['results']:
+        print(f"  {match['name']:15s} {match['signal']:12s} Score: {match['score']:+d} "
+              f"RSI: {match['rsi']:.2f}")
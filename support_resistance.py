@@ -0,0 +1,270 @@
+"""
+Support and Resistance Detection
+Vectorized swing-point (fractal) detection and a sorted, incrementally maintained level index
+"""
+import os
+from bisect import bisect_left, bisect_right, insort
+import numpy as np
+import pandas as pd
+
+
+def _swing_mask(values, window, compare):
+    """Mark bars that beat `window` neighbours on both sides (strictly)"""
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    mask = np.zeros(n, dtype=bool)
+    if n < 2 * window + 1:
+        return mask
+
+    center = values[window:n - window]
+    inner = np.ones(len(center), dtype=bool)
+    for k in range(1, window + 1):
+        inner &= compare(center, values[window - k:n - window - k])
+        inner &= compare(center, values[window + k:n - window + k])
+    mask[window:n - window] = inner
+    return mask
+
+
+def find_swing_lows(lows, window=2):
+    """
+    Vectorized swing-low detection
+
+    A bar is a swing low when its low is strictly below the lows of the
+    `window` bars on each side (the first/last `window` bars never qualify).
+
+    Args:
+        lows: Array-like of low prices
+        window: Bars compared on each side
+
+    Returns:
+        numpy boolean array
+    """
+    return _swing_mask(lows, window, np.less)
+
+
+def find_swing_highs(highs, window=2):
+    """
+    Vectorized swing-high detection (mirror of find_swing_lows)
+
+    Returns:
+        numpy boolean array
+    """
+    return _swing_mask(highs, window, np.greater)
+
+
+def nearest_below(levels, price):
+    """Highest of sorted levels strictly below price (None if there is none)"""
+    i = bisect_left(levels, price)
+    return levels[i - 1] if i > 0 else None
+
+
+def nearest_above(levels, price):
+    """Lowest of sorted levels strictly above price (None if there is none)"""
+    i = bisect_right(levels, price)
+    return levels[i] if i < len(levels) else None
+
+
+class SupportResistanceIndex:
+    """
+    Point-in-time support/resistance levels for one symbol
+
+    Swing points are keyed by the bar they formed on and confirmed once
+    `window` later bars have arrived. A bar's levels are the swings of its
+    last `lookback` candles, the same levels EntryExitCalculator scans for.
+    The latest bar's levels are kept in sorted lists maintained as bars
+    arrive, so nearest-level lookups are O(log n) bisects; levels_at()
+    answers the same question as of any earlier bar.
+    """
+
+    def __init__(self, symbol=None, window=2, lookback=50, base_dir='data/levels'):
+        """
+        Args:
+            symbol: Trading symbol (used for the persisted file name)
+            window: Bars compared on each side of a swing point
+            lookback: Candles whose swing points count as levels of a bar
+            base_dir: Directory holding persisted indexes
+        """
+        self.symbol = symbol
+        self.window = window
+        self.lookback = lookback
+        self.base_dir = base_dir
+        self.timestamps = []   # Bar times, oldest first (position -> timestamp)
+        self.lows = []
+        self.highs = []
+        self.swing_lows = []   # Bar positions of confirmed swing lows (ascending)
+        self.swing_highs = []  # Bar positions of confirmed swing highs (ascending)
+        self.supports = []     # Sorted swing-low prices of the latest bar's lookback
+        self.resistances = []  # Sorted swing-high prices of the latest bar's lookback
+
+    @classmethod
+    def from_frame(cls, df, symbol=None, window=2, lookback=50):
+        """Build an index from a full OHLC history"""
+        index = cls(symbol, window, lookback)
+        index.update(df)
+        return index
+
+    def update(self, df):
+        """
+        Line the index up with df, adding bars newer than the indexed ones
+
+        df has to overlap the indexed bars; a frame that ends earlier is
+        answered as of its last bar, bars that differ from the indexed ones
+        (a revised last candle) replace them and everything after, and a
+        frame that does not overlap at all (a gap) starts the index over.
+
+        Args:
+            df: DataFrame with 'high' and 'low' columns
+
+        Returns:
+            tuple: (start, end) positions of df's first bar and one past its
+                   last bar, to pass to levels_at() / nearest_support()
+        """
+        if df is None or len(df) == 0:
+            return len(self.lows), len(self.lows)
+
+        times = list(df.index)
+        lows = df['low'].to_numpy(dtype=float)
+        highs = df['high'].to_numpy(dtype=float)
+
+        start = bisect_left(self.timestamps, times[0])
+        if start == len(self.timestamps) or self.timestamps[start] != times[0]:
+            self._truncate(0)
+            start = 0
+
+        # Bars already indexed must match df; the first difference is replaced
+        overlap = min(len(times), len(self.lows) - start)
+        same = (
+            (np.asarray(self.timestamps[start:start + overlap], dtype=object) == np.asarray(times[:overlap], dtype=object))
+            & _same_values(self.lows[start:start + overlap], lows[:overlap])
+            & _same_values(self.highs[start:start + overlap], highs[:overlap])
+        )
+        matched = overlap if same.all() else int(np.argmin(same))
+        if matched < overlap:
+            self._truncate(start + matched)
+
+        if start + matched == len(self.lows) and matched < len(times):
+            self._append(times[matched:], lows[matched:], highs[matched:])
+
+        return start, start + len(times)
+
+    def _append(self, times, lows, highs):
+        """Add bars, confirm the swings they complete and move the latest levels"""
+        first_new = len(self.lows)
+        self.timestamps.extend(times)
+        self.lows.extend(lows.tolist())
+        self.highs.extend(highs.tolist())
+
+        # Swings need `window` neighbours, so rescan the bars new ones complete
+        scan_start = max(0, first_new - 2 * self.window)
+        for swings, values, finder in ((self.swing_lows, self.lows, find_swing_lows),
+                                       (self.swing_highs, self.highs, find_swing_highs)):
+            for position in np.flatnonzero(finder(values[scan_start:], self.window)) + scan_start:
+                if position + self.window >= first_new:
+                    swings.append(int(position))
+
+        # Levels leaving the lookback are removed, newly confirmed ones inserted
+        old_low, old_high = self._bounds(first_new)
+        low, high = self._bounds(len(self.lows))
+        for levels, swings, values in ((self.supports, self.swing_lows, self.lows),
+                                       (self.resistances, self.swing_highs, self.highs)):
+            for position in self._swings_between(swings, old_low, min(low, old_high + 1)):
+                del levels[bisect_left(levels, values[position])]
+            for position in self._swings_between(swings, max(low, old_high + 1), high + 1):
+                insort(levels, values[position])
+
+    def _truncate(self, end):
+        """Drop bars from position `end` on (and the swings they confirmed)"""
+        del self.timestamps[end:], self.lows[end:], self.highs[end:]
+        last_confirmed = end - 1 - self.window
+        del self.swing_lows[bisect_right(self.swing_lows, last_confirmed):]
+        del self.swing_highs[bisect_right(self.swing_highs, last_confirmed):]
+        self.supports, self.resistances = self._window_levels(end, 0)
+
+    def _bounds(self, end, start=0):
+        """First and last swing bar that counts as a level of the bars before `end`"""
+        return max(start, end - self.lookback) + self.window, end - 1 - self.window
+
+    @staticmethod
+    def _swings_between(swings, first, stop):
+        return swings[bisect_left(swings, first):bisect_left(swings, stop)] if first < stop else []
+
+    def _window_levels(self, end, start):
+        low, high = self._bounds(end, start)
+        return (sorted(self.lows[i] for i in self._swings_between(self.swing_lows, low, high + 1)),
+                sorted(self.highs[i] for i in self._swings_between(self.swing_highs, low, high + 1)))
+
+    def levels_at(self, end=None, start=0):
+        """
+        Support/resistance levels as of a bar
+
+        Args:
+            end: Position one past the bar (defaults to the latest bar)
+            start: First bar of the frame the levels are read from (the lookback
+                   never reaches before it)
+
+        Returns:
+            tuple: (supports, resistances) as sorted lists of prices
+        """
+        end = len(self.lows) if end is None else end
+        if end == len(self.lows) and max(start, end - self.lookback) == max(0, end - self.lookback):
+            return self.supports, self.resistances
+        return self._window_levels(end, start)
+
+    def nearest_support(self, price, end=None, start=0):
+        """Highest support strictly below price as of a bar (None if there is none)"""
+        return nearest_below(self.levels_at(end, start)[0], price)
+
+    def nearest_resistance(self, price, end=None, start=0):
+        """Lowest resistance strictly above price as of a bar (None if there is none)"""
+        return nearest_above(self.levels_at(end, start)[1], price)
+
+    @property
+    def path(self):
+        """File path of the persisted index"""
+        safe_symbol = (self.symbol or 'levels').replace('/', '_').replace('=', '_')
+        return os.path.join(self.base_dir, f"{safe_symbol}.npz")
+
+    def save(self):
+        """Persist the index to disk"""
+        os.makedirs(self.base_dir, exist_ok=True)
+        index = pd.Index(self.timestamps)
+        datetimes = isinstance(index, pd.DatetimeIndex)
+        tmp_path = self.path + '.tmp.npz'
+        np.savez(
+            tmp_path,
+            timestamps=np.array([t.isoformat() for t in index]) if datetimes else index.to_numpy(),
+            datetimes=np.array([datetimes]),
+            lows=np.array(self.lows, dtype=float),
+            highs=np.array(self.highs, dtype=float),
+            swing_lows=np.array(self.swing_lows, dtype=np.int64),
+            swing_highs=np.array(self.swing_highs, dtype=np.int64),
+            params=np.array([self.window, self.lookback])
+        )
+        os.replace(tmp_path, self.path)
+
+    @classmethod
+    def load(cls, symbol, base_dir='data/levels', window=2, lookback=50):
+        """Load a persisted index (returns an empty index if none exists yet)"""
+        index = cls(symbol, window, lookback, base_dir)
+        if not os.path.exists(index.path):
+            return index
+
+        with np.load(index.path, allow_pickle=False) as data:
+            index.window, index.lookback = (int(value) for value in data['params'])
+            if data['datetimes'][0]:
+                index.timestamps = [pd.Timestamp(str(t)) for t in data['timestamps']]
+            else:
+                index.timestamps = data['timestamps'].tolist()
+            index.lows = data['lows'].tolist()
+            index.highs = data['highs'].tolist()
+            index.swing_lows = data['swing_lows'].tolist()
+            index.swing_highs = data['swing_highs'].tolist()
+        index.supports, index.resistances = index._window_levels(len(index.lows), 0)
+
+        return index
+
+
+def _same_values(stored, values):
+    """Element-wise equality of indexed and new prices (NaN equals NaN)"""
+    stored = np.asarray(stored, dtype=float)
+    return (stored == values) | (np.isnan(stored) & np.isnan(values))
@@ -294,15 +294,40 @@ def calculate_fibonacci_levels(df, period=50):
     return levels
 
 
-def calculate_all_indicators(df):
+# Indicator names in the order calculate_all_indicators reports them
+PRICE_COLUMNS = ['close', 'high', 'low', 'volume']
+INDICATOR_COLUMNS = [
+    'rsi', 'macd', 'macd_signal', 'macd_histogram', 'stoch_k', 'stoch_d', 'roc', 'williams_r',
+    'sma_20', 'sma_50', 'sma_200', 'ema_12', 'ema_26', 'ema_50', 'adx', 'plus_di', 'minus_di',
+    'psar', 'supertrend', 'supertrend_direction',
+    'bb_upper', 'bb_middle', 'bb_lower', 'atr',
+    'obv', 'vwap', 'mfi', 'cmf',
+    'ichimoku_conversion', 'ichimoku_base', 'ichimoku_span_a', 'ichimoku_span_b',
+    'fib_0', 'fib_236', 'fib_382', 'fib_500', 'fib_618', 'fib_786', 'fib_100'
+]
+
+
+def _by_position(values, df):
+    """Indicator values in the row order of df (as .iloc[-1] reads the latest one)"""
+    if len(values) == len(df):
+        return np.asarray(values, dtype=float)
+    # calculate_adx mixes a positional and a date index on date-indexed frames
+    return values.reindex(df.index).to_numpy(dtype=float)
+
+
+def calculate_indicator_frame(df):
     """
-    Calculate all technical indicators for a given DataFrame
+    Calculate every indicator for every bar at once
+
+    All indicators only look backwards, so row i holds exactly the values
+    calculate_all_indicators(df.iloc[:i+1]) would report. Backtests compute
+    this once and read bar after bar with indicators_at().
 
     Args:
         df: DataFrame with OHLCV data
 
     Returns:
-        Dictionary with all indicator values
+        DataFrame with one column per indicator (same index as df), or None
     """
     if df is None or len(df) < 52:  # Need at least 52 periods for Ichimoku
         return None
@@ -342,68 +367,64 @@ def calculate_all_indicators(df):
         # Fibonacci levels
         fib_levels = calculate_fibonacci_levels(df)
 
-        # Get latest values
-        indicators = {
-            # Price data
-            'close': float(df['close'].iloc[-1]),
-            'high': float(df['high'].iloc[-1]),
-            'low': float(df['low'].iloc[-1]),
-            'volume': float(df['volume'].iloc[-1]),
-
-            # Momentum
-            'rsi': float(rsi.iloc[-1]) if not pd.isna(rsi.iloc[-1]) else None,
-            'macd': float(macd.iloc[-1]) if not pd.isna(macd.iloc[-1]) else None,
-            'macd_signal': float(macd_signal.iloc[-1]) if not pd.isna(macd_signal.iloc[-1]) else None,
-            'macd_histogram': float(macd_hist.iloc[-1]) if not pd.isna(macd_hist.iloc[-1]) else None,
-            'stoch_k': float(stoch_k.iloc[-1]) if not pd.isna(stoch_k.iloc[-1]) else None,
-            'stoch_d': float(stoch_d.iloc[-1]) if not pd.isna(stoch_d.iloc[-1]) else None,
-            'roc': float(roc.iloc[-1]) if not pd.isna(roc.iloc[-1]) else None,
-            'williams_r': float(williams_r.iloc[-1]) if not pd.isna(williams_r.iloc[-1]) else None,
-
-            # Trend
-            'sma_20': float(sma_20.iloc[-1]) if not pd.isna(sma_20.iloc[-1]) else None,
-            'sma_50': float(sma_50.iloc[-1]) if not pd.isna(sma_50.iloc[-1]) else None,
-            'sma_200': float(sma_200.iloc[-1]) if not pd.isna(sma_200.iloc[-1]) else None,
-            'ema_12': float(ema_12.iloc[-1]) if not pd.isna(ema_12.iloc[-1]) else None,
-            'ema_26': float(ema_26.iloc[-1]) if not pd.isna(ema_26.iloc[-1]) else None,
-            'ema_50': float(ema_50.iloc[-1]) if not pd.isna(ema_50.iloc[-1]) else None,
-            'adx': float(adx.iloc[-1]) if not pd.isna(adx.iloc[-1]) else None,
-            'plus_di': float(plus_di.iloc[-1]) if not pd.isna(plus_di.iloc[-1]) else None,
-            'minus_di': float(minus_di.iloc[-1]) if not pd.isna(minus_di.iloc[-1]) else None,
-            'psar': float(psar.iloc[-1]) if not pd.isna(psar.iloc[-1]) else None,
-            'supertrend': float(supertrend.iloc[-1]) if not pd.isna(supertrend.iloc[-1]) else None,
-            'supertrend_direction': float(supertrend_direction.iloc[-1]) if not pd.isna(supertrend_direction.iloc[-1]) else None,
-
-            # Volatility
-            'bb_upper': float(bb_upper.iloc[-1]) if not pd.isna(bb_upper.iloc[-1]) else None,
-            'bb_middle': float(bb_middle.iloc[-1]) if not pd.isna(bb_middle.iloc[-1]) else None,
-            'bb_lower': float(bb_lower.iloc[-1]) if not pd.isna(bb_lower.iloc[-1]) else None,
-            'atr': float(atr.iloc[-1]) if not pd.isna(atr.iloc[-1]) else None,
-
-            # Volume
-            'obv': float(obv.iloc[-1]) if not pd.isna(obv.iloc[-1]) else None,
-            'vwap': float(vwap.iloc[-1]) if not pd.isna(vwap.iloc[-1]) else None,
-            'mfi': float(mfi.iloc[-1]) if not pd.isna(mfi.iloc[-1]) else None,
-            'cmf': float(cmf.iloc[-1]) if not pd.isna(cmf.iloc[-1]) else None,
-
-            # Ichimoku
-            'ichimoku_conversion': float(ich_conversion.iloc[-1]) if not pd.isna(ich_conversion.iloc[-1]) else None,
-            'ichimoku_base': float(ich_base.iloc[-1]) if not pd.isna(ich_base.iloc[-1]) else None,
-            'ichimoku_span_a': float(ich_span_a.iloc[-1]) if not pd.isna(ich_span_a.iloc[-1]) else None,
-            'ichimoku_span_b': float(ich_span_b.iloc[-1]) if not pd.isna(ich_span_b.iloc[-1]) else None,
-
-            # Fibonacci
-            'fib_0': float(fib_levels['fib_0'].iloc[-1]) if not pd.isna(fib_levels['fib_0'].iloc[-1]) else None,
-            'fib_236': float(fib_levels['fib_236'].iloc[-1]) if not pd.isna(fib_levels['fib_236'].iloc[-1]) else None,
-            'fib_382': float(fib_levels['fib_382'].iloc[-1]) if not pd.isna(fib_levels['fib_382'].iloc[-1]) else None,
-            'fib_500': float(fib_levels['fib_500'].iloc[-1]) if not pd.isna(fib_levels['fib_500'].iloc[-1]) else None,
-            'fib_618': float(fib_levels['fib_618'].iloc[-1]) if not pd.isna(fib_levels['fib_618'].iloc[-1]) else None,
-            'fib_786': float(fib_levels['fib_786'].iloc[-1]) if not pd.isna(fib_levels['fib_786'].iloc[-1]) else None,
-            'fib_100': float(fib_levels['fib_100'].iloc[-1]) if not pd.isna(fib_levels['fib_100'].iloc[-1]) else None,
-        }
-
-        return indicators
+        series = [
+            df['close'], df['high'], df['low'], df['volume'],
+            rsi, macd, macd_signal, macd_hist, stoch_k, stoch_d, roc, williams_r,
+            sma_20, sma_50, sma_200, ema_12, ema_26, ema_50, adx, plus_di, minus_di,
+            psar, supertrend, supertrend_direction,
+            bb_upper, bb_middle, bb_lower, atr,
+            obv, vwap, mfi, cmf,
+            ich_conversion, ich_base, ich_span_a, ich_span_b,
+            fib_levels['fib_0'], fib_levels['fib_236'], fib_levels['fib_382'], fib_levels['fib_500'],
+            fib_levels['fib_618'], fib_levels['fib_786'], fib_levels['fib_100']
+        ]
+
+        return pd.DataFrame({
+            name: _by_position(values, df)
+            for name, values in zip(PRICE_COLUMNS + INDICATOR_COLUMNS, series)
+        }, index=df.index)
 
     except Exception as e:
         print(f"Error calculating indicators: {e}")
         return None
+
+
+def indicators_at(frame, position):
+    """
+    Indicator dictionary for one bar of an indicator frame
+
+    Args:
+        frame: DataFrame from calculate_indicator_frame
+        position: Row number of the bar (negative values count from the end)
+
+    Returns:
+        Dictionary with all indicator values (None if the bar has too little history)
+    """
+    if frame is None:
+        return None
+
+    if position < 0:
+        position += len(frame)
+    if position < 51 or position >= len(frame):
+        return None
+
+    row = frame.iloc[position]
+    indicators = {name: float(row[name]) for name in PRICE_COLUMNS}
+    for name in INDICATOR_COLUMNS:
+        value = row[name]
+        indicators[name] = float(value) if not pd.isna(value) else None
+
+    return indicators
+
+
+def calculate_all_indicators(df):
+    """
+    Calculate all technical indicators for a given DataFrame
+
+    Args:
+        df: DataFrame with OHLCV data
+
+    Returns:
+        Dictionary with all indicator values
+    """
+    return indicators_at(calculate_indicator_frame(df), -1)
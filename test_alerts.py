@@ -0,0 +1,53 @@
+"""
+Alert checks
+Score threshold crossings must follow the signal bands of generate_signal
+(score >= 2 / >= 6 on the BUY side, score <= -2 / <= -6 on the SELL side)
+"""
+import sys
+from alerts import SignalAlertManager
+
+
+def _crossings(old_score, new_score):
+    """(threshold, direction) of the score_threshold events between two scores"""
+    manager = SignalAlertManager(analyzer=object())
+    state = {'signal': 'HOLD', 'patterns': set(), 'bar_time': 0, 'next_bar_close': 0}
+    events = manager._diff('EURUSD=X', '1h', dict(state, score=old_score), dict(state, score=new_score))
+    return [(event['threshold'], event['direction']) for event in events if event['type'] == 'score_threshold']
+
+
+def test_sell_thresholds_down():
+    assert _crossings(-1, -2) == [(-2, 'down')]
+    assert _crossings(-5, -6) == [(-6, 'down')]
+    assert _crossings(0, -6) == [(-6, 'down'), (-2, 'down')]
+    assert _crossings(-2, -3) == []
+    assert _crossings(-6, -7) == []
+
+
+def test_sell_thresholds_up():
+    assert _crossings(-2, -1) == [(-2, 'up')]
+    assert _crossings(-6, -5) == [(-6, 'up')]
+    assert _crossings(-6, 0) == [(-6, 'up'), (-2, 'up')]
+    assert _crossings(-3, -2) == []
+    assert _crossings(-7, -6) == []
+
+
+def test_buy_thresholds():
+    assert _crossings(1, 2) == [(2, 'up')]
+    assert _crossings(5, 6) == [(6, 'up')]
+    assert _crossings(2, 1) == [(2, 'down')]
+    assert _crossings(6, 5) == [(6, 'down')]
+    assert _crossings(2, 3) == []
+    assert _crossings(-2, 2) == [(-2, 'up'), (2, 'up')]
+
+
+if __name__ == '__main__':
+    failed = False
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            try:
+                test()
+                print(f"  PASS  {name}")
+            except Exception as e:
+                failed = True
+                print(f"  FAIL  {name}: {e!r}")
+    sys.exit(1 if failed else 0)
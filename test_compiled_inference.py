@@ -0,0 +1,104 @@
+"""
+Compiled inference check
+Trains a ForexPredictor on synthetic prices, exports it to the NumPy-only
+format and compares probabilities and latency against the original models
+"""
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from forex_prediction import ForexPredictor
+
+TOLERANCE = 1e-5
+
+
+def synthetic_prices(bars=1500, seed=7):
+    """Random-walk OHLCV data"""
+    rng = np.random.default_rng(seed)
+    close = 1.10 * np.exp(np.cumsum(rng.normal(0, 0.002, bars)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.001, bars)) * close
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.integers(1000, 5000, bars).astype(float)
+    }, index=pd.date_range('2024-01-01', periods=bars, freq='h'))
+
+
+def native_probabilities(predictor, features, sequences):
+    """Per-model probabilities from the scikit-learn/XGBoost/Keras objects"""
+    scaled = predictor.scaler.transform(features)
+    result = {
+        'rf': predictor.rf_model.predict_proba(scaled),
+        'gb': predictor.gb_model.predict_proba(scaled),
+        'xgb': predictor.xgb_model.predict_proba(scaled)
+    }
+    if predictor.lstm_trained and predictor.lstm_model is not None:
+        rows, length, width = sequences.shape
+        lstm_scaled = predictor.lstm_scaler.transform(sequences.reshape(-1, width)).reshape(rows, length, width)
+        result['lstm'] = predictor.lstm_model.predict(lstm_scaled, verbose=0)
+    return result
+
+
+df = synthetic_prices()
+predictor = ForexPredictor()
+
+print("Training models on synthetic data...")
+if not predictor.train(df):
+    raise SystemExit("FAIL: training failed")
+
+model_dir = tempfile.mkdtemp()
+try:
+    predictor.save(model_dir)
+    compiled_predictor = ForexPredictor.load(model_dir, backend='compiled')
+    if compiled_predictor is None:
+        raise SystemExit("FAIL: compiled export missing")
+    compiled = compiled_predictor.compiled
+
+    # Every bar with a complete LSTM sequence
+    features = predictor._build_feature_matrix(df)
+    positions = np.arange(20 + predictor.sequence_length - 1, len(df))
+    windows = np.lib.stride_tricks.sliding_window_view(features, predictor.sequence_length, axis=0)
+    sequences = windows.transpose(0, 2, 1)[positions - predictor.sequence_length + 1]
+    rows = features[positions]
+
+    native = native_probabilities(predictor, rows, sequences)
+    rf_proba, gb_proba, xgb_proba = compiled.tree_probabilities(rows)
+    lean = {'rf': rf_proba, 'gb': gb_proba, 'xgb': xgb_proba}
+    if 'lstm' in native:
+        lean['lstm'] = compiled.lstm_probabilities(sequences)
+
+    print(f"\nCompared {len(rows)} rows:")
+    failed = False
+    for name in native:
+        error = float(np.abs(native[name] - lean[name]).max())
+        status = 'PASS' if error <= TOLERANCE else 'FAIL'
+        failed |= status == 'FAIL'
+        print(f"  {name:5s} max abs difference: {error:.2e}  {status}")
+
+    # End-to-end predictions
+    native_predictions = predictor.predict_batch(rows, sequences)
+    compiled_predictions = compiled_predictor.predict_batch(rows, sequences)
+    mismatched = sum(a['direction'] != b['direction'] for a, b in zip(native_predictions, compiled_predictions))
+    failed |= mismatched > 0
+    print(f"  direction mismatches: {mismatched}")
+
+    # Single-row latency
+    row, sequence = rows[-1:], sequences[-1:]
+    for label, model in (('native', predictor), ('compiled', compiled_predictor)):
+        model.predict_batch(row, sequence)
+        start = time.perf_counter()
+        for _ in range(50):
+            model.predict_batch(row, sequence)
+        print(f"  {label:8s} latency: {(time.perf_counter() - start) / 50 * 1000:.3f} ms per prediction")
+
+    print("\n" + "=" * 60)
+    print("TEST FAILED" if failed else "TEST PASSED")
+    print("=" * 60)
+    if failed:
+        raise SystemExit(1)
+finally:
+    shutil.rmtree(model_dir, ignore_errors=True)
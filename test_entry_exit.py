@@ -0,0 +1,58 @@
+"""
+Entry/exit batch checks
+calculate_levels_batch / calculate_levels_history read calculate_levels_vectorized;
+their levels must equal calculate_entry_points on each frame / truncated history
+"""
+import sys
+import numpy as np
+from candle_analysis import EntryExitCalculator
+from test_support_resistance import _prices
+
+PATTERNS = {
+    'LONG': [{'name': 'Test', 'type': 'bullish', 'strength': 8}],
+    'SHORT': [{'name': 'Test', 'type': 'bearish', 'strength': 8}]
+}
+
+
+def _assert_matches(levels, row, df, trade_type):
+    """Batch levels of one row vs calculate_entry_points (which rounds to cents)"""
+    if trade_type not in PATTERNS:
+        assert np.isnan(levels['stop_loss'][row])
+        return
+    entry = EntryExitCalculator().calculate_entry_points(df, PATTERNS[trade_type], {})
+    for key in ('entry_price', 'stop_loss', 'take_profit'):
+        assert abs(levels[key][row] - entry[key]) <= 0.005 + 1e-9, (row, key, levels[key][row], entry[key])
+
+
+def test_history_matches_entry_points():
+    df = _prices(600, seed=4)
+    rng = np.random.default_rng(0)
+    positions = rng.integers(0, len(df), 150)
+    trade_types = rng.choice(['LONG', 'SHORT', 'NONE'], len(positions))
+    levels = EntryExitCalculator().calculate_levels_history(df, positions, trade_types)
+    for row, (position, trade_type) in enumerate(zip(positions, trade_types)):
+        _assert_matches(levels, row, df.iloc[:position + 1], trade_type)
+
+
+def test_batch_matches_entry_points():
+    df = _prices(600, seed=5)
+    rng = np.random.default_rng(1)
+    # Frames shorter and longer than the 50 candles a level reads
+    frames = [df.iloc[:int(end)] for end in rng.integers(1, len(df), 80)] + [df.iloc[:49], df.iloc[10:60]]
+    trade_types = rng.choice(['LONG', 'SHORT', 'NONE'], len(frames))
+    levels = EntryExitCalculator().calculate_levels_batch(frames, list(trade_types))
+    for row, (frame, trade_type) in enumerate(zip(frames, trade_types)):
+        _assert_matches(levels, row, frame, trade_type)
+
+
+if __name__ == '__main__':
+    failed = False
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            try:
+                test()
+                print(f"  PASS  {name}")
+            except Exception as e:
+                failed = True
+                print(f"  FAIL  {name}: {e!r}")
+    sys.exit(1 if failed else 0)
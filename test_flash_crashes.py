@@ -6,6 +6,10 @@ from historical_tester import HistoricalTester, custom_test
 from backtester import Backtester, run_backtest
 import json
 from datetime import datetime
+from precompute_cache import PrecomputeCache
+
+# Bars, indicators and analyses shared by the historical test and the backtest of each event
+CACHE = PrecomputeCache()
 
 
 class FlashCrashTester:
@@ -79,7 +83,7 @@ class FlashCrashTester:
         print("1. Running Historical Accuracy Test...")
         print("-" * 70)
 
-        tester = HistoricalTester()
+        tester = HistoricalTester(cache=CACHE)
         test_results = tester.test_symbol_over_period(
             symbol=event['symbol'],
             market_type=event['market_type'],
@@ -102,7 +106,7 @@ class FlashCrashTester:
         print("\n2. Running Backtest Simulation...")
         print("-" * 70)
 
-        backtester = Backtester(initial_capital=10000, risk_per_trade=0.01)
+        backtester = Backtester(initial_capital=10000, risk_per_trade=0.01, cache=CACHE)
         trades, equity = backtester.backtest_symbol(
             symbol=event['symbol'],
             market_type=event['market_type'],
@@ -4,6 +4,10 @@ Test major forex events with extended periods for better analysis
 from historical_tester import HistoricalTester
 from backtester import Backtester
 import json
+from precompute_cache import PrecomputeCache
+
+# Bars, indicators and analyses shared by the historical test and the backtest of each event
+CACHE = PrecomputeCache()
 
 
 def test_swiss_franc_2015():
@@ -22,7 +26,7 @@ def test_swiss_franc_2015():
     print("="*70 + "\n")
 
     # Extended period for enough data
-    tester = HistoricalTester()
+    tester = HistoricalTester(cache=CACHE)
 
     print("Running Historical Test on EUR/CHF...")
     results = tester.test_symbol_over_period(
@@ -42,7 +46,7 @@ def test_swiss_franc_2015():
 
     # Backtest
     print("\nRunning Backtest Simulation...")
-    backtester = Backtester(initial_capital=10000, risk_per_trade=0.01)
+    backtester = Backtester(initial_capital=10000, risk_per_trade=0.01, cache=CACHE)
     trades, equity = backtester.backtest_symbol(
         symbol='EURCHF=X',
         market_type='forex',
@@ -72,7 +76,7 @@ def test_brexit_2016():
     print("Testing period: 6 months (3 months before + 3 months after)")
     print("="*70 + "\n")
 
-    tester = HistoricalTester()
+    tester = HistoricalTester(cache=CACHE)
 
     print("Running Historical Test on GBP/USD...")
     results = tester.test_symbol_over_period(
@@ -92,7 +96,7 @@ def test_brexit_2016():
 
     # Backtest
     print("\nRunning Backtest Simulation...")
-    backtester = Backtester(initial_capital=10000, risk_per_trade=0.01)
+    backtester = Backtester(initial_capital=10000, risk_per_trade=0.01, cache=CACHE)
     trades, equity = backtester.backtest_symbol(
         symbol='GBPUSD=X',
         market_type='forex',
@@ -122,7 +126,7 @@ def test_covid_crash_2020():
     print("Testing period: 6 months (Jan - July 2020)")
     print("="*70 + "\n")
 
-    tester = HistoricalTester()
+    tester = HistoricalTester(cache=CACHE)
 
     print("Running Historical Test on EUR/USD...")
     results = tester.test_symbol_over_period(
@@ -142,7 +146,7 @@ def test_covid_crash_2020():
 
     # Backtest
     print("\nRunning Backtest Simulation...")
-    backtester = Backtester(initial_capital=10000, risk_per_trade=0.01)
+    backtester = Backtester(initial_capital=10000, risk_per_trade=0.01, cache=CACHE)
     trades, equity = backtester.backtest_symbol(
         symbol='EURUSD=X',
         market_type='forex',
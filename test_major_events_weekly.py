@@ -4,6 +4,10 @@ Test major forex events with WEEKLY intervals for higher trade frequency
 from historical_tester import HistoricalTester
 from backtester import Backtester
 import json
+from precompute_cache import PrecomputeCache
+
+# Bars, indicators and analyses shared by the historical test and the backtest of each event
+CACHE = PrecomputeCache()
 
 
 def test_swiss_franc_2015_weekly():
@@ -21,7 +25,7 @@ def test_swiss_franc_2015_weekly():
     print("="*70 + "\n")
 
     # Extended period for enough data
-    tester = HistoricalTester()
+    tester = HistoricalTester(cache=CACHE)
 
     print("Running Historical Test on EUR/CHF...")
     results = tester.test_symbol_over_period(
@@ -41,7 +45,7 @@ def test_swiss_franc_2015_weekly():
 
     # Backtest
     print("\nRunning Backtest Simulation (WEEKLY)...")
-    backtester = Backtester(initial_capital=10000, risk_per_trade=0.01)
+    backtester = Backtester(initial_capital=10000, risk_per_trade=0.01, cache=CACHE)
     trades, equity = backtester.backtest_symbol(
         symbol='EURCHF=X',
         market_type='forex',
@@ -71,7 +75,7 @@ def test_brexit_2016_weekly():
     print("Interval: WEEKLY (1wk) - More trade opportunities")
     print("="*70 + "\n")
 
-    tester = HistoricalTester()
+    tester = HistoricalTester(cache=CACHE)
 
     print("Running Historical Test on GBP/USD...")
     results = tester.test_symbol_over_period(
@@ -91,7 +95,7 @@ def test_brexit_2016_weekly():
 
     # Backtest
     print("\nRunning Backtest Simulation (WEEKLY)...")
-    backtester = Backtester(initial_capital=10000, risk_per_trade=0.01)
+    backtester = Backtester(initial_capital=10000, risk_per_trade=0.01, cache=CACHE)
     trades, equity = backtester.backtest_symbol(
         symbol='GBPUSD=X',
         market_type='forex',
@@ -121,7 +125,7 @@ def test_covid_crash_2020_weekly():
     print("Interval: WEEKLY (1wk) - More trade opportunities")
     print("="*70 + "\n")
 
-    tester = HistoricalTester()
+    tester = HistoricalTester(cache=CACHE)
 
     print("Running Historical Test on EUR/USD...")
     results = tester.test_symbol_over_period(
@@ -141,7 +145,7 @@ def test_covid_crash_2020_weekly():
 
     # Backtest
     print("\nRunning Backtest Simulation (WEEKLY)...")
-    backtester = Backtester(initial_capital=10000, risk_per_trade=0.01)
+    backtester = Backtester(initial_capital=10000, risk_per_trade=0.01, cache=CACHE)
     trades, equity = backtester.backtest_symbol(
         symbol='EURUSD=X',
         market_type='forex',
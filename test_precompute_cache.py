@@ -0,0 +1,66 @@
+"""
+Precompute cache checks
+Runs forex backtests through a PrecomputeCache on synthetic prices and checks
+that warm runs match uncached ones without training a model
+"""
+import contextlib
+import io
+import shutil
+import sys
+import tempfile
+import precompute_cache
+from backtester import Backtester
+from model_registry import ModelRegistry
+from precompute_cache import PrecomputeCache
+from test_backtester import synthetic_prices
+
+
+def _backtest(history, cache=None):
+    backtester = Backtester(cache=cache, strategy={'min_score': 1})
+    backtester.download_history = lambda *args, **kw: history
+    with contextlib.redirect_stdout(io.StringIO()):
+        trades, _ = backtester.backtest_symbol('EURUSD=X', 'forex', '2020-01-01', '2021-09-01', '1d')
+    return trades
+
+
+def test_warm_cache_does_not_train():
+    history = synthetic_prices(600, seed=11)
+    directory = tempfile.mkdtemp(suffix='.precompute')
+    download = precompute_cache.download_history
+    train = ModelRegistry.train
+    trainings = []
+
+    def counting_train(self, pair, interval, df):
+        trainings.append(len(df))
+        return train(self, pair, interval, df)
+
+    precompute_cache.download_history = lambda *args, **kw: history
+    ModelRegistry.train = counting_train
+    try:
+        uncached = _backtest(history)
+        _backtest(history, PrecomputeCache(directory))
+        assert trainings, "cold run trained no model"
+
+        trainings.clear()
+        cache = PrecomputeCache(directory)
+        warm = _backtest(history, cache)
+        period = list(cache.periods.values())[0]
+        assert trainings == [] and period.new_analyses == 0 and period.hits > 0
+        assert [(t['entry_date'], t['pnl']) for t in warm] == [(t['entry_date'], t['pnl']) for t in uncached]
+    finally:
+        precompute_cache.download_history = download
+        ModelRegistry.train = train
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    failed = False
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            try:
+                test()
+                print(f"  PASS  {name}")
+            except Exception as e:
+                failed = True
+                print(f"  FAIL  {name}: {e!r}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,120 @@
+"""
+Support/resistance index checks
+Compares the point-in-time SupportResistanceIndex with the 50-candle swing
+scan EntryExitCalculator runs per bar, as bars arrive in order, sparsely,
+out of order and with a revised last candle
+"""
+import shutil
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+from candle_analysis import EntryExitCalculator
+from support_resistance import SupportResistanceIndex, find_swing_lows, find_swing_highs
+
+
+def _prices(bars=1500, seed=0):
+    rng = np.random.default_rng(seed)
+    close = np.round(100 + np.cumsum(rng.normal(0, 1, bars)), 1)  # Rounded, so equal levels occur
+    return pd.DataFrame({
+        'open': close,
+        'high': close + rng.random(bars).round(1),
+        'low': close - rng.random(bars).round(1),
+        'close': close,
+        'volume': np.ones(bars)
+    }, index=pd.date_range('2020-01-01', periods=bars, freq='h'))
+
+
+def _scan(frame):
+    """Swing levels of the last 50 candles, as _context_from_arrays finds them"""
+    lows = frame['low'].to_numpy()[-50:]
+    highs = frame['high'].to_numpy()[-50:]
+    return sorted(lows[find_swing_lows(lows)].tolist()), sorted(highs[find_swing_highs(highs)].tolist())
+
+
+def _window(df, i):
+    """Frame analyze_at passes on at bar i (last 100 candles)"""
+    return df.iloc[max(0, i - 99):i + 1]
+
+
+def test_levels_match_per_bar_scan():
+    df = _prices()
+    rng = np.random.default_rng(1)
+    index = SupportResistanceIndex()
+    for i in range(len(df)):
+        if rng.random() < 0.3:
+            continue  # Bars without a lookup (and gaps of many bars)
+        frame = _window(df, i)
+        start, end = index.update(frame)
+        supports, resistances = _scan(frame)
+        assert index.levels_at(end, start) == (supports, resistances), i
+
+        price = frame['close'].iloc[-1]
+        below = [level for level in supports if level < price]
+        above = [level for level in resistances if level > price]
+        assert index.nearest_support(price, end, start) == (max(below) if below else None)
+        assert index.nearest_resistance(price, end, start) == (min(above) if above else None)
+
+
+def test_earlier_bars_are_point_in_time():
+    df = _prices()
+    index = SupportResistanceIndex.from_frame(df)
+    assert index.levels_at() == _scan(df)
+    for i in np.random.default_rng(2).integers(0, len(df), 200):
+        frame = _window(df, i)
+        start, end = index.update(frame)
+        assert index.levels_at(end, start) == _scan(frame), i
+    assert len(index.lows) == len(df)  # Earlier frames don't drop later bars
+
+
+def test_revised_candle_replaces_later_bars():
+    df = _prices(600)
+    index = SupportResistanceIndex.from_frame(df.iloc[:500])
+    revised = df.iloc[400:500].copy()
+    revised.iloc[-3, revised.columns.get_loc('low')] -= 20
+    start, end = index.update(revised)
+    assert (start, end) == (400, 500) and len(index.lows) == 500
+    assert index.levels_at(end, start) == _scan(revised)
+
+    start, end = index.update(df.iloc[420:600])
+    assert index.levels_at(end, start) == _scan(df.iloc[420:600])
+
+
+def test_save_and_load():
+    df = _prices(400)
+    directory = tempfile.mkdtemp(suffix='.levels')
+    try:
+        index = SupportResistanceIndex('EUR/USD', base_dir=directory)
+        index.update(df)
+        index.save()
+        loaded = SupportResistanceIndex.load('EUR/USD', base_dir=directory)
+        assert loaded.levels_at() == index.levels_at()
+        assert loaded.update(df.iloc[-100:]) == (300, 400)
+        assert loaded.levels_at(400, 300) == _scan(df.iloc[-100:])
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_entry_points_match_scan():
+    df = _prices()
+    calculator = EntryExitCalculator()
+    patterns = [{'name': 'Test', 'type': 'bullish', 'strength': 8}]
+    for i in range(60, len(df), 3):
+        frame = _window(df, i)
+        for trade_patterns in (patterns, [dict(patterns[0], type='bearish')]):
+            scanned = calculator.calculate_entry_points(frame, trade_patterns, {})
+            indexed = calculator.calculate_entry_points(frame, trade_patterns, {}, level_key=('TEST', '1h'))
+            assert scanned == indexed, i
+
+
+if __name__ == '__main__':
+    failed = False
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            try:
+                test()
+                print(f"  PASS  {name}")
+            except Exception as e:
+                failed = True
+                print(f"  FAIL  {name}: {e!r}")
+    sys.exit(1 if failed else 0)
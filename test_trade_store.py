@@ -0,0 +1,80 @@
+"""
+Trade store checks
+Round-trips records through the columnar TradeStore, including columns whose
+type changes between segments (int first, then float / None / strings)
+"""
+import shutil
+import sys
+import tempfile
+import numpy as np
+from trade_store import TradeStore
+
+
+def _store():
+    return TradeStore(tempfile.mkdtemp(suffix='.trades'))
+
+
+def test_int_column_widens_to_float():
+    store = _store()
+    try:
+        store.extend([{'signal_strength': 100}, {'signal_strength': 80}])
+        store.extend([{'signal_strength': 37.5}])
+        store.extend([{'signal_strength': None}])
+
+        assert store.meta['schema']['signal_strength'] == 'float'
+        reloaded = TradeStore(store.path).records()
+        assert [record['signal_strength'] for record in reloaded] == [100.0, 80.0, 37.5, None]
+    finally:
+        shutil.rmtree(store.path, ignore_errors=True)
+
+
+def test_int_column_with_later_gap():
+    store = _store()
+    try:
+        store.extend([{'score': 3, 'pnl': 1.5}])
+        store.extend([{'pnl': -2.0}])  # score missing in this segment
+        store.extend([{'score': None, 'pnl': 0.5}])
+
+        columns = TradeStore(store.path).load_columns()
+        assert columns['score'].dtype == float
+        assert columns['score'][0] == 3 and np.isnan(columns['score'][1:]).all()
+        assert columns['pnl'].tolist() == [1.5, -2.0, 0.5]
+    finally:
+        shutil.rmtree(store.path, ignore_errors=True)
+
+
+def test_numeric_column_widens_to_str():
+    store = _store()
+    try:
+        store.extend([{'ml_prediction': 1}, {'ml_prediction': 2}])
+        store.extend([{'ml_prediction': 'UP'}])
+
+        assert store.meta['schema']['ml_prediction'] == 'str'
+        assert [record['ml_prediction'] for record in store.records()] == ['1', '2', 'UP']
+    finally:
+        shutil.rmtree(store.path, ignore_errors=True)
+
+
+def test_bool_column_keeps_type():
+    store = _store()
+    try:
+        store.extend([{'ml_correct': True}])
+        store.extend([{'ml_correct': None}, {'ml_correct': False}])
+
+        assert store.meta['schema']['ml_correct'] == 'bool'
+        assert [record['ml_correct'] for record in store.records()] == [True, None, False]
+    finally:
+        shutil.rmtree(store.path, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    failed = False
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            try:
+                test()
+                print(f"  PASS  {name}")
+            except Exception as e:
+                failed = True
+                print(f"  FAIL  {name}: {e!r}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,395 @@
+"""
+Columnar Trade Store
+Typed, append-only column files for backtest trades and historical test results,
+loaded as arrays or DataFrames without parsing JSON
+"""
+import glob
+import json
+import os
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from performance_metrics import MetricsAccumulator, TradeLog, replay_metrics
+
+
+STORE_VERSION = 1
+
+# What a store holds: Backtester.save_results output (trades + metrics),
+# HistoricalTester.save_results output, or a Backtester trade_log (trades only)
+STORE_KINDS = ['backtest', 'historical', 'trade_log']
+
+# Column types: float (None -> NaN), int, bool (None -> -1 as int8),
+# str (dictionary encoded: int32 codes into a sorted value array, None -> -1)
+COLUMN_TYPES = ['float', 'int', 'bool', 'str']
+
+
+def infer_column_type(values):
+    """Storage type of a column from its values (None if they are all None)"""
+    present = [value for value in values if value is not None]
+    if not present:
+        return None
+    if all(isinstance(value, (bool, np.bool_)) for value in present):
+        return 'bool'
+    if all(isinstance(value, (int, np.integer)) and not isinstance(value, (bool, np.bool_)) for value in present):
+        # Integers with gaps are stored as floats (NaN marks the gaps)
+        return 'int' if len(present) == len(values) else 'float'
+    if all(isinstance(value, (int, float, np.integer, np.floating)) for value in present):
+        return 'float'
+    return 'str'
+
+
+def widen_column_type(stored, new):
+    """
+    Type holding the values of both a stored column and new values
+
+    int/bool columns that later get fractional, missing or mixed numeric
+    values become float; anything mixed with strings becomes str.
+    """
+    if new is None or new == stored:
+        return stored
+    if 'str' in (stored, new):
+        return 'str'
+    return 'float'
+
+
+def encode_column(values, column_type):
+    """
+    Arrays stored for one column
+
+    Returns:
+        dict: suffix -> array ('' for plain columns, 'codes'/'values' for strings)
+    """
+    if column_type == 'float':
+        return {'': np.array([np.nan if value is None else value for value in values], dtype=float)}
+    if column_type == 'int':
+        if any(value is None for value in values):
+            raise ValueError("Missing value in an integer column")
+        return {'': np.array(values, dtype=np.int64)}
+    if column_type == 'bool':
+        return {'': np.array([-1 if value is None else int(bool(value)) for value in values], dtype=np.int8)}
+
+    strings = [None if value is None else str(value) for value in values]
+    dictionary = np.array(sorted({value for value in strings if value is not None}), dtype=str)
+    lookup = {value: code for code, value in enumerate(dictionary)}
+    codes = np.array([-1 if value is None else lookup[value] for value in strings], dtype=np.int32)
+    return {'codes': codes, 'values': dictionary}
+
+
+def decode_column(arrays, column_type):
+    """
+    Values of one column of one segment (inverse of encode_column)
+
+    Args:
+        arrays: dict suffix -> array, as returned by encode_column
+
+    Returns:
+        list of Python values (None for missing)
+    """
+    if column_type == 'str':
+        dictionary = arrays['values']
+        return [None if code < 0 else str(dictionary[code]) for code in arrays['codes'].tolist()]
+    values = arrays[''].tolist()
+    if column_type == 'float':
+        return [None if value != value else value for value in values]
+    if column_type == 'bool':
+        return [None if value < 0 else bool(value) for value in values]
+    return values
+
+
+class TradeStore:
+    """
+    Directory of column segments plus a meta.json (schema, metrics, timestamp)
+
+    Every append writes one new segment (an npz of typed column arrays), so
+    appending never rewrites earlier data. Loading concatenates the segments
+    column by column; strings come back as pandas categoricals.
+    """
+
+    def __init__(self, path, buffer_size=10000):
+        """
+        Args:
+            path: Store directory (e.g. 'covid_2020_backtest.trades')
+            buffer_size: Records buffered by append() before a segment is written
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.meta = self._read_meta()
+
+    def _meta_path(self):
+        return os.path.join(self.path, 'meta.json')
+
+    def _read_meta(self):
+        if os.path.exists(self._meta_path()):
+            with open(self._meta_path()) as f:
+                return json.load(f)
+        return {'version': STORE_VERSION, 'schema': {}, 'columns': []}
+
+    def _write_meta(self):
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = self._meta_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.meta, f, indent=2, default=str)
+        os.replace(tmp_path, self._meta_path())
+
+    def segments(self):
+        """Segment files in write order"""
+        paths = glob.glob(os.path.join(self.path, 'segment_*.npz'))
+        return sorted(path for path in paths if not path.endswith('.tmp.npz'))
+
+    def set_info(self, **info):
+        """Store metadata next to the columns (e.g. metrics=..., timestamp=...)"""
+        self.meta.update(info)
+        self._write_meta()
+
+    def extend(self, records):
+        """
+        Write records as a new segment
+
+        Args:
+            records: List of flat dicts (e.g. trades from Backtester)
+
+        Returns:
+            int: Number of records written
+        """
+        if not records:
+            return 0
+
+        # Columns in first-seen order; types set by the first segment that has them and
+        # widened (int -> float -> str) when later values don't fit
+        schema = self.meta['schema']
+        columns = list(self.meta['columns'])
+        for record in records:
+            for name in record:
+                if name not in schema and name not in columns:
+                    columns.append(name)
+
+        arrays = {'_row_count': np.array([len(records)])}
+        for name in columns:
+            values = [record.get(name) for record in records]
+            column_type = infer_column_type(values)
+            if column_type is None and schema.get(name) == 'int':
+                column_type = 'float'  # int columns can't hold the missing values
+            if name not in schema:
+                if column_type is None:
+                    continue  # all missing so far: typed by the first segment with values
+                if column_type == 'int' and self.segments():
+                    column_type = 'float'  # earlier segments are missing this column
+                schema[name] = column_type
+            elif widen_column_type(schema[name], column_type) != schema[name]:
+                # e.g. an int column getting 37.5 or None: rewrite earlier segments as float
+                self._widen(name, widen_column_type(schema[name], column_type))
+            for suffix, array in encode_column(values, schema[name]).items():
+                arrays[f"{name}__{suffix}" if suffix else name] = array
+
+        os.makedirs(self.path, exist_ok=True)
+        segment_path = os.path.join(self.path, f"segment_{len(self.segments()):06d}.npz")
+        tmp_path = segment_path + '.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, segment_path)
+
+        self.meta['columns'] = columns
+        self._write_meta()
+        return len(records)
+
+    def _widen(self, name, column_type):
+        """Convert a column of every written segment to a wider type"""
+        stored_type = self.meta['schema'][name]
+        for segment_path in self.segments():
+            with np.load(segment_path, allow_pickle=False) as data:
+                arrays = {key: data[key] for key in data.files}
+
+            keys = {'codes': f"{name}__codes", 'values': f"{name}__values"} if stored_type == 'str' else {'': name}
+            column = {suffix: arrays.pop(key) for suffix, key in keys.items() if key in arrays}
+            if not column:
+                continue  # column without values in this segment
+
+            values = decode_column(column, stored_type)
+            for suffix, array in encode_column(values, column_type).items():
+                arrays[f"{name}__{suffix}" if suffix else name] = array
+
+            tmp_path = segment_path + '.tmp.npz'
+            np.savez(tmp_path, **arrays)
+            os.replace(tmp_path, segment_path)
+
+        self.meta['schema'][name] = column_type
+        self._write_meta()
+
+    def append(self, record):
+        """Buffer one record (written when the buffer is full or on flush)"""
+        self.buffer.append(record)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write buffered records"""
+        records, self.buffer = self.buffer, []
+        self.extend(records)
+
+    def close(self):
+        self.flush()
+
+    def load_columns(self, columns=None):
+        """
+        Columns of every segment, concatenated
+
+        Args:
+            columns: Column names to load (default: all)
+
+        Returns:
+            dict: name -> numpy array (float/int/int8) or pandas Categorical for strings
+        """
+        self.flush()
+        schema = {name: self.meta['schema'].get(name, 'float') for name in self.meta['columns']}
+        names = columns or self.meta['columns']
+        parts = {name: [] for name in names}
+
+        for segment_path in self.segments():
+            with np.load(segment_path, allow_pickle=False) as data:
+                stored = set(data.files)
+                size = int(data['_row_count'][0])
+                for name in names:
+                    key = f"{name}__codes" if schema[name] == 'str' else name
+                    if key not in stored:
+                        # Column without values in this segment
+                        parts[name].append(self._missing(schema[name], size))
+                    elif schema[name] == 'str':
+                        parts[name].append((data[key], data[f"{name}__values"]))
+                    else:
+                        parts[name].append(data[key])
+
+        return {name: self._concatenate(parts[name], schema[name]) for name in names}
+
+    @staticmethod
+    def _missing(column_type, size):
+        if column_type == 'str':
+            return (np.full(size, -1, dtype=np.int32), np.array([], dtype=str))
+        if column_type == 'bool':
+            return np.full(size, -1, dtype=np.int8)
+        if column_type == 'int':
+            return np.zeros(size, dtype=np.int64)
+        return np.full(size, np.nan)
+
+    @staticmethod
+    def _concatenate(parts, column_type):
+        if column_type != 'str':
+            if not parts:
+                return np.array([], dtype=float if column_type == 'float' else np.int64)
+            return np.concatenate(parts)
+
+        # Merge the per-segment dictionaries and remap the codes
+        if not parts:
+            return pd.Categorical([])
+        dictionary, inverse = np.unique(np.concatenate([values for _, values in parts]), return_inverse=True)
+        codes, offset = [], 0
+        for segment_codes, values in parts:
+            remap = np.append(inverse[offset:offset + len(values)], -1).astype(np.int32)
+            codes.append(remap[segment_codes])  # code -1 picks the appended -1
+            offset += len(values)
+        return pd.Categorical.from_codes(np.concatenate(codes), categories=dictionary)
+
+    def load_frame(self, columns=None):
+        """Stored records as a DataFrame (bool columns: True/False/None)"""
+        data = self.load_columns(columns)
+        for name, values in data.items():
+            if self.meta['schema'].get(name) == 'bool':
+                data[name] = pd.array(np.where(values < 0, None, values == 1), dtype='boolean')
+        return pd.DataFrame(data)
+
+    def records(self):
+        """Stored records as a list of dicts (None for missing values; slow for large stores, see load_frame)"""
+        frame = self.load_frame().astype(object)
+        return frame.where(frame.notna(), None).to_dict('records')
+
+    def kind(self):
+        """One of STORE_KINDS (inferred for stores written without one)"""
+        if 'kind' in self.meta:
+            return self.meta['kind']
+        if 'metrics' in self.meta:
+            return 'backtest'
+        return 'trade_log' if 'pnl' in self.meta['columns'] else 'historical'
+
+
+def save_columnar_results(path, records, **info):
+    """
+    Write results to a new store (replacing an existing one at path)
+
+    Args:
+        path: Store directory
+        records: List of trade / result dicts
+        **info: Metadata kept in meta.json (e.g. metrics)
+    """
+    if os.path.isdir(path):
+        for old_path in glob.glob(os.path.join(path, '*')):
+            os.remove(old_path)
+    store = TradeStore(path)
+    store.extend(records)
+    store.set_info(timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S'), **info)
+    return store
+
+
+def trade_log_metrics(trades):
+    """
+    Backtest metrics of a trade log, replayed as one equity path
+
+    Args:
+        trades: DataFrame of closed trades ('pnl', 'exit_reason', 'final_capital')
+
+    Returns:
+        Dictionary in the format of Backtester.analyze_results
+    """
+    if not len(trades):
+        return MetricsAccumulator().metrics()
+
+    pnl = trades['pnl'].to_numpy(dtype=float)
+    final_capital = trades['final_capital'].to_numpy(dtype=float)
+    if 'capital_at_entry' in trades:
+        initial_capital = float(trades['capital_at_entry'].iloc[0])
+    else:
+        initial_capital = float(final_capital[0] - pnl[0])
+    return replay_metrics(pnl, trades['exit_reason'].astype(object).to_numpy(), final_capital, initial_capital)
+
+
+def load_results(path, frame=False):
+    """
+    Results saved as JSON, as a columnar store or as a JSON Lines trade log,
+    in the JSON layout
+
+    Args:
+        path: JSON file, store directory or '*.jsonl' trade log
+        frame: Return the trades / results as a DataFrame instead of a list of
+               dicts (no per-record conversion; use for large stores)
+
+    Returns:
+        dict: For backtests and trade logs {'metrics', 'trades', 'timestamp'}
+              (trade log metrics are replayed from the trades); for historical
+              tests the results, as save_results writes them
+    """
+    if os.path.isdir(path):
+        store = TradeStore(path)
+        kind = store.kind()
+        results = store.load_frame() if frame or kind == 'trade_log' else store.records()
+        info = store.meta
+    elif path.endswith('.jsonl'):
+        kind = 'trade_log'
+        results = pd.DataFrame(list(TradeLog.read(path)))
+        info = {}
+    else:
+        with open(path) as f:
+            data = json.load(f)
+        if not frame:
+            return data
+        kind = 'backtest' if isinstance(data, dict) else 'historical'
+        results = pd.DataFrame(data['trades'] if kind == 'backtest' else data)
+        info = data if kind == 'backtest' else {}
+
+    if kind == 'historical':
+        return results
+
+    metrics = info.get('metrics')
+    if kind == 'trade_log':
+        metrics = trade_log_metrics(results)
+        if not frame:
+            results = results.astype(object)
+            results = results.where(results.notna(), None).to_dict('records')
+    return {'metrics': metrics, 'trades': results, 'timestamp': info.get('timestamp')}
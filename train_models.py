@@ -0,0 +1,184 @@
+"""
+Command-line trainer for forex ML models
+Trains and refreshes per-pair models in the model registry (outside the web app)
+"""
+import argparse
+import time
+from compiled_inference import export_compiled
+from data_fetcher import DataFetcher, FOREX_PAIRS
+from forex_prediction import ForexPredictor
+from model_registry import ModelRegistry
+from walk_forward import WalkForwardTrainer, print_walk_forward_report
+
+
+# Training history per interval (Yahoo Finance limits intraday lookback)
+TRAINING_PERIODS = {
+    '1h': '730d',
+    '4h': '730d',
+    '1d': '10y',
+    '1wk': 'max'
+}
+
+
+def refresh_models(registry, fetcher, pairs, intervals, force=False):
+    """
+    Retrain every pair/interval whose model is missing, stale or drifting
+
+    Args:
+        registry: ModelRegistry
+        fetcher: DataFetcher
+        pairs: Forex pairs to check
+        intervals: Candle intervals to check
+        force: Retrain even if the model is current
+
+    Returns:
+        list: (pair, interval, reason, success) tuples for retrained models
+    """
+    results = []
+
+    for pair in pairs:
+        for interval in intervals:
+            df = fetcher.fetch_forex_data(pair, period=TRAINING_PERIODS.get(interval, '730d'), interval=interval)
+            if df is None or len(df) < 30:
+                print(f"  {pair} ({interval}): not enough data")
+                continue
+
+            reason = 'forced' if force else registry.retrain_reason(pair, interval, df)
+            if reason is None:
+                print(f"  {pair} ({interval}): up to date")
+                continue
+
+            print(f"  {pair} ({interval}): training ({reason}, {len(df)} bars)...")
+            start = time.time()
+            predictor = registry.train(pair, interval, df)
+            success = predictor is not None
+            if success:
+                print(f"  {pair} ({interval}): saved in {time.time() - start:.1f}s "
+                      f"(LSTM: {'yes' if predictor.lstm_trained else 'no'})")
+            results.append((pair, interval, reason, success))
+
+    return results
+
+
+def compile_models(registry, pairs, intervals):
+    """
+    Re-export existing models to the NumPy-only compiled format
+
+    Returns:
+        int: Number of models compiled
+    """
+    compiled = 0
+    for pair in pairs:
+        for interval in intervals:
+            directory = registry.path(pair, interval)
+            predictor = ForexPredictor.load(directory, backend='native')
+            if predictor is None:
+                print(f"  {pair} ({interval}): no trained model")
+                continue
+            export_compiled(predictor, directory)
+            print(f"  {pair} ({interval}): compiled")
+            compiled += 1
+    return compiled
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Train forex ML models into the model registry'
+    )
+
+    parser.add_argument(
+        '--pairs',
+        nargs='+',
+        default=FOREX_PAIRS,
+        help='Forex pairs to train (default: all supported pairs)'
+    )
+
+    parser.add_argument(
+        '--intervals',
+        nargs='+',
+        default=['1h'],
+        help='Candle intervals to train (default: 1h)'
+    )
+
+    parser.add_argument(
+        '--models-dir',
+        type=str,
+        default='models',
+        help='Model registry directory (default: models)'
+    )
+
+    parser.add_argument(
+        '--max-age',
+        type=float,
+        default=24 * 7,
+        help='Retrain models older than this many hours (default: 168)'
+    )
+
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Retrain every model regardless of age or drift'
+    )
+
+    parser.add_argument(
+        '--compile-only',
+        action='store_true',
+        help='Only re-export existing models to the compiled NumPy format'
+    )
+
+    parser.add_argument(
+        '--walk-forward',
+        type=int,
+        metavar='FOLDS',
+        help='Only evaluate with N walk-forward folds in parallel (no models are saved)'
+    )
+
+    parser.add_argument(
+        '--rolling',
+        action='store_true',
+        help='Use a rolling instead of an expanding training window with --walk-forward'
+    )
+
+    parser.add_argument(
+        '--every',
+        type=float,
+        help='Keep running and re-check every N hours'
+    )
+
+    args = parser.parse_args()
+
+    registry = ModelRegistry(base_dir=args.models_dir, max_age_hours=args.max_age)
+
+    if args.compile_only:
+        compiled = compile_models(registry, args.pairs, args.intervals)
+        print(f"Done: {compiled} model(s) compiled")
+        return
+
+    fetcher = DataFetcher()
+
+    if args.walk_forward:
+        trainer = WalkForwardTrainer(n_folds=args.walk_forward, mode='rolling' if args.rolling else 'expanding')
+        for pair in args.pairs:
+            for interval in args.intervals:
+                df = fetcher.fetch_forex_data(pair, period=TRAINING_PERIODS.get(interval, '730d'), interval=interval)
+                if df is None or len(df) < 30:
+                    print(f"  {pair} ({interval}): not enough data")
+                    continue
+                print_walk_forward_report(trainer.run(df, pair, interval))
+        return
+
+    while True:
+        print(f"\nChecking {len(args.pairs)} pairs x {len(args.intervals)} intervals...")
+        results = refresh_models(registry, fetcher, args.pairs, args.intervals, force=args.force)
+        trained = sum(1 for _, _, _, success in results if success)
+        print(f"Done: {trained} model(s) trained")
+
+        if not args.every:
+            break
+
+        time.sleep(args.every * 3600)
+        args.force = False
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""
+Vectorized Backtest Engine
+Resolves stop loss / take profit exits for precomputed entry signals with array operations
+"""
+import numpy as np
+
+
+# Exit reason codes used in the result arrays
+EXIT_NONE = 0
+EXIT_STOP_LOSS = 1
+EXIT_TAKE_PROFIT = 2
+EXIT_END_OF_PERIOD = 3
+
+EXIT_REASONS = {
+    EXIT_STOP_LOSS: 'STOP_LOSS',
+    EXIT_TAKE_PROFIT: 'TAKE_PROFIT',
+    EXIT_END_OF_PERIOD: 'END_OF_PERIOD'
+}
+
+# Largest share of capital allocated to one trade
+MAX_POSITION_FRACTION = 0.10
+
+
+def first_exits(high, low, entry_index, direction, stop_loss, take_profit, chunk=32):
+    """
+    First bar after each entry at which the stop loss or take profit is hit
+
+    All entries are searched together in windows of growing width
+    (chunk, 2*chunk, ...) so long trades cost a few large array operations
+    instead of a Python step per bar. A bar that touches both levels counts
+    as a stop loss, like the bar loop in Backtester.
+
+    Args:
+        high, low: Bar highs and lows
+        entry_index: Entry bar of every trade (exits are searched from the next bar)
+        direction: 1 for LONG, -1 for SHORT per trade
+        stop_loss, take_profit: Levels per trade
+        chunk: Width of the first search window
+
+    Returns:
+        (exit_index, exit_code): exit bar (len(high) if never hit) and EXIT_* code per trade
+    """
+    n_bars = len(high)
+    entry_index = np.asarray(entry_index, dtype=np.int64)
+    exit_index = np.full(len(entry_index), n_bars, dtype=np.int64)
+    exit_code = np.zeros(len(entry_index), dtype=np.int8)
+
+    pending = np.arange(len(entry_index))
+    offset = 1
+    width = chunk
+
+    while len(pending) and offset < n_bars:
+        bars = entry_index[pending, None] + offset + np.arange(width)
+        valid = bars < n_bars
+        bars = np.minimum(bars, n_bars - 1)
+        window_high, window_low = high[bars], low[bars]
+
+        is_long = (direction[pending] > 0)[:, None]
+        stops = stop_loss[pending, None]
+        targets = take_profit[pending, None]
+        stop_hit = np.where(is_long, window_low <= stops, window_high >= stops) & valid
+        target_hit = np.where(is_long, window_high >= targets, window_low <= targets) & valid
+
+        hit = stop_hit | target_hit
+        found = hit.any(axis=1)
+        first = hit.argmax(axis=1)
+
+        resolved = pending[found]
+        rows = np.flatnonzero(found)
+        exit_index[resolved] = bars[rows, first[found]]
+        exit_code[resolved] = np.where(stop_hit[rows, first[found]], EXIT_STOP_LOSS, EXIT_TAKE_PROFIT)
+
+        pending = pending[~found]
+        offset += width
+        width *= 2
+
+    return exit_index, exit_code
+
+
+def run_vectorized_backtest(high, low, close, signals, stop_loss, take_profit,
+                            initial_capital=10000, risk_per_trade=0.01, start_index=0,
+                            max_position=MAX_POSITION_FRACTION):
+    """
+    Backtest precomputed entry signals
+
+    Produces the same trades as the Backtester bar loop: one position at a
+    time, entry at the signal bar's close, exits checked from the next bar,
+    no new entry on an exit bar, and any open trade closed at the last close.
+
+    Args:
+        high, low, close: Bar prices
+        signals: 1 (enter LONG), -1 (enter SHORT) or 0 per bar
+        stop_loss, take_profit: Levels a trade entered at that bar would use
+        initial_capital: Starting capital
+        risk_per_trade: Risk fraction per trade (0.01 = 1%)
+        start_index: First bar that may open a trade
+        max_position: Largest share of capital per trade
+
+    Returns:
+        dict: Per-trade arrays (entry/exit bars, prices, exit codes, sizes, pnl,
+              capital) and 'equity' (capital after each trade)
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    signals = np.asarray(signals)
+    stop_loss = np.asarray(stop_loss, dtype=float)
+    take_profit = np.asarray(take_profit, dtype=float)
+    n_bars = len(close)
+
+    candidates = np.flatnonzero(signals != 0)
+    candidates = candidates[candidates >= start_index]
+
+    # Exit of a trade opened at every candidate bar
+    exits = np.full(n_bars, n_bars, dtype=np.int64)
+    codes = np.zeros(n_bars, dtype=np.int8)
+    exits[candidates], codes[candidates] = first_exits(
+        high, low, candidates, signals[candidates], stop_loss[candidates], take_profit[candidates]
+    )
+
+    # next_signal[j]: first candidate bar >= j (n_bars if none)
+    next_signal = np.full(n_bars + 1, n_bars, dtype=np.int64)
+    next_signal[candidates] = candidates
+    next_signal = np.minimum.accumulate(next_signal[::-1])[::-1]
+
+    # Chain trades: the next one opens at the first signal after the previous exit bar
+    entries = []
+    position = next_signal[min(start_index, n_bars)]
+    while position < n_bars:
+        entries.append(position)
+        position = next_signal[min(exits[position] + 1, n_bars)]
+
+    entry_index = np.asarray(entries, dtype=np.int64)
+    exit_index = exits[entry_index]
+    exit_code = codes[entry_index]
+    direction = signals[entry_index].astype(np.int8)
+    entry_price = close[entry_index]
+    trade_stop = stop_loss[entry_index]
+    trade_target = take_profit[entry_index]
+
+    open_at_end = exit_index >= n_bars
+    exit_code[open_at_end] = EXIT_END_OF_PERIOD
+    exit_index[open_at_end] = n_bars - 1
+    exit_price = np.select(
+        [exit_code == EXIT_STOP_LOSS, exit_code == EXIT_TAKE_PROFIT],
+        [trade_stop, trade_target],
+        close[-1] if n_bars else 0.0
+    )
+
+    # Capital compounds trade by trade: size is a fixed fraction of capital at entry
+    price_risk = np.abs(entry_price - trade_stop)
+    with np.errstate(divide='ignore'):
+        fraction = np.where(price_risk > 0, risk_per_trade / price_risk, max_position)
+    fraction = np.minimum(fraction, max_position)
+    price_change_pct = direction * (exit_price - entry_price) / entry_price
+
+    equity = initial_capital * np.cumprod(1 + fraction * price_change_pct)
+    capital_at_entry = np.concatenate([[initial_capital], equity])[:-1]
+
+    return {
+        'entry_index': entry_index,
+        'exit_index': exit_index,
+        'direction': direction,
+        'entry_price': entry_price,
+        'stop_loss': trade_stop,
+        'take_profit': trade_target,
+        'exit_price': exit_price,
+        'exit_code': exit_code,
+        'position_size': capital_at_entry * fraction,
+        'risk_amount': capital_at_entry * risk_per_trade,
+        'capital_at_entry': capital_at_entry,
+        'pnl': equity - capital_at_entry,
+        'equity': equity
+    }
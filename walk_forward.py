@@ -0,0 +1,241 @@
+"""
+Walk-Forward Training
+Time-ordered (expanding or rolling window) training and evaluation of ForexPredictor
+with folds trained in parallel worker processes
+"""
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from forex_prediction import ForexPredictor, FEATURE_VERSION, _load_tree_backends
+
+
+# Labels look this many bars ahead, so the last training rows before a test
+# window are dropped to keep the future out of training
+LABEL_HORIZON = 5
+
+
+def walk_forward_folds(n_rows, n_folds=5, mode='expanding', window=None, gap=LABEL_HORIZON):
+    """
+    Split time-ordered rows into walk-forward folds
+
+    The rows are cut into n_folds + 1 consecutive blocks; fold k tests on
+    block k + 1 and trains on everything before it (expanding) or on the
+    last `window` rows before it (rolling).
+
+    Args:
+        n_rows: Number of labelled rows
+        n_folds: Number of test windows
+        mode: 'expanding' or 'rolling'
+        window: Training rows for rolling mode (defaults to one block)
+        gap: Rows dropped between training and test data
+
+    Returns:
+        list: (train_start, train_end, test_start, test_end) row ranges (end exclusive)
+    """
+    if mode not in ('expanding', 'rolling'):
+        raise ValueError(f"Unknown walk-forward mode: {mode}")
+
+    bounds = np.linspace(0, n_rows, n_folds + 2).astype(int)
+    window = window or int(bounds[1])
+    folds = []
+
+    for k in range(n_folds):
+        test_start, test_end = int(bounds[k + 1]), int(bounds[k + 2])
+        train_end = max(0, test_start - gap)
+        train_start = 0 if mode == 'expanding' else max(0, train_end - window)
+        if train_end - train_start < 20 or test_end <= test_start:
+            continue
+        folds.append((train_start, train_end, test_start, test_end))
+
+    return folds
+
+
+def _train_fold(task):
+    """
+    Train and evaluate one fold (runs in a worker process)
+
+    Args:
+        task: dict with the fold number, cached feature file and LSTM flag
+
+    Returns:
+        dict: Per-model and ensemble accuracy plus training time
+    """
+    with np.load(task['path']) as data:
+        X_train, y_train = data['X_train'], data['y_train']
+        X_test, y_test = data['X_test'], data['y_test']
+
+    # One thread per model: parallelism comes from running folds side by side
+    predictor = ForexPredictor(n_jobs=1)
+    _load_tree_backends()  # keep import time out of the fold timing
+    start = time.perf_counter()
+    trained = predictor.fit(X_train, y_train, X_test, y_test, train_lstm=task['include_lstm'])
+    train_seconds = time.perf_counter() - start
+
+    result = {
+        'fold': task['fold'],
+        'train_rows': int(len(X_train)),
+        'test_rows': int(len(X_test)),
+        'train_seconds': round(train_seconds, 3),
+        'trained': trained
+    }
+    if not trained:
+        return result
+
+    # Ensemble accuracy on the test window (same averaging as predict)
+    X_scaled = predictor.scaler.transform(X_test)
+    proba = (predictor.rf_model.predict_proba(X_scaled) +
+             predictor.gb_model.predict_proba(X_scaled) +
+             predictor.xgb_model.predict_proba(X_scaled)) / 3
+    predicted = predictor.rf_model.classes_[proba.argmax(axis=1)]
+
+    result['accuracy'] = dict(predictor.accuracies, ensemble=float((predicted == y_test).mean()))
+    result['lstm'] = predictor.lstm_trained
+    return result
+
+
+class WalkForwardTrainer:
+    """
+    Walk-forward evaluation of the ForexPredictor ensemble
+    """
+
+    def __init__(self, n_folds=5, mode='expanding', window=None, max_workers=None,
+                 cache_dir='data/walk_forward', include_lstm=False):
+        """
+        Args:
+            n_folds: Number of test windows
+            mode: 'expanding' or 'rolling'
+            window: Training rows per fold in rolling mode
+            max_workers: Worker processes (defaults to the CPU count)
+            cache_dir: Directory for cached fold features
+            include_lstm: Also train the LSTM in every fold (slow; needs TensorFlow)
+        """
+        self.n_folds = n_folds
+        self.mode = mode
+        self.window = window
+        self.max_workers = max_workers or os.cpu_count()
+        self.cache_dir = cache_dir
+        self.include_lstm = include_lstm
+
+    def _cache_path(self, df, pair, interval):
+        """Fold cache directory for this exact history and feature version"""
+        digest = hashlib.sha1()
+        digest.update(np.asarray(df.index.asi8 if hasattr(df.index, 'asi8') else np.arange(len(df))).tobytes())
+        digest.update(df[['open', 'high', 'low', 'close']].to_numpy(dtype=float).tobytes())
+        safe_pair = pair.replace('/', '_').replace('=', '_')
+        key = f"{safe_pair}_{interval}_v{FEATURE_VERSION}_{digest.hexdigest()[:12]}"
+        return os.path.join(self.cache_dir, key)
+
+    def prepare_folds(self, df, pair='pair', interval='1h'):
+        """
+        Build and cache the feature/label arrays of every fold
+
+        Features are computed once for the whole history; each fold's slices
+        are written to their own file so workers only load what they need
+        and reruns on the same history skip this step.
+
+        Returns:
+            list: Task dicts for _train_fold
+        """
+        directory = self._cache_path(df, pair, interval)
+        predictor = ForexPredictor()
+        X = y = None
+        tasks = []
+
+        n_rows = max(0, len(df) - 25)  # create_training_data labels bars 20 .. len - 6
+        for k, (train_start, train_end, test_start, test_end) in enumerate(
+                walk_forward_folds(n_rows, self.n_folds, self.mode, self.window)):
+            path = os.path.join(directory, f"fold_{k}_{train_start}_{train_end}_{test_start}_{test_end}.npz")
+
+            if not os.path.exists(path):
+                if X is None:
+                    X, y = predictor.create_training_data(df, None)
+                os.makedirs(directory, exist_ok=True)
+                tmp_path = path + '.tmp.npz'
+                np.savez(
+                    tmp_path,
+                    X_train=X[train_start:train_end], y_train=y[train_start:train_end],
+                    X_test=X[test_start:test_end], y_test=y[test_start:test_end]
+                )
+                os.replace(tmp_path, path)
+
+            tasks.append({
+                'fold': k,
+                'path': path,
+                'include_lstm': self.include_lstm,
+                'train_range': (train_start, train_end),
+                'test_range': (test_start, test_end)
+            })
+
+        return tasks
+
+    def run(self, df, pair='pair', interval='1h'):
+        """
+        Run walk-forward training and evaluation
+
+        Args:
+            df: DataFrame with historical OHLCV data (oldest first)
+            pair: Pair name (cache key and report label)
+            interval: Candle interval
+
+        Returns:
+            dict: Per-fold accuracy/training time and averages
+        """
+        start = time.perf_counter()
+        tasks = self.prepare_folds(df, pair, interval)
+        prepare_seconds = time.perf_counter() - start
+
+        if not tasks:
+            return {'pair': pair, 'interval': interval, 'folds': [], 'error': 'Not enough data for walk-forward folds'}
+
+        if self.max_workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(tasks))) as executor:
+                results = list(executor.map(_train_fold, tasks))
+        else:
+            results = [_train_fold(task) for task in tasks]
+
+        # Bar dates of each window for the report
+        dates = df.index[20:len(df) - 5]
+        for task, result in zip(tasks, results):
+            (train_start, train_end), (test_start, test_end) = task['train_range'], task['test_range']
+            result['train_period'] = (str(dates[train_start]), str(dates[train_end - 1]))
+            result['test_period'] = (str(dates[test_start]), str(dates[test_end - 1]))
+
+        evaluated = [result for result in results if result.get('accuracy')]
+        mean_accuracy = {}
+        if evaluated:
+            for model in evaluated[0]['accuracy']:
+                mean_accuracy[model] = round(float(np.mean([r['accuracy'][model] for r in evaluated])), 4)
+
+        return {
+            'pair': pair,
+            'interval': interval,
+            'mode': self.mode,
+            'folds': results,
+            'mean_accuracy': mean_accuracy,
+            'feature_seconds': round(prepare_seconds, 3),
+            'total_seconds': round(time.perf_counter() - start, 3),
+            'workers': min(self.max_workers, len(tasks))
+        }
+
+
+def print_walk_forward_report(report):
+    """Print a walk-forward report"""
+    print(f"\n{'='*60}")
+    print(f"WALK-FORWARD: {report['pair']} ({report['interval']}, {report.get('mode', '')})")
+    print(f"{'='*60}")
+
+    if report.get('error'):
+        print(f"  {report['error']}")
+        return
+
+    for fold in report['folds']:
+        accuracy = fold.get('accuracy', {})
+        ensemble = f"{accuracy['ensemble'] * 100:.1f}%" if accuracy else 'failed'
+        print(f"  Fold {fold['fold']}: test {fold['test_period'][0]} -> {fold['test_period'][1]} | "
+              f"train {fold['train_rows']} rows in {fold['train_seconds']:.1f}s | ensemble {ensemble}")
+
+    for model, value in report['mean_accuracy'].items():
+        print(f"  Mean {model}: {value * 100:.1f}%")
+    print(f"  Total: {report['total_seconds']:.1f}s on {report['workers']} worker(s)")